@@ -0,0 +1,96 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Any, Dict
+import asyncio
+import logging
+
+from kombu.exceptions import OperationalError as KombuOperationalError
+
+from app.core.config import settings
+from app.db.session import get_db
+from app.models.schemas import BatchJobCreate, BatchStatusResponse
+from app.models.sql_models import AcquisitionBatch
+from app.pipelines.url_pipeline import URLPipeline
+from app.services.batch import BatchExpander, batch_status, cancel_batch, claim_batch_jobs, create_batch
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/api/v1", tags=["batches"])
+
+# Conditionally import Celery tasks only when USE_CELERY is enabled
+if settings.USE_CELERY:
+    from app.workers.tasks import dispatch_batch_jobs
+
+
+async def _run_batch_job(job: Dict[str, Any]) -> None:
+    try:
+        pipeline = URLPipeline()
+        result = await pipeline.process_url(job['url'], job['job_id'], job['investigator_id'], job['case_number'])
+        if result.get('interrupted'):
+            # Nothing retries background tasks; only Celery jobs resume after a restart
+            URLPipeline.fail_job(job['job_id'], "Download interrupted by server shutdown")
+    except Exception as e:
+        logger.error(f"URL pipeline failed for job {job['job_id']}: {str(e)}")
+
+
+async def _run_batch(batch_id: str) -> None:
+    # Downloads run on the acquisition pools, so one event loop drives the batch's in-flight jobs
+    running = set()
+    while True:
+        for job in await asyncio.to_thread(claim_batch_jobs, batch_id):
+            running.add(asyncio.create_task(_run_batch_job(job)))
+        if not running:
+            return
+        _, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+
+
+def run_batch_sync(batch_id: str):
+    """Run a batch's jobs in this background thread (non-Celery mode), its in-flight limit at a time"""
+    try:
+        asyncio.run(_run_batch(batch_id))
+    except Exception as e:
+        logger.error(f"Batch {batch_id} failed: {str(e)}")
+
+
+def _get_batch(db: Session, batch_id: str) -> AcquisitionBatch:
+    batch = db.query(AcquisitionBatch).filter(AcquisitionBatch.id == batch_id).first()
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch
+
+
+@router.post("/batches", response_model=BatchStatusResponse)
+async def submit_batch(batch_data: BatchJobCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    """Acquire a list of URLs, playlists, channels or profiles as one batch of jobs under one case"""
+    expander = BatchExpander()
+    expansion = await asyncio.to_thread(expander.expand, [str(url) for url in batch_data.urls])
+    if not expansion['items']:
+        raise HTTPException(status_code=400, detail={"error": "No URLs to acquire", "skipped": expansion['skipped']})
+
+    batch = create_batch(db, expansion, batch_data.investigator_id, batch_data.case_number, batch_data.notes,
+                         batch_data.max_in_flight)
+
+    # Use Celery if enabled, otherwise fall back to FastAPI BackgroundTasks
+    if settings.USE_CELERY:
+        try:
+            dispatch_batch_jobs(batch.id)
+        except (KombuOperationalError, ConnectionError, OSError) as celery_error:
+            logger.warning(f"Celery unavailable, falling back to BackgroundTasks: {str(celery_error)}")
+            background_tasks.add_task(run_batch_sync, batch.id)
+    else:
+        logger.info(f"Processing batch {batch.id} with BackgroundTasks (USE_CELERY=false)")
+        background_tasks.add_task(run_batch_sync, batch.id)
+
+    return batch_status(db, batch, include_jobs=True)
+
+
+@router.get("/batches/{batch_id}", response_model=BatchStatusResponse)
+async def get_batch_status(batch_id: str, include_jobs: bool = False, db: Session = Depends(get_db)):
+    """Job counts by status and overall progress of a batch (and its jobs with include_jobs=true)"""
+    return batch_status(db, _get_batch(db, batch_id), include_jobs=include_jobs)
+
+
+@router.post("/batches/{batch_id}/cancel")
+async def cancel_batch_acquisition(batch_id: str, db: Session = Depends(get_db)):
+    """Fail the batch's jobs that have not been dispatched yet; running ones are cancelled per job"""
+    batch = _get_batch(db, batch_id)
+    return {"batch_id": batch.id, "cancelled": cancel_batch(db, batch.id)}
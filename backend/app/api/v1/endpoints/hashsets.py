@@ -0,0 +1,41 @@
+from fastapi import APIRouter, HTTPException
+from typing import List
+
+from app.services.hashsets import KnownFileFilter
+
+router = APIRouter(prefix="/api/v1/hashsets", tags=["hashsets"])
+
+# Digest width in hex characters -> algorithm
+ALGORITHMS_BY_LENGTH = {32: "md5", 40: "sha1", 64: "sha256", 128: "sha512"}
+
+
+@router.get("", response_model=List[dict])
+async def list_hash_sets():
+    """Installed known-file hash sets"""
+    return [table.describe() for table in KnownFileFilter.tables()]
+
+
+@router.get("/lookup")
+async def lookup_hash(digest: str):
+    """Check a single MD5/SHA-1/SHA-256/SHA-512 digest against every hash set"""
+    digest = digest.strip().lower()
+    algorithm = ALGORITHMS_BY_LENGTH.get(len(digest))
+    try:
+        bytes.fromhex(digest)
+    except ValueError:
+        algorithm = None
+    if algorithm is None:
+        raise HTTPException(status_code=400, detail="Expected a hex MD5, SHA-1, SHA-256 or SHA-512 digest")
+    return {"digest": digest, "algorithm": algorithm, **KnownFileFilter.lookup({algorithm: digest})}
+
+
+@router.post("/reload")
+async def reload_hash_sets():
+    """Re-scan HASHSET_DIR in the API process now.
+
+    Workers are not signalled: every process re-scans the directory on its
+    next lookup once its mtime has changed, so this only forces the API's
+    view (e.g. on a filesystem that does not update directory mtimes).
+    """
+    KnownFileFilter.reload()
+    return {"sets": [table.describe() for table in KnownFileFilter.tables()]}
@@ -0,0 +1,73 @@
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Path
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+import logging
+import uuid
+
+from kombu.exceptions import OperationalError as KombuOperationalError
+
+from app.core.config import settings
+from app.services.integrity_sweep import SWEEP_ID_PATTERN, IntegritySweep
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1/integrity", tags=["integrity"])
+
+# Conditionally import Celery tasks only when USE_CELERY is enabled
+if settings.USE_CELERY:
+    from app.workers.tasks import integrity_sweep_task
+
+
+class SweepCreate(BaseModel):
+    case_number: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    investigator_id: str = "SYSTEM"
+    bandwidth_mb_s: Optional[float] = None
+    # Pass the id of an interrupted sweep to resume it
+    sweep_id: Optional[str] = Field(None, pattern=SWEEP_ID_PATTERN)
+
+
+def run_sweep_sync(sweep: SweepCreate, sweep_id: str):
+    try:
+        IntegritySweep(
+            sweep_id=sweep_id, case_number=sweep.case_number, since=sweep.since, until=sweep.until,
+            investigator_id=sweep.investigator_id, bandwidth_mb_s=sweep.bandwidth_mb_s
+        ).run()
+    except Exception as e:
+        logger.error(f"Background integrity sweep {sweep_id} failed: {str(e)}")
+
+
+@router.post("/sweeps")
+async def start_sweep(sweep: SweepCreate, background_tasks: BackgroundTasks):
+    """Start (or resume) a bulk re-verification of stored evidence"""
+    sweep_id = sweep.sweep_id or f"sweep-{uuid.uuid4().hex[:12]}"
+
+    if settings.USE_CELERY:
+        try:
+            integrity_sweep_task.delay(
+                sweep_id=sweep_id,
+                case_number=sweep.case_number,
+                since=sweep.since.isoformat() if sweep.since else None,
+                until=sweep.until.isoformat() if sweep.until else None,
+                investigator_id=sweep.investigator_id,
+                bandwidth_mb_s=sweep.bandwidth_mb_s
+            )
+        except (KombuOperationalError, ConnectionError, OSError) as celery_error:
+            logger.warning(f"Celery unavailable, falling back to BackgroundTasks: {str(celery_error)}")
+            background_tasks.add_task(run_sweep_sync, sweep, sweep_id)
+    else:
+        logger.info(f"Running integrity sweep {sweep_id} with BackgroundTasks (USE_CELERY=false)")
+        background_tasks.add_task(run_sweep_sync, sweep, sweep_id)
+
+    return {"sweep_id": sweep_id, "status": "queued"}
+
+
+@router.get("/sweeps/{sweep_id}")
+async def get_sweep(sweep_id: str = Path(..., pattern=SWEEP_ID_PATTERN)):
+    """Progress checkpoint, or the final summary once the sweep has completed"""
+    state = IntegritySweep.load_state(sweep_id)
+    if not state:
+        raise HTTPException(status_code=404, detail="Sweep not found")
+    return state
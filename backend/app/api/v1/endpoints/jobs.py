@@ -1,5 +1,5 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks, Depends
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks, Depends, Request
+from fastapi.responses import FileResponse, RedirectResponse, Response, StreamingResponse
 from typing import Optional, List
 import uuid
 import os
@@ -8,11 +8,13 @@ import tempfile
 from datetime import datetime, timedelta
 import logging
 import asyncio
+import magic
+from contextlib import asynccontextmanager
 from sqlalchemy.orm import Session
 from kombu.exceptions import OperationalError as KombuOperationalError
 
 from app.db.session import get_db
-from app.models.sql_models import Job, ChainOfCustody
+from app.models.sql_models import Job, ChainOfCustody, EvidenceSegment, PerceptualHash
 from app.models.schemas import (
     URLJobCreate, JobStatusResponse, JobDetailsResponse, VerificationResponse
 )
@@ -20,6 +22,18 @@ from app.pipelines.url_pipeline import URLPipeline
 from app.pipelines.upload_pipeline import UploadPipeline
 from app.pipelines.unified_pipeline import UnifiedForensicPipeline
 from app.services.validator import FileValidator
+from app.services.hashing import MultiDigest
+from app.services.merkle import MerkleTree, SIDECAR_NAME as MERKLE_SIDECAR
+from app.services.perceptual import perceptual_index
+from app.services.receipt import build_receipt, receipt_digest, receipt_summary
+from app.services.similarity import SimilarityIndex
+from app.services.storage import StorageService
+from app.services.custody_buffer import custody_buffer
+from app.services.acquisition import acquisition_manager
+from app.services.evidence_delivery import (
+    EvidenceFileResponse, RangeNotSatisfiable, content_disposition, parse_range
+)
+from app.storage.cache import CacheFillMismatch
 from app.core.logger import ForensicLogger
 from app.core.config import settings
 
@@ -28,6 +42,7 @@ router = APIRouter(prefix="/api/v1", tags=["jobs"])
 
 # Conditionally import Celery tasks only when USE_CELERY is enabled
 if settings.USE_CELERY:
+    from app.workers.celery_app import celery_app
     from app.workers.tasks import process_url_job, process_upload_job
 
 # --- Background Helpers for non-Celery mode ---
@@ -38,15 +53,19 @@ def run_url_pipeline_sync(job_id: str, url: str, investigator_id: str, case_numb
     """Synchronous wrapper for URL pipeline (runs in background thread)"""
     try:
         pipeline = URLPipeline()
-        asyncio.run(pipeline.process_url(url, job_id, investigator_id, case_number))
+        result = asyncio.run(pipeline.process_url(url, job_id, investigator_id, case_number))
+        if result.get('interrupted'):
+            # Nothing retries background tasks; only Celery jobs resume after a restart
+            URLPipeline.fail_job(job_id, "Download interrupted by server shutdown")
     except Exception as e:
         logger.error(f"URL pipeline failed for job {job_id}: {str(e)}")
 
-def run_upload_pipeline_sync(job_id: str, file_path: str, filename: str, investigator_id: str, case_number: str = None):
+def run_upload_pipeline_sync(job_id: str, file_path: str, filename: str, investigator_id: str, case_number: str = None,
+                             acquisition_receipt: dict = None):
     """Synchronous wrapper for upload pipeline (runs in background thread)"""
     try:
         pipeline = UploadPipeline()
-        asyncio.run(pipeline.process_file_path(file_path, filename, job_id, investigator_id))
+        asyncio.run(pipeline.process_file_path(file_path, filename, job_id, investigator_id, acquisition_receipt))
     except Exception as e:
         logger.error(f"Upload pipeline failed for job {job_id}: {str(e)}")
 
@@ -54,6 +73,30 @@ def run_upload_pipeline_sync(job_id: str, file_path: str, filename: str, investi
 ALLOWED_TYPES = {"application/pdf", "image/png", "image/jpeg", "text/plain", "application/zip", "video/mp4", "audio/mpeg", "audio/wav"}
 MAX_UPLOAD_MB = 500  
 
+
+def _receive_upload(source, path: str, digests: MultiDigest):
+    """Copy the upload to disk, hashing each chunk as it is written.
+
+    Reading, hashing (Merkle leaves, TLSH, segments) and writing are all
+    blocking, so the upload endpoint runs this in a worker thread rather
+    than on the event loop. Returns the byte count and the first 2 KiB.
+    """
+    header = b""
+    written = 0
+    with open(path, 'wb') as f:
+        while True:
+            chunk = source.read(1024 * 1024)
+            if not chunk:
+                break
+            written += len(chunk)
+            if written > MAX_UPLOAD_MB * 1024 * 1024:
+                raise HTTPException(status_code=413, detail=f"File exceeds {MAX_UPLOAD_MB}MB")
+            if len(header) < 2048:
+                header += chunk[:2048 - len(header)]
+            digests.update(chunk)
+            f.write(chunk)
+    return written, header
+
 # --- Endpoints ---
 
 @router.post("/jobs/url", response_model=JobStatusResponse)
@@ -145,31 +188,40 @@ async def submit_local_file(
             dir=temp_dir,  # <--- Force save to shared volume
             suffix=f"_{file.filename}"
         )
+        # Hash the chunks as they are written so the digest is fixed at the moment of receipt
+        digests = receipt_digest()
         try:
-            written = 0
-            with open(temp_file.name, 'wb') as f:
-                while True:
-                    chunk = file.file.read(1024 * 1024)
-                    if not chunk:
-                        break
-                    written += len(chunk)
-                    if written > MAX_UPLOAD_MB * 1024 * 1024:
-                        os.unlink(temp_file.name)
-                        raise HTTPException(status_code=413, detail=f"File exceeds {MAX_UPLOAD_MB}MB")
-                    f.write(chunk)
+            written, header = await asyncio.to_thread(_receive_upload, file.file, temp_file.name, digests)
         except HTTPException:
+            os.unlink(temp_file.name)
             raise
         except Exception as e:
             if os.path.exists(temp_file.name):
                 os.unlink(temp_file.name)
             raise HTTPException(status_code=500, detail="Failed to save uploaded file")
 
+        try:
+            detected_mime = magic.from_buffer(header, mime=True)
+        except Exception:
+            detected_mime = "application/octet-stream"
+        
+        acquisition_receipt = build_receipt(digests, written, magic_header=header[:16].hex(),
+                                            detected_mime=detected_mime)
+        receipt_details = receipt_summary(acquisition_receipt)
+
         job = Job(
             id=job_id, status="pending", source="local_upload", filename=file.filename,
             investigator_id=investigator_id, case_number=case_number, notes=notes,
-            stage="Initialization"
+            stage="Initialization", file_size=written
         )
         db.add(job)
+        db.add(ChainOfCustody(
+            job_id=job_id,
+            event="EVIDENCE_RECEIVED",
+            investigator_id=investigator_id,
+            details={"algorithm": "SHA256", "method": "hash_on_receipt", **receipt_details},
+            hash_verification=acquisition_receipt["hashes"]["sha256"]
+        ))
         db.commit()
         db.refresh(job)
         
@@ -183,7 +235,8 @@ async def submit_local_file(
                     file_path=temp_file.name, 
                     filename=file.filename, 
                     investigator_id=investigator_id, 
-                    case_number=case_number
+                    case_number=case_number,
+                    acquisition_receipt=acquisition_receipt
                 )
             except (KombuOperationalError, ConnectionError, OSError) as celery_error:
                 # Fallback to BackgroundTasks if Celery/Redis is not available
@@ -194,7 +247,8 @@ async def submit_local_file(
                     temp_file.name, 
                     file.filename, 
                     investigator_id, 
-                    case_number
+                    case_number,
+                    acquisition_receipt
                 )
         else:
             # Use FastAPI BackgroundTasks when USE_CELERY is disabled
@@ -205,7 +259,8 @@ async def submit_local_file(
                 temp_file.name, 
                 file.filename, 
                 investigator_id, 
-                case_number
+                case_number,
+                acquisition_receipt
             )
         return job
     except HTTPException: 
@@ -224,6 +279,44 @@ async def get_job_status(job_id: str, db: Session = Depends(get_db)):
     if not job: raise HTTPException(status_code=404, detail="Job not found")
     return job
 
+def _broadcast_to_workers(command: str, **arguments) -> List[dict]:
+    """Replies of every Celery worker to an acquisition control command ([] without Celery)"""
+    if not settings.USE_CELERY:
+        return []
+    try:
+        return celery_app.control.broadcast(command, arguments=arguments, reply=True, timeout=1.0) or []
+    except (KombuOperationalError, ConnectionError, OSError) as e:
+        logger.warning(f"Celery workers unreachable for {command}: {str(e)}")
+        return []
+
+@router.get("/acquisitions")
+async def acquisition_queues():
+    """Running and queued downloads per platform, for the API process and each Celery worker"""
+    nodes = {"api": acquisition_manager.stats()}
+    for reply in await asyncio.to_thread(_broadcast_to_workers, "acquisition_stats"):
+        nodes.update(reply)
+    return {
+        "running": sum(node.get("running", 0) for node in nodes.values()),
+        "queued": sum(node.get("queued", 0) for node in nodes.values()),
+        "nodes": nodes
+    }
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job_acquisition(job_id: str, db: Session = Depends(get_db)):
+    """Stop a URL job's download, whether it is still queued for a pool or already running"""
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job: raise HTTPException(status_code=404, detail="Job not found")
+    
+    cancelled = acquisition_manager.cancel(job_id)
+    if not cancelled:
+        replies = await asyncio.to_thread(_broadcast_to_workers, "cancel_acquisition", job_id=job_id)
+        cancelled = any(reply.get("cancelled") for node in replies for reply in node.values())
+    if not cancelled:
+        raise HTTPException(status_code=409, detail="Job has no download in progress")
+    
+    # The pipeline marks the job failed once the download stops
+    return {"job_id": job_id, "cancelled": True}
+
 @router.get("/jobs/{job_id}/details", response_model=JobDetailsResponse)
 async def get_job_details(job_id: str, db: Session = Depends(get_db)):
     job = db.query(Job).filter(Job.id == job_id).first()
@@ -233,7 +326,9 @@ async def get_job_details(job_id: str, db: Session = Depends(get_db)):
     
     metadata = {
         "file_name": job.filename, "file_size": job.file_size, "mime_type": job.mime_type,
-        "sha256_hash": job.sha256_hash, "extraction_timestamp": job.updated_at,
+        "sha256_hash": job.sha256_hash, "hashes": job.hashes,
+        "fuzzy_hash": job.fuzzy_hash, "known_file_status": job.known_file_status,
+        "known_file_sets": job.known_file_sets, "extraction_timestamp": job.updated_at,
         "exif_data": {}, "media_metadata": {}
     }
 
@@ -293,11 +388,208 @@ async def verify_integrity(job_id: str, db: Session = Depends(get_db)):
     job = db.query(Job).filter(Job.id == job_id).first()
     if not job or not job.storage_path: raise HTTPException(status_code=404, detail="Evidence not found")
     
+    segments = [
+        {"index": s.segment_index, "offset": s.offset, "length": s.length, "sha256": s.sha256}
+        for s in db.query(EvidenceSegment).filter(EvidenceSegment.job_id == job_id).order_by(EvidenceSegment.segment_index)
+    ]
+    
+    merkle_tree = await _load_merkle_tree(job)
+    
     pipeline = UnifiedForensicPipeline()
-    result = pipeline.verify_integrity(job.storage_path, job.sha256_hash, job.id, job.investigator_id)
+    async with _evidence_file(job) as evidence_path:
+        result = pipeline.verify_integrity(evidence_path, job.sha256_hash, job.id, job.investigator_id,
+                                           segments=segments, file_size=job.file_size,
+                                           merkle_tree=merkle_tree,
+                                           merkle_root=job.merkle.get("root") if job.merkle else None)
     
     return VerificationResponse(
         job_id=job.id, verification_timestamp=datetime.utcnow(),
-        original_hash=result['original_hash'], current_hash=result['current_hash'],
-        matches=result['matches'], verification_details=result['verification_details']
+        original_hash=result['original_hash'], current_hash=result['current_hash'] or "",
+        matches=result['matches'], verification_details=result['verification_details'],
+        changed_ranges=result.get('changed_ranges')
     )
+
+
+@asynccontextmanager
+async def _evidence_file(job: Job):
+    """Local copy of a job's evidence (read through the cache for object storage).
+
+    A copy the cache refused because its hash is wrong is still handed to
+    verification, which reports the change, and removed afterwards.
+    """
+    rejected = None
+    try:
+        path = await StorageService.local_path(job.storage_path, job.sha256_hash)
+    except CacheFillMismatch as e:
+        path = rejected = str(e.path)
+    try:
+        yield path
+    finally:
+        if rejected:
+            os.unlink(rejected)
+
+
+async def _load_merkle_tree(job: Job) -> Optional[MerkleTree]:
+    """Load the stored Merkle tree for a job, if one was recorded.
+
+    A sidecar that is truncated, corrupt or whose root differs from the one
+    recorded on the job is a conflict (409) rather than a server error.
+    """
+    if not job.merkle:
+        return None
+    data = await StorageService.read_sidecar(job.id, MERKLE_SIDECAR)
+    if data is None:
+        raise HTTPException(status_code=409, detail="Merkle tree recorded but missing from storage")
+    try:
+        tree = MerkleTree.from_bytes(data)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=f"Stored Merkle tree is unusable: {str(e)}")
+    if job.merkle.get("root") and tree.root_hex != job.merkle["root"]:
+        raise HTTPException(status_code=409, detail="Stored Merkle tree does not match the recorded root")
+    return tree
+
+@router.post("/jobs/{job_id}/verify-range")
+async def verify_byte_range(job_id: str, start: int, end: int, db: Session = Depends(get_db)):
+    """Prove a byte range of the evidence intact using the stored Merkle tree"""
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job or not job.storage_path: raise HTTPException(status_code=404, detail="Evidence not found")
+    if start < 0 or end <= start: raise HTTPException(status_code=400, detail="Invalid byte range")
+    
+    merkle_tree = await _load_merkle_tree(job)
+    if merkle_tree is None:
+        raise HTTPException(status_code=409, detail="No Merkle tree recorded for this job")
+    
+    pipeline = UnifiedForensicPipeline()
+    async with _evidence_file(job) as evidence_path:
+        result = pipeline.verify_byte_range(evidence_path, merkle_tree, job.merkle["root"], start, end)
+    
+    return {
+        "job_id": job.id,
+        "verification_timestamp": datetime.utcnow(),
+        "merkle_root": job.merkle["root"],
+        "start": start,
+        "end": min(end, merkle_tree.file_size),
+        **result
+    }
+
+@router.get("/jobs/{job_id}/similar")
+async def find_similar_evidence(job_id: str, limit: int = 20, max_distance: Optional[int] = None,
+                                db: Session = Depends(get_db)):
+    """Evidence whose TLSH similarity digest is close to this job's (re-encoded or trimmed copies)"""
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job: raise HTTPException(status_code=404, detail="Job not found")
+    if not job.fuzzy_hash:
+        raise HTTPException(status_code=409, detail="No similarity digest recorded for this job")
+    
+    matches = SimilarityIndex.find_similar(db, job.fuzzy_hash, limit=limit, max_distance=max_distance,
+                                           exclude_job_id=job.id)
+    return {"job_id": job.id, "fuzzy_hash": job.fuzzy_hash, "matches": matches}
+
+@router.get("/jobs/{job_id}/near-duplicates")
+async def find_near_duplicates(job_id: str, max_distance: Optional[int] = None, limit: int = 50,
+                               db: Session = Depends(get_db)):
+    """Images/videos whose perceptual hash is within a Hamming distance of this job's (reposts, re-encodes)"""
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job: raise HTTPException(status_code=404, detail="Job not found")
+    frames = db.query(PerceptualHash).filter(PerceptualHash.job_id == job_id).all()
+    if not frames:
+        raise HTTPException(status_code=409, detail="No perceptual hash recorded for this job")
+    
+    max_distance = settings.PERCEPTUAL_MAX_DISTANCE if max_distance is None else max_distance
+    perceptual_index.refresh(db)
+    
+    # Best match per job across all sampled frames
+    best = {}
+    for frame in frames:
+        for distance, (match_job_id, frame_index, timestamp) in perceptual_index.search(frame.phash, max_distance):
+            if match_job_id == job_id:
+                continue
+            current = best.get(match_job_id)
+            if current is None or distance < current["distance"]:
+                best[match_job_id] = {
+                    "job_id": match_job_id, "distance": distance,
+                    "frame_index": frame_index, "timestamp": timestamp,
+                    "query_frame_index": frame.frame_index
+                }
+    
+    # Jobs deleted since their hashes were indexed are dropped from the index and the results
+    jobs = {j.id: j for j in db.query(Job).filter(Job.id.in_(list(best))).all()}
+    gone = set(best) - set(jobs)
+    if gone:
+        perceptual_index.evict(gone)
+    matches = sorted((match for match in best.values() if match["job_id"] in jobs),
+                     key=lambda match: match["distance"])[:limit]
+    for match in matches:
+        matched = jobs[match["job_id"]]
+        match["filename"] = matched.filename
+        match["original_url"] = matched.original_url
+    
+    return {"job_id": job.id, "max_distance": max_distance, "indexed_hashes": perceptual_index.size, "matches": matches}
+
+
+@router.api_route("/jobs/{job_id}/evidence", methods=["GET", "HEAD"])
+async def get_evidence(job_id: str, request: Request, investigator_id: str, db: Session = Depends(get_db)):
+    """Stream the stored evidence, honouring a single byte range (206); each access is recorded in the chain of custody
+
+    ``investigator_id`` is required: it is the actor of the EVIDENCE_ACCESSED entry.
+    """
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job or not job.storage_path or not job.sha256_hash:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+    
+    etag = f'"{job.sha256_hash}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": content_disposition(job.filename or job.id)
+    }
+    if etag in (tag.strip() for tag in request.headers.get("if-none-match", "").split(",")):
+        return Response(status_code=304, headers=headers)
+    
+    try:
+        source = await StorageService.evidence_source(job.storage_path, job.sha256_hash)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Evidence missing from storage")
+    except CacheFillMismatch as e:
+        os.unlink(e.path)
+        raise HTTPException(status_code=409, detail="Stored evidence does not match its recorded hash")
+    
+    size = source['size']
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range.strip() == etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except RangeNotSatisfiable:
+            raise HTTPException(status_code=416, detail="Requested range not satisfiable",
+                                headers={"Content-Range": f"bytes */{size}"})
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1
+    status_code = 206 if byte_range else 200
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    
+    if 'path' in source:
+        delivery = "local"
+        response = EvidenceFileResponse(source['path'], start, length, status_code, headers, job.mime_type)
+    elif settings.EVIDENCE_S3_DELIVERY == "presigned":
+        # The client repeats its Range request against S3; how much it reads is not known here
+        delivery = "presigned"
+        response = RedirectResponse(StorageService.presigned_url(source['key'], job.filename, job.mime_type),
+                                    status_code=307)
+    else:
+        delivery = "proxy"
+        headers["Content-Length"] = str(length)
+        if request.method == "HEAD" or not length:
+            response = Response(status_code=status_code, headers=headers, media_type=job.mime_type)
+        else:
+            response = StreamingResponse(StorageService.iter_range(source['key'], start, end),
+                                         status_code=status_code, headers=headers, media_type=job.mime_type)
+    
+    if request.method == "GET":
+        served = (start, end) if length and delivery != "presigned" else (None, None)
+        custody_buffer.record_access(job.id, investigator_id,
+                                     request.client.host if request.client else "unknown",
+                                     delivery, *served, job.sha256_hash)
+    return response
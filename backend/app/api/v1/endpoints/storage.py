@@ -0,0 +1,24 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+
+from app.services.storage import StorageService
+
+router = APIRouter(prefix="/api/v1/storage", tags=["storage"])
+
+
+@router.get("/jobs")
+async def list_stored_jobs(cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=1000)):
+    """Jobs present in the storage backend, one page at a time; pass ``next_cursor`` back to continue"""
+    try:
+        return await StorageService.list_jobs_page(cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/cache")
+async def cache_stats():
+    """Hit/miss counters and size of the local evidence cache in front of object storage"""
+    stats = StorageService.cache_stats()
+    if stats is None:
+        raise HTTPException(status_code=404, detail="The storage backend does not use a cache")
+    return stats
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 from pydantic import validator
 
@@ -28,6 +28,76 @@ class Settings(BaseSettings):
     LOCAL_STORAGE_PATH: str = "./evidence_storage"
     MAX_FILE_SIZE: int = 500 * 1024 * 1024
 
+    # --- Hashing Settings ---
+    # Digests computed in the single acquisition read pass (SHA-256 is always included)
+    HASH_ALGORITHMS: List[str] = ["sha256", "sha1", "md5", "sha512"]
+    HASH_BLOCK_SIZE: int = 1024 * 1024
+    # Files at or above this size are memory-mapped instead of read into buffers
+    HASH_MMAP_THRESHOLD: int = 256 * 1024 * 1024
+    # posix_fadvise hints (sequential read, then drop from page cache)
+    HASH_FADVISE: bool = True
+    # Piecewise hashing window; files larger than this get per-segment digests
+    HASH_SEGMENT_SIZE: int = 64 * 1024 * 1024
+    # Worker threads for parallel segment verification (defaults to the CPU count)
+    HASH_SEGMENT_WORKERS: Optional[int] = None
+    # Merkle-tree digest over fixed leaf blocks, stored next to the evidence
+    HASH_MERKLE_ENABLED: bool = True
+    HASH_MERKLE_LEAF_SIZE: int = 1024 * 1024
+    # TLSH similarity digest (requires py-tlsh) and its band index
+    FUZZY_HASH_ENABLED: bool = True
+    FUZZY_HASH_BAND_WIDTH: int = 4  # hex characters of the digest body per band
+    FUZZY_HASH_MAX_DISTANCE: int = 100
+    FUZZY_HASH_MAX_CANDIDATES: int = 500
+    # Perceptual hashes of images and sampled video keyframes (requires numpy/Pillow, ffmpeg for video)
+    PERCEPTUAL_HASH_ENABLED: bool = True
+    PERCEPTUAL_VIDEO_FRAMES: int = 16
+    PERCEPTUAL_FFMPEG_TIMEOUT: int = 120
+    PERCEPTUAL_MAX_DISTANCE: int = 10
+    # Known-file hash sets (*.hset built with `python -m app.services.hashsets build`)
+    HASHSET_DIR: str = "./hashsets"
+    HASHSET_BLOOM_FP_RATE: float = 0.001
+
+    # Byte-level job progress is written at most this often, and only once a stage moved this many percent
+    PROGRESS_INTERVAL_MS: int = 500
+    PROGRESS_MIN_STEP: float = 1.0
+
+    # Unreferenced content-addressed blobs are deleted only after this long (and by the nightly GC)
+    STORAGE_GC_GRACE_SECONDS: int = 24 * 3600
+    STORAGE_GC_NIGHTLY: bool = True
+    # Re-hash evidence copied in-kernel/reflinked into storage (renames need no check)
+    STORAGE_VERIFY_COPY: bool = True
+    # Threads scanning job shards when the local storage manifest is checked or rebuilt
+    STORAGE_FSCK_WORKERS: int = 8
+    # Metadata sidecars: "orjson", "msgpack" or "json"; sections past the threshold are zstd-compressed
+    METADATA_SIDECAR_FORMAT: str = "orjson"
+    METADATA_SIDECAR_COMPRESSION: bool = True
+    METADATA_SIDECAR_COMPRESS_MIN_BYTES: int = 4096
+    METADATA_SIDECAR_FSYNC: bool = True
+    # Seekable zstd at rest (needs the zstandard package); frames are the unit of random access
+    STORAGE_COMPRESSION_ENABLED: bool = True
+    STORAGE_COMPRESSION_LEVEL: int = 3
+    STORAGE_COMPRESSION_FRAME_SIZE: int = 1024 * 1024
+    # Skip evidence whose first frame shrinks by less than this fraction
+    STORAGE_COMPRESSION_MIN_SAVINGS: float = 0.1
+    STORAGE_COMPRESSION_SKIP_MIME_TYPES: List[str] = [
+        "image/jpeg", "image/png", "image/heic", "image/heif", "image/webp", "image/gif",
+        "video/mp4", "video/quicktime", "video/webm", "video/x-matroska",
+        "audio/mpeg", "audio/mp4", "audio/aac", "audio/ogg",
+        "application/zip", "application/gzip", "application/x-7z-compressed",
+        "application/zstd", "application/pdf"
+    ]
+
+    # --- Integrity Sweep Settings ---
+    INTEGRITY_SWEEP_WORKERS: Optional[int] = None  # defaults to the CPU count
+    # Total read bandwidth cap for a sweep in MB/s (None = uncapped)
+    INTEGRITY_SWEEP_BANDWIDTH_MB_S: Optional[float] = None
+    # Items verified per checkpoint / custody write batch
+    INTEGRITY_SWEEP_BATCH_SIZE: int = 200
+    INTEGRITY_SWEEP_STATE_DIR: str = "./integrity_sweeps"
+    # Nightly full-store sweep (UTC hour); set INTEGRITY_SWEEP_NIGHTLY=false to disable
+    INTEGRITY_SWEEP_NIGHTLY: bool = True
+    INTEGRITY_SWEEP_HOUR: int = 1
+
     # --- S3 Settings (Optional) ---
     S3_ENDPOINT: Optional[str] = None
     S3_ACCESS_KEY: Optional[str] = None
@@ -35,6 +105,55 @@ class Settings(BaseSettings):
     S3_BUCKET_NAME: str = "forensic-evidence"
     S3_REGION: str = "us-east-1"
     S3_SECURE: bool = True
+    # One pooled client per process; blocking SDK calls run on a bounded thread pool
+    S3_MAX_POOL_CONNECTIONS: int = 32
+    S3_EXECUTOR_WORKERS: int = 16
+    S3_MAX_ATTEMPTS: int = 5
+    # Evidence is uploaded in parts of this size (at least 5 MiB), this many in flight per object
+    S3_MULTIPART_PART_SIZE: int = 64 * 1024 * 1024
+    S3_MULTIPART_CONCURRENCY: int = 8
+    # Local read-through cache of evidence objects, keyed by content hash and evicted LRU
+    S3_CACHE_DIR: str = "./s3_cache"
+    S3_CACHE_MAX_BYTES: int = 20 * 1024 * 1024 * 1024
+    S3_CACHE_VERIFY_FILLS: bool = True
+    # How GET /jobs/{id}/evidence serves S3 objects: "proxy" streams ranges through the API,
+    # "presigned" redirects the client to a short-lived URL (S3 then answers the Range requests)
+    EVIDENCE_S3_DELIVERY: str = "proxy"
+    EVIDENCE_STREAM_CHUNK_SIZE: int = 1024 * 1024
+
+    # --- Acquisition Settings ---
+    # Downloads run on one thread pool per platform ("web" is any other URL); these are the
+    # per-platform concurrency limits of a worker process (run Celery with --pool threads)
+    ACQUISITION_PLATFORM_LIMITS: Dict[str, int] = {
+        "youtube": 16, "twitter": 8, "facebook": 8, "instagram": 6, "web": 12
+    }
+    ACQUISITION_DEFAULT_LIMIT: int = 4
+    # Whole download per attempt, queueing included (long enough for hour-long VODs);
+    # the download is cancelled at its next progress callback
+    ACQUISITION_TIMEOUT_SECONDS: float = 4 * 3600
+    # Stalled connections fail after this long instead of holding a pool thread
+    ACQUISITION_SOCKET_TIMEOUT: float = 30.0
+    # Per-job download directories; keep on the filesystem of LOCAL_STORAGE_PATH so that
+    # finished downloads are renamed into storage rather than copied
+    ACQUISITION_WORKSPACE_DIR: str = "./acquisition_workspace"
+    # Workspaces nothing wrote to for this long belong to abandoned jobs and are removed hourly
+    ACQUISITION_WORKSPACE_TTL_HOURS: float = 48
+    # A job interrupted by a worker shutdown is retried (and resumes) up to this many times
+    ACQUISITION_MAX_RESUMES: int = 20
+    ACQUISITION_RESUME_DELAY_SECONDS: int = 10
+    # Direct HTTP downloads: one keep-alive pool per process; servers honouring Range get up to
+    # FETCH_SEGMENTS parallel ranges of at least FETCH_MIN_SEGMENT_BYTES, resumed after interruption
+    FETCH_POOL_CONNECTIONS: int = 64
+    FETCH_SEGMENTS: int = 8
+    FETCH_MIN_SEGMENT_BYTES: int = 8 * 1024 * 1024
+    FETCH_RETRIES: int = 3
+    # Read size per socket read grows from the minimum while chunks arrive quickly
+    FETCH_CHUNK_MIN: int = 64 * 1024
+    FETCH_CHUNK_MAX: int = 1024 * 1024
+    # Batch acquisitions: playlists, channels and profiles are expanded (metadata only) into at
+    # most BATCH_MAX_JOBS child jobs, of which BATCH_MAX_IN_FLIGHT are queued or downloading at once
+    BATCH_MAX_JOBS: int = 1000
+    BATCH_MAX_IN_FLIGHT: int = 10
 
     # --- Redis / Celery Settings ---
     REDIS_HOST: str = "localhost"
@@ -44,6 +163,13 @@ class Settings(BaseSettings):
     # Set USE_CELERY=false to use FastAPI BackgroundTasks instead of Celery
     # Useful for development without Redis/Celery setup
     USE_CELERY: bool = True
+    # Unacknowledged tasks are redelivered by Redis after this long; must exceed the longest URL job
+    CELERY_VISIBILITY_TIMEOUT: int = 6 * 3600
+    # Hard time limit of URL jobs: ACQUISITION_TIMEOUT_SECONDS plus hashing and storage
+    # (keep below CELERY_VISIBILITY_TIMEOUT); the soft limit fires five minutes earlier
+    CELERY_ACQUISITION_TIME_LIMIT: int = 5 * 3600
+    # Hard time limit of integrity sweeps; an interrupted sweep resumes from its checkpoint
+    CELERY_SWEEP_TIME_LIMIT: int = 12 * 3600
 
     @validator("CELERY_BROKER_URL", pre=True, always=True)
     def assemble_celery_broker(cls, v: Optional[str], values: dict) -> str:
@@ -91,6 +217,9 @@ class Settings(BaseSettings):
     RATE_LIMIT_PER_MINUTE: int = 60
     LOG_LEVEL: str = "INFO"
     CHAIN_OF_CUSTODY_LOG_PATH: str = "./chain_of_custody.log"
+    # EVIDENCE_ACCESSED rows are batched: written every this many seconds, or once this many are waiting
+    CUSTODY_ACCESS_FLUSH_SECONDS: float = 5.0
+    CUSTODY_ACCESS_MAX_PENDING: int = 500
     
     # --- Default Admin Credentials ---
     # SECURITY WARNING: These are development defaults only!
@@ -8,7 +8,11 @@ from app.api.v1.endpoints.social import router as social_router
 from app.api.v1.endpoints.profile import router as profile_router
 from app.api.v1.endpoints.dashboard import router as dashboard_router
 from app.api.v1.endpoints.jobs import router as jobs_router
+from app.api.v1.endpoints.batches import router as batches_router
 from app.api.v1.endpoints.auth import router as auth_router
+from app.api.v1.endpoints.integrity import router as integrity_router
+from app.api.v1.endpoints.hashsets import router as hashsets_router
+from app.api.v1.endpoints.storage import router as storage_router
 from app.db.init_db import init_db
 from app.db.session import get_db
 
@@ -26,11 +30,19 @@ async def lifespan(app: FastAPI):
     try:
         from app.db.init_db import create_default_admin
         create_default_admin(db)
+        # Rebuild the in-memory near-duplicate index from stored perceptual hashes
+        from app.services.perceptual import perceptual_index
+        perceptual_index.refresh(db)
     finally:
         db.close()
     
     yield
-    # Cleanup on shutdown (if needed)
+    # Write evidence access entries still waiting in the custody buffer
+    from app.services.custody_buffer import custody_buffer
+    custody_buffer.flush()
+    # Stop downloads still running in background tasks
+    from app.services.acquisition import acquisition_manager
+    acquisition_manager.shutdown()
 
 
 app = FastAPI(title="FEAS API", version="1.0.0", lifespan=lifespan)
@@ -60,6 +72,10 @@ app.include_router(social_router)
 app.include_router(profile_router)
 app.include_router(dashboard_router)
 app.include_router(jobs_router)
+app.include_router(batches_router)
+app.include_router(integrity_router)
+app.include_router(hashsets_router)
+app.include_router(storage_router)
 
 if __name__ == "__main__":
     import uvicorn
@@ -19,6 +19,7 @@ class StorageType(str, Enum):
 class HashAlgorithm(str, Enum):
     SHA256 = "sha256"
     SHA512 = "sha512"
+    SHA1 = "sha1"
     MD5 = "md5"
 
 class EvidenceType(str, Enum):
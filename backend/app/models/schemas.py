@@ -50,16 +50,51 @@ class JobStatusResponse(BaseModel):
     source: str
     progress: float = Field(0.0, ge=0.0, le=100.0)
     stage: Optional[str] = None
+    bytes_processed: Optional[int] = None
+    bytes_total: Optional[int] = None
+    known_file_status: Optional[str] = None
+    original_url: Optional[str] = None
+    batch_id: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
 
+class BatchJobCreate(BaseModel):
+    # Single posts and/or playlist, channel and profile URLs (expanded into one job per item)
+    urls: List[HttpUrl] = Field(..., min_length=1)
+    investigator_id: str = Field(..., min_length=1, max_length=100)
+    case_number: Optional[str] = Field(None, max_length=50)
+    notes: Optional[str] = Field(None, max_length=1000)
+    # Downloads of the batch queued or running at once (capped by BATCH_MAX_IN_FLIGHT)
+    max_in_flight: Optional[int] = Field(None, ge=1)
+
+class BatchStatusResponse(BaseModel):
+    batch_id: str
+    status: str
+    investigator_id: str
+    case_number: Optional[str] = None
+    total_jobs: int
+    progress: float = Field(0.0, ge=0.0, le=100.0)
+    counts: Dict[str, int]
+    waiting: int
+    in_flight: int
+    max_in_flight: int
+    sources: List[Dict[str, Any]] = []
+    skipped: List[Dict[str, Any]] = []
+    created_at: datetime
+    jobs: Optional[List[JobStatusResponse]] = None
+
 class Metadata(BaseModel):
     file_name: Optional[str] = None
     file_size: Optional[int] = None
     mime_type: Optional[str] = None
     sha256_hash: Optional[str] = None
+    hashes: Optional[Dict[str, str]] = None
+    merkle: Optional[Dict[str, Any]] = None
+    fuzzy_hash: Optional[str] = None
+    known_file_status: Optional[str] = None
+    known_file_sets: Optional[List[Dict[str, Any]]] = None
     exif_data: Optional[Dict[str, Any]] = None
     platform_metadata: Optional[Dict[str, Any]] = None
     media_metadata: Optional[Dict[str, Any]] = None
@@ -95,6 +130,7 @@ class VerificationResponse(BaseModel):
     current_hash: str
     matches: bool
     verification_details: Dict[str, Any]
+    changed_ranges: Optional[List[Dict[str, Any]]] = None
 
 class ErrorResponse(BaseModel):
     detail: str
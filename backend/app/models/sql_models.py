@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, DateTime, JSON, ForeignKey, Integer, Boolean
+from sqlalchemy import Column, String, Float, DateTime, JSON, ForeignKey, Integer, BigInteger, Boolean
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -13,12 +13,19 @@ class Job(Base):
     source = Column(String)  # url, local_upload
     progress = Column(Float, default=0.0)
     stage = Column(String)
+    bytes_processed = Column(BigInteger, nullable=True)  # within the current stage
+    bytes_total = Column(BigInteger, nullable=True)
     
     # Metadata
     filename = Column(String, nullable=True)
     file_size = Column(Integer, nullable=True)
     mime_type = Column(String, nullable=True)
     sha256_hash = Column(String, index=True, nullable=True)
+    hashes = Column(JSON, nullable=True)  # {"sha256": ..., "md5": ..., ...}
+    merkle = Column(JSON, nullable=True)  # {"root": ..., "leaf_size": ..., "leaf_count": ...}
+    fuzzy_hash = Column(String, nullable=True)  # TLSH
+    known_file_status = Column(String, index=True, nullable=True)  # known_good, known_bad
+    known_file_sets = Column(JSON, nullable=True)  # [{"set": ..., "status": ..., "algorithm": ...}]
     
     # Investigation Info
     investigator_id = Column(String, index=True)
@@ -29,6 +36,10 @@ class Job(Base):
     # Storage
     storage_path = Column(String, nullable=True)
     
+    # Batch acquisitions: the batch a job was expanded from and its position in it
+    batch_id = Column(String, ForeignKey("acquisition_batches.id"), index=True, nullable=True)
+    batch_index = Column(Integer, nullable=True)
+    
     # Timestamps
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
@@ -36,6 +47,25 @@ class Job(Base):
 
     # Relationships
     custody_logs = relationship("ChainOfCustody", back_populates="job", cascade="all, delete-orphan")
+    segments = relationship("EvidenceSegment", back_populates="job", cascade="all, delete-orphan",
+                            order_by="EvidenceSegment.segment_index")
+    similarity_bands = relationship("SimilarityBand", cascade="all, delete-orphan")
+    perceptual_hashes = relationship("PerceptualHash", cascade="all, delete-orphan",
+                                     order_by="PerceptualHash.frame_index")
+
+class AcquisitionBatch(Base):
+    """URLs, playlists, channels or profiles acquired together as one set of child jobs"""
+    __tablename__ = "acquisition_batches"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    investigator_id = Column(String, index=True)
+    case_number = Column(String, index=True, nullable=True)
+    notes = Column(String, nullable=True)
+    sources = Column(JSON, nullable=True)  # [{"url": ..., "title": ..., "entries": ...}] per expanded collection
+    skipped = Column(JSON, nullable=True)  # [{"url": ..., "reason": ...}]
+    total_jobs = Column(Integer, default=0)
+    max_in_flight = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
 
 class ChainOfCustody(Base):
     __tablename__ = "chain_of_custody"
@@ -50,6 +80,38 @@ class ChainOfCustody(Base):
 
     job = relationship("Job", back_populates="custody_logs")
 
+class EvidenceSegment(Base):
+    """Piecewise SHA-256 of a fixed-size byte range of a job's evidence"""
+    __tablename__ = "evidence_segments"
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(String, ForeignKey("jobs.id"), index=True, nullable=False)
+    segment_index = Column(Integer, nullable=False)
+    offset = Column(BigInteger, nullable=False)
+    length = Column(Integer, nullable=False)
+    sha256 = Column(String(64), nullable=False)
+
+    job = relationship("Job", back_populates="segments")
+
+class SimilarityBand(Base):
+    """One band of a job's TLSH digest, used to find similarity candidates"""
+    __tablename__ = "similarity_bands"
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(String, ForeignKey("jobs.id"), index=True, nullable=False)
+    band = Column(String(16), index=True, nullable=False)
+
+class PerceptualHash(Base):
+    """pHash/dHash of an image, or of one sampled keyframe of a video"""
+    __tablename__ = "perceptual_hashes"
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(String, ForeignKey("jobs.id"), index=True, nullable=False)
+    frame_index = Column(Integer, default=0)
+    timestamp = Column(Float, nullable=True)  # seconds into the video
+    phash = Column(String(16), nullable=False)
+    dhash = Column(String(16), nullable=True)
+
 class User(Base):
     __tablename__ = "users"
     
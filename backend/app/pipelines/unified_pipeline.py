@@ -3,14 +3,20 @@ import os
 import magic 
 import logging  # --- Added Standard Logging ---
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from sqlalchemy.orm import Session
 
 from app.db.session import SessionLocal
-from app.models.sql_models import ChainOfCustody, Job
+from app.models.sql_models import ChainOfCustody, Job, EvidenceSegment, PerceptualHash
+from app.core.config import settings
 from app.models.schemas import JobDetailsResponse, JobStatus
+from app.services.compression import evidence_size
 from app.services.hashing import HashService
+from app.services.hashsets import KnownFileFilter
+from app.services.merkle import MerkleBuilder, MerkleTree, SIDECAR_NAME as MERKLE_SIDECAR, verify_tree, verify_range
 from app.services.metadata import MetadataExtractor
+from app.services.progress import ProgressReporter
+from app.services.similarity import FuzzyHasher, SimilarityIndex, fuzzy_hashing_available
 from app.services.storage import StorageService
 from app.services.pdf_generator import PDFReportGenerator
 from app.core.logger import ForensicLogger
@@ -33,9 +39,14 @@ class UnifiedForensicPipeline:
                      source: str, 
                      filename: str = None,
                      original_url: str = None,
-                     platform_info: Dict[str, Any] = None):
+                     platform_info: Dict[str, Any] = None,
+                     acquisition_receipt: Dict[str, Any] = None):
         """
         Main processing pipeline.
+
+        ``acquisition_receipt`` carries the digests and size recorded while the
+        evidence was being received; when present, the hashing stage only checks
+        the file against it instead of re-reading it.
         """
         db: Session = SessionLocal()
         job = db.query(Job).filter(Job.id == job_id).first()
@@ -57,13 +68,45 @@ class UnifiedForensicPipeline:
             job.status = "processing"
             db.commit()
 
-            sha256_hash = self.hash_service.compute_file_hash(file_path)
+            hashes, segments, merkle_tree, fuzzy_hash, hash_source = self._resolve_hashes(file_path, acquisition_receipt, job_id)
+            sha256_hash = hashes['sha256']
+            job.hashes = hashes
+            job.merkle = merkle_tree.summary() if merkle_tree else None
+            job.fuzzy_hash = fuzzy_hash
+            if fuzzy_hash:
+                SimilarityIndex.index_job(db, job_id, fuzzy_hash)
+            
+            known_file = KnownFileFilter.lookup(hashes)
+            job.known_file_status = known_file['status']
+            job.known_file_sets = known_file['matches'] or None
+            
+            # Only multi-segment evidence benefits from piecewise verification
+            if len(segments) > 1:
+                db.add_all([
+                    EvidenceSegment(
+                        job_id=job_id,
+                        segment_index=segment['index'],
+                        offset=segment['offset'],
+                        length=segment['length'],
+                        sha256=segment['sha256']
+                    ) for segment in segments
+                ])
 
             log = ChainOfCustody(
                 job_id=job_id,
                 event="HASH_CALCULATED",
                 investigator_id=investigator_id,
-                details={"algorithm": "SHA256"},
+                details={
+                    "algorithm": "SHA256",
+                    "algorithms": [name.upper() for name in hashes],
+                    "digests": hashes,
+                    "source": hash_source,
+                    "segment_size": settings.HASH_SEGMENT_SIZE,
+                    "segment_count": len(segments),
+                    "merkle": job.merkle,
+                    "fuzzy_hash": fuzzy_hash,
+                    "known_file": known_file
+                },
                 hash_verification=sha256_hash
             )
             db.add(log)
@@ -86,6 +129,17 @@ class UnifiedForensicPipeline:
                 mime_type = "application/octet-stream"
             
             file_size = os.path.getsize(file_path)
+            
+            perceptual_frames = (metadata.get('perceptual') or {}).get('frames', [])
+            db.add_all([
+                PerceptualHash(
+                    job_id=job_id,
+                    frame_index=frame['index'],
+                    timestamp=frame['timestamp'],
+                    phash=frame['phash'],
+                    dhash=frame['dhash']
+                ) for frame in perceptual_frames
+            ])
 
             log = ChainOfCustody(
                 job_id=job_id,
@@ -94,7 +148,8 @@ class UnifiedForensicPipeline:
                 details={
                     "mime_type": mime_type, 
                     "file_size": file_size,
-                    "platform_detected": platform_info.get('platform') if platform_info else "unknown"
+                    "platform_detected": platform_info.get('platform') if platform_info else "unknown",
+                    "perceptual_frames": len(perceptual_frames)
                 }
             )
             db.add(log)
@@ -113,15 +168,21 @@ class UnifiedForensicPipeline:
             
             storage_metadata = {
                 'basic': {'file_name': final_filename, 'file_size': file_size, 'mime_type': mime_type},
-                'processing_info': {'sha256_hash': sha256_hash, 'investigator_id': investigator_id},
+                'processing_info': {'sha256_hash': sha256_hash, 'hashes': hashes, 'investigator_id': investigator_id},
                 'platform': platform_info
             }
 
+            copy_progress = ProgressReporter(job_id, 60.0, 90.0, file_size)
             storage_result = await self.storage_service.store_evidence(
                 file_path=file_path, 
                 job_id=job_id, 
-                metadata=storage_metadata
+                metadata=storage_metadata,
+                sidecars={MERKLE_SIDECAR: merkle_tree.to_bytes()} if merkle_tree else None,
+                # The working copy is ours (temp upload or download); let storage rename it into place
+                move=True,
+                progress_callback=copy_progress.advance
             )
+            copy_progress.finish()
 
             job.storage_path = storage_result.get('path')
             job.sha256_hash = sha256_hash
@@ -130,7 +191,16 @@ class UnifiedForensicPipeline:
                 job_id=job_id,
                 event="EVIDENCE_STORED",
                 investigator_id=investigator_id,
-                details={"location": storage_result.get('location')}
+                details={
+                    "location": storage_result.get('location'),
+                    "blob_path": storage_result.get('blob_path'),
+                    "deduplicated": storage_result.get('deduplicated', False),
+                    "commit_strategy": storage_result.get('commit_strategy'),
+                    "copy_verified": storage_result.get('copy_verified'),
+                    "compression": storage_result.get('compression'),
+                    "stored_size": storage_result.get('stored_size'),
+                    "blob_refcount": storage_result.get('refcount')
+                }
             )
             db.add(log)
             db.commit()
@@ -152,6 +222,11 @@ class UnifiedForensicPipeline:
                     "file_size": job.file_size,
                     "mime_type": job.mime_type,
                     "sha256_hash": job.sha256_hash,
+                    "hashes": job.hashes,
+                    "merkle": job.merkle,
+                    "fuzzy_hash": job.fuzzy_hash,
+                    "known_file_status": job.known_file_status,
+                    "known_file_sets": job.known_file_sets,
                     "extraction_timestamp": datetime.utcnow(),
                     "exif_data": metadata.get("exif"),
                     "media_metadata": metadata.get("media"),
@@ -205,9 +280,96 @@ class UnifiedForensicPipeline:
         finally:
             db.close()
 
-    def verify_integrity(self, file_path: str, original_hash: str, job_id: str, investigator_id: str):
-        """Verifies if the current file hash matches the original chain of custody hash."""
-        current_hash = self.hash_service.compute_file_hash(file_path)
+    def _resolve_hashes(self, file_path: str, acquisition_receipt: Optional[Dict[str, Any]], job_id: str = None):
+        """Return (digests, segments, merkle_tree, fuzzy_hash, source), reusing digests fixed at receipt when they still apply"""
+        required = self.hash_service.normalize_algorithms()
+        merkle_enabled = settings.HASH_MERKLE_ENABLED
+        fuzzy_enabled = fuzzy_hashing_available()
+        
+        if acquisition_receipt:
+            receipt_hashes = acquisition_receipt.get('hashes') or {}
+            receipt_size = acquisition_receipt.get('file_size')
+            
+            if receipt_size is not None and os.path.getsize(file_path) != receipt_size:
+                raise ValueError(
+                    f"File size changed since receipt ({receipt_size} -> {os.path.getsize(file_path)} bytes)"
+                )
+            
+            # Cheap path: everything we need was hashed while the upload was written
+            has_merkle = 'merkle_leaves' in acquisition_receipt
+            if (all(name in receipt_hashes for name in required) and 'segments' in acquisition_receipt
+                    and (has_merkle or not merkle_enabled)
+                    and ('fuzzy_hash' in acquisition_receipt or not fuzzy_enabled)):
+                merkle_tree = MerkleTree.from_leaves(
+                    acquisition_receipt['merkle_leaf_size'],
+                    receipt_size,
+                    [bytes.fromhex(leaf) for leaf in acquisition_receipt['merkle_leaves']]
+                ) if merkle_enabled else None
+                return ({name: receipt_hashes[name] for name in required},
+                        acquisition_receipt['segments'], merkle_tree,
+                        acquisition_receipt.get('fuzzy_hash'), "acquisition_receipt")
+        
+        # One read pass feeds every configured digest plus the segment digests, Merkle leaves and TLSH
+        consumers = {}
+        if merkle_enabled:
+            consumers['merkle'] = MerkleBuilder()
+        if fuzzy_enabled:
+            consumers['fuzzy'] = FuzzyHasher()
+        progress = ProgressReporter(job_id, 10.0, 30.0, os.path.getsize(file_path)) if job_id else None
+        digests = self.hash_service.digest_file(file_path, required, segment_size=settings.HASH_SEGMENT_SIZE,
+                                                consumers=consumers,
+                                                progress_callback=progress.advance if progress else None)
+        if progress:
+            progress.finish()
+        hashes = digests.hexdigests()
+        merkle_tree = digests.consumers['merkle'].tree() if merkle_enabled else None
+        fuzzy_hash = digests.consumers['fuzzy'].hexdigest() if fuzzy_enabled else None
+        
+        if acquisition_receipt:
+            receipt_sha256 = (acquisition_receipt.get('hashes') or {}).get('sha256')
+            if receipt_sha256 and receipt_sha256 != hashes['sha256']:
+                raise ValueError("SHA-256 does not match the digest recorded at receipt")
+        
+        return hashes, digests.segments(), merkle_tree, fuzzy_hash, "file_read"
+
+    def verify_integrity(self, file_path: str, original_hash: str, job_id: str, investigator_id: str,
+                         segments: List[Dict[str, Any]] = None, file_size: int = None,
+                         merkle_tree: MerkleTree = None, merkle_root: str = None):
+        """Verifies if the current file hash matches the original chain of custody hash.
+
+        When a Merkle tree or per-segment digests were recorded, the leaves or
+        segments are re-hashed in parallel and the exact byte ranges that
+        changed are reported. If everything (and the size) matches, the bytes
+        are identical and so is the whole-file SHA-256; the flat hash is only
+        recomputed on a mismatch.
+        """
+        changed_ranges = None
+        method = "sha256"
+        
+        if merkle_tree is not None:
+            method = "merkle"
+            result = verify_tree(file_path, merkle_tree, expected_root=merkle_root)
+            changed_ranges = result['changed_ranges']
+            current_hash = original_hash if result['matches'] else self.hash_service.compute_file_hash(file_path)
+        elif segments and len(segments) > 1:
+            method = "segmented"
+            current_size = evidence_size(file_path)
+            changed = self.hash_service.verify_segments(file_path, segments)
+            changed_ranges = [
+                {"segment": s['index'], "offset": s['offset'], "length": s['length']} for s in changed
+            ]
+            recorded_end = segments[-1]['offset'] + segments[-1]['length']
+            if current_size > recorded_end:
+                changed_ranges.append({"segment": None, "offset": recorded_end, "length": current_size - recorded_end})
+            
+            size_matches = file_size is None or current_size == file_size
+            if not changed_ranges and size_matches:
+                current_hash = original_hash
+            else:
+                current_hash = self.hash_service.compute_file_hash(file_path)
+        else:
+            current_hash = self.hash_service.compute_file_hash(file_path)
+        
         matches = (current_hash == original_hash)
         
         return {
@@ -216,8 +378,17 @@ class UnifiedForensicPipeline:
             "original_hash": original_hash,
             "current_hash": current_hash,
             "matches": matches,
+            "changed_ranges": changed_ranges,
             "verification_details": {
                 "verified_by": investigator_id,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": datetime.utcnow().isoformat(),
+                "method": method,
+                "segments_checked": len(segments) if method == "segmented" else 0,
+                "merkle_root": merkle_root if method == "merkle" else None
             }
-        }
\ No newline at end of file
+        }
+
+    def verify_byte_range(self, file_path: str, merkle_tree: MerkleTree, merkle_root: str,
+                          start: int, end: int) -> Dict[str, Any]:
+        """Prove that bytes [start, end) are intact by re-reading only the covering leaves"""
+        return verify_range(file_path, merkle_tree, start, end, expected_root=merkle_root)
\ No newline at end of file
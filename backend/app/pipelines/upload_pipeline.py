@@ -1,5 +1,5 @@
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from sqlalchemy.orm import Session
 
 from app.db.session import SessionLocal
@@ -19,7 +19,8 @@ class UploadPipeline:
                               file_path: str,
                               filename: str,
                               job_id: str,
-                              investigator_id: str) -> Dict[str, Any]:
+                              investigator_id: str,
+                              acquisition_receipt: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Process an existing file through the pipeline"""
         db: Session = SessionLocal()
         job = db.query(Job).filter(Job.id == job_id).first()
@@ -41,7 +42,8 @@ class UploadPipeline:
                 job_id=job_id,
                 investigator_id=investigator_id,
                 source='local_upload',
-                filename=filename
+                filename=filename,
+                acquisition_receipt=acquisition_receipt
             )
             
             return process_result
@@ -7,6 +7,8 @@ from sqlalchemy.orm import Session
 from app.db.session import SessionLocal
 from app.models.sql_models import Job
 from app.services.downloader import URLDownloader
+from app.services.acquisition import release_workspace
+from app.services.progress import ProgressReporter
 from app.pipelines.unified_pipeline import UnifiedForensicPipeline
 from app.core.logger import ForensicLogger
 
@@ -27,8 +29,14 @@ class URLPipeline:
         
         db: Session = SessionLocal()
         job = db.query(Job).filter(Job.id == job_id).first()
+        keep_workspace = False
         
         try:
+            if job.status == 'completed':
+                # A redelivered task for a job that already finished
+                logger.info(f"URL job {job_id} already completed; nothing to do")
+                return {'success': True, 'job_id': job_id, 'already_completed': True}
+            
             # Stage 1: Validation & Status Update
             job.status = "processing"
             job.stage = "URL Validation"
@@ -44,7 +52,7 @@ class URLPipeline:
             
             # Stage 2: Download
             job.stage = "Downloading"
-            job.progress = 15.0
+            job.progress = 5.0
             db.commit()
             
             ForensicLogger.log_processing(
@@ -54,10 +62,20 @@ class URLPipeline:
                 details={"platform": platform_str}
             )
             
-            download_result = await self.downloader.download(url)
+            # The unified pipeline picks up at 10% once the file is local
+            download_progress = ProgressReporter(job_id, 5.0, 10.0)
+            download_result = await self.downloader.download(url, download_progress, job_id)
             
             if not download_result['success']:
+                if download_result.get('resumable'):
+                    # Worker shutdown: leave the partial download for the retried task to resume
+                    keep_workspace = True
+                    job.status = 'pending'
+                    job.stage = 'Download interrupted'
+                    db.commit()
+                    return {'success': False, 'error': download_result.get('error'), 'interrupted': True}
                 raise Exception(f"Download failed: {download_result.get('error')}")
+            download_progress.finish()
             
             # Stage 3: Unified Processing
             process_result = await self.unified_pipeline.process(
@@ -70,7 +88,9 @@ class URLPipeline:
                 platform_info={
                     'platform': platform_str,
                     'metadata': download_result.get('platform_metadata')
-                }
+                },
+                # Direct downloads were hashed as they landed; yt-dlp results are hashed by the pipeline
+                acquisition_receipt=download_result.get('acquisition_receipt')
             )
             
             return process_result
@@ -82,4 +102,19 @@ class URLPipeline:
             db.commit()
             return {'success': False, 'error': str(e)}
         finally:
-            db.close()
\ No newline at end of file
+            # Storage has renamed the evidence out by now; drop partial downloads and leftovers
+            if not keep_workspace:
+                release_workspace(job_id)
+            db.close()
+    
+    @staticmethod
+    def fail_job(job_id: str, error: str) -> None:
+        """Mark a job failed and drop its workspace (when it cannot be retried any more)"""
+        db: Session = SessionLocal()
+        try:
+            db.query(Job).filter(Job.id == job_id).update({Job.status: 'failed', Job.notes: error},
+                                                          synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        release_workspace(job_id)
\ No newline at end of file
@@ -0,0 +1,263 @@
+"""Running blocking acquisition work (yt-dlp, HTTP downloads) off the event loop."""
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from app.core.config import settings
+from app.storage.sidecar import write_atomic
+
+logger = logging.getLogger(__name__)
+
+# Written to a job's workspace once its download is complete
+CHECKPOINT_FILE = "acquisition.json"
+
+
+class AcquisitionCancelled(Exception):
+    """Raised inside a download once its acquisition was cancelled or timed out.
+
+    ``resumable`` is set when the download was only interrupted (the worker
+    is shutting down) and its workspace should be kept for a retry.
+    """
+
+    def __init__(self, message: str, resumable: bool = False):
+        super().__init__(message)
+        self.resumable = resumable
+
+
+def _workspace_path(job_id: str) -> Path:
+    if not job_id or "/" in job_id or "\\" in job_id or job_id.startswith("."):
+        raise ValueError(f"Invalid acquisition workspace name: {job_id!r}")
+    return Path(settings.ACQUISITION_WORKSPACE_DIR) / job_id
+
+
+def acquisition_workspace(job_id: str) -> Path:
+    """The job's directory for downloads in progress, created on demand.
+
+    Downloaders write straight into it and storage renames the finished
+    file out of it, so evidence is never copied through memory.
+    """
+    path = _workspace_path(job_id)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def release_workspace(job_id: str) -> None:
+    """Remove the job's workspace and anything left in it"""
+    shutil.rmtree(_workspace_path(job_id), ignore_errors=True)
+
+
+def save_checkpoint(job_id: str, download: Dict[str, Any]) -> None:
+    """Record a finished download so a retried job skips straight past it"""
+    data = json.dumps(download, default=str).encode("utf-8")
+    write_atomic(acquisition_workspace(job_id) / CHECKPOINT_FILE, data)
+
+
+def load_checkpoint(job_id: str) -> Optional[Dict[str, Any]]:
+    """The job's finished download, if its workspace still holds the file"""
+    try:
+        checkpoint = json.loads((_workspace_path(job_id) / CHECKPOINT_FILE).read_text())
+        if os.path.getsize(checkpoint["file_path"]) == checkpoint["file_size"]:
+            return checkpoint
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def cleanup_workspaces(ttl_seconds: float = None, active: Iterable[str] = ()) -> Dict[str, int]:
+    """Remove workspaces nothing has written to for ``ttl_seconds`` (jobs abandoned mid-download).
+
+    A download in progress keeps touching its files, and an interrupted one
+    waiting for its retry is well inside the TTL, so only workspaces whose
+    job will never come back are removed.
+    """
+    ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.ACQUISITION_WORKSPACE_TTL_HOURS * 3600
+    root = Path(settings.ACQUISITION_WORKSPACE_DIR)
+    cutoff = time.time() - ttl_seconds
+    active = set(active)
+    stats = {"removed": 0, "kept": 0, "bytes_freed": 0}
+    if not root.is_dir():
+        return stats
+    for workspace in root.iterdir():
+        if not workspace.is_dir() or workspace.name in active:
+            stats["kept"] += 1
+            continue
+        try:
+            entries = [workspace.stat()] + [entry.stat() for entry in workspace.rglob("*")]
+        except OSError:
+            # Released while being scanned
+            continue
+        if max(entry.st_mtime for entry in entries) > cutoff:
+            stats["kept"] += 1
+            continue
+        shutil.rmtree(workspace, ignore_errors=True)
+        stats["removed"] += 1
+        stats["bytes_freed"] += sum(entry.st_size for entry in entries[1:])
+        logger.info(f"Removed abandoned acquisition workspace {workspace.name}")
+    return stats
+
+
+class Acquisition:
+    """One download submitted to the manager"""
+
+    def __init__(self, job_id: str, platform: str):
+        self.job_id = job_id
+        self.platform = platform
+        self.submitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.cancel_event = threading.Event()
+        self.reason: Optional[str] = None
+        self.resumable = False
+
+    def cancel(self, reason: str = "cancelled", resumable: bool = False) -> None:
+        if not self.cancel_event.is_set():
+            self.reason, self.resumable = reason, resumable
+        self.cancel_event.set()
+
+    def check(self) -> None:
+        """Abort the calling download if the acquisition was cancelled (used from progress hooks)"""
+        if self.cancel_event.is_set():
+            raise AcquisitionCancelled(f"Acquisition of job {self.job_id} {self.reason}", self.resumable)
+
+
+class AcquisitionManager:
+    """Bounded, per-platform thread pools for downloads.
+
+    The extractors are blocking, so ``run`` hands them to a worker thread
+    and awaits the result; the event loop (and every other acquisition on
+    it) keeps running. Each platform has its own pool, sized by
+    ``ACQUISITION_PLATFORM_LIMITS``, so a slow or rate-limited site queues
+    its own jobs without starving the others. Threads rather than
+    processes: downloads are network-bound and the progress hooks, which
+    are also the cancellation points, need the job's shared state.
+
+    A download is cancelled by setting its event: one still queued never
+    starts, a running one raises ``AcquisitionCancelled`` at its next
+    progress hook. Timeouts cancel the same way.
+    """
+
+    def __init__(self, limits: Dict[str, int] = None, default_limit: int = None, timeout: float = None):
+        self.limits = dict(limits if limits is not None else settings.ACQUISITION_PLATFORM_LIMITS)
+        self.default_limit = default_limit or settings.ACQUISITION_DEFAULT_LIMIT
+        self.timeout = timeout if timeout is not None else settings.ACQUISITION_TIMEOUT_SECONDS
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        self._active: Dict[str, Acquisition] = {}
+        self._running: Dict[str, int] = {}
+        self._completed = 0
+        self._cancelled = 0
+        self._lock = threading.Lock()
+
+    def _executor(self, platform: str) -> ThreadPoolExecutor:
+        with self._lock:
+            executor = self._executors.get(platform)
+            if executor is None:
+                executor = self._executors[platform] = ThreadPoolExecutor(
+                    max_workers=self.limits.get(platform, self.default_limit),
+                    thread_name_prefix=f"acquire-{platform}"
+                )
+            return executor
+
+    def _call(self, acquisition: Acquisition, fn: Callable[..., Any], args: tuple) -> Any:
+        acquisition.check()
+        acquisition.started_at = time.monotonic()
+        with self._lock:
+            self._running[acquisition.platform] = self._running.get(acquisition.platform, 0) + 1
+        try:
+            return fn(*args, acquisition=acquisition)
+        finally:
+            with self._lock:
+                self._running[acquisition.platform] -= 1
+
+    async def run(self, job_id: str, platform: str, fn: Callable[..., Any], *args: Any,
+                  timeout: float = None) -> Any:
+        """Run ``fn(*args, acquisition=...)`` on the platform's pool and await it.
+
+        Raises ``AcquisitionCancelled`` if the job is cancelled and
+        ``asyncio.TimeoutError`` once ``timeout`` seconds (queueing
+        included) have passed.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        acquisition = Acquisition(job_id, platform)
+        with self._lock:
+            if job_id in self._active:
+                raise ValueError(f"Job {job_id} is already being acquired")
+            self._active[job_id] = acquisition
+        future = self._executor(platform).submit(self._call, acquisition, fn, args)
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout or None)
+        except asyncio.TimeoutError:
+            acquisition.cancel(f"timed out after {timeout} s")
+            future.cancel()
+            logger.warning(f"Acquisition of job {job_id} timed out after {timeout} s")
+            raise
+        except asyncio.CancelledError:
+            if future.cancelled() and acquisition.cancel_event.is_set():
+                # Still queued when the pools shut down
+                raise AcquisitionCancelled(f"Acquisition of job {job_id} {acquisition.reason}",
+                                           acquisition.resumable)
+            # The awaiting task went away; stop the download rather than leave it running
+            acquisition.cancel()
+            future.cancel()
+            raise
+        finally:
+            with self._lock:
+                self._active.pop(job_id, None)
+                if acquisition.cancel_event.is_set():
+                    self._cancelled += 1
+                else:
+                    self._completed += 1
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running acquisition in this process; False if there is none"""
+        with self._lock:
+            acquisition = self._active.get(job_id)
+        if acquisition is None:
+            return False
+        acquisition.cancel()
+        logger.info(f"Acquisition of job {job_id} cancelled")
+        return True
+
+    def active_jobs(self) -> Iterable[str]:
+        with self._lock:
+            return list(self._active)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-platform limit, running and queued counts for this process"""
+        with self._lock:
+            platforms = {}
+            for platform in sorted(set(self.limits) | set(self._executors)):
+                executor = self._executors.get(platform)
+                platforms[platform] = {
+                    "limit": self.limits.get(platform, self.default_limit),
+                    "running": self._running.get(platform, 0),
+                    "queued": executor._work_queue.qsize() if executor is not None else 0
+                }
+            return {
+                "platforms": platforms,
+                "running": sum(p["running"] for p in platforms.values()),
+                "queued": sum(p["queued"] for p in platforms.values()),
+                "active_jobs": len(self._active),
+                "completed": self._completed,
+                "cancelled": self._cancelled
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Cancel everything and stop the pools"""
+        with self._lock:
+            active = list(self._active.values())
+            executors, self._executors = list(self._executors.values()), {}
+        for acquisition in active:
+            # Downloads keep their workspace and partial files; the retried job resumes them
+            acquisition.cancel("interrupted by shutdown", resumable=True)
+        for executor in executors:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+acquisition_manager = AcquisitionManager()
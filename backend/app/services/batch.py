@@ -0,0 +1,270 @@
+"""Batch acquisitions: expanding playlists, channels and profiles into child jobs."""
+
+import logging
+import re
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import yt_dlp
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logger import ForensicLogger
+from app.db.session import SessionLocal
+from app.models.schemas import Platform
+from app.models.sql_models import AcquisitionBatch, Job
+from app.services.downloader import URLDownloader
+
+logger = logging.getLogger(__name__)
+
+# Stage of a batch job not yet handed to a worker; dispatching moves it to QUEUED_STAGE
+WAITING_STAGE = "Waiting in batch"
+QUEUED_STAGE = "Initialization"
+TERMINAL_STATUSES = ("completed", "failed")
+
+# Paths naming a collection (playlist, channel or profile) rather than a single post
+COLLECTION_PATHS = {
+    Platform.YOUTUBE: re.compile(r"^/(playlist|channel/|c/|user/|@)"),
+    Platform.TWITTER: re.compile(r"^/[A-Za-z0-9_]{1,15}(/media)?/?$"),
+    Platform.INSTAGRAM: re.compile(r"^/[A-Za-z0-9_.]+/?$"),
+    Platform.FACEBOOK: re.compile(r"^/[^/]+/videos/?$"),
+}
+
+# Channel pages list their tabs (videos, shorts, live), which are collections themselves
+MAX_NESTING = 2
+
+
+def is_collection(url: str, platform: Optional[Platform]) -> bool:
+    """Whether the URL lists several items to be expanded before acquisition"""
+    parsed = urlparse(url)
+    if platform == Platform.YOUTUBE and parse_qs(parsed.query).get("list"):
+        return True
+    pattern = COLLECTION_PATHS.get(platform)
+    return bool(pattern and pattern.match(parsed.path or "/"))
+
+
+class BatchExpander:
+    """Turns the submitted URLs into the list of items to acquire.
+
+    Single posts pass straight through without any request. Collections
+    are listed with one metadata-only yt-dlp pass (``extract_flat``): only
+    the playlist pages are fetched, never the items themselves, and one
+    ``YoutubeDL`` with its extractors already set up serves every
+    collection of the batch.
+    """
+
+    def __init__(self, max_items: int = None):
+        self.max_items = max_items or settings.BATCH_MAX_JOBS
+        self.downloader = URLDownloader()
+
+    @staticmethod
+    def _options() -> Dict[str, Any]:
+        return {
+            'quiet': True,
+            'no_warnings': True,
+            'skip_download': True,
+            'extract_flat': 'in_playlist',
+            'socket_timeout': settings.ACQUISITION_SOCKET_TIMEOUT,
+        }
+
+    def expand(self, urls: Iterable[str]) -> Dict[str, Any]:
+        """``items`` (URLs in submission order, deduplicated), the expanded ``sources`` and ``skipped`` URLs"""
+        result = {'items': [], 'sources': [], 'skipped': [], 'truncated': False}
+        seen = set()
+        ydl = None
+        try:
+            for url in urls:
+                if len(result['items']) >= self.max_items:
+                    result['truncated'] = True
+                    result['skipped'].append({'url': url, 'reason': f'Batch limit of {self.max_items} items reached'})
+                    continue
+                if not self.downloader.validate_url(url):
+                    result['skipped'].append({'url': url, 'reason': 'URL domain not whitelisted'})
+                    continue
+                if not is_collection(url, self.downloader.detect_platform(url)):
+                    self._add(result, seen, url)
+                    continue
+                if ydl is None:
+                    ydl = yt_dlp.YoutubeDL(self._options())
+                try:
+                    self._expand_collection(ydl, url, result, seen)
+                except Exception as e:
+                    logger.warning(f"Expanding {url} failed: {str(e)}")
+                    result['skipped'].append({'url': url, 'reason': str(e)})
+        finally:
+            if ydl is not None:
+                ydl.close()
+        return result
+
+    def _add(self, result: Dict[str, Any], seen: set, url: str) -> bool:
+        if len(result['items']) >= self.max_items:
+            result['truncated'] = True
+            return False
+        if url not in seen:
+            seen.add(url)
+            result['items'].append(url)
+        return True
+
+    def _expand_collection(self, ydl, url: str, result: Dict[str, Any], seen: set, depth: int = 0) -> None:
+        # Never list more entries than the batch still has room for
+        remaining = self.max_items - len(result['items'])
+        if remaining <= 0:
+            result['truncated'] = True
+            return
+        ydl.params['playlistend'] = remaining
+        info = ydl.extract_info(url, download=False)
+        if info.get('_type') not in ('playlist', 'multi_video'):
+            self._add(result, seen, info.get('webpage_url') or url)
+            return
+
+        source = {'url': url, 'id': info.get('id'), 'title': info.get('title'),
+                  'uploader': info.get('uploader'), 'entries': 0}
+        result['sources'].append(source)
+        for entry in info.get('entries') or []:
+            entry_url = entry and (entry.get('url') or entry.get('webpage_url'))
+            if not entry_url:
+                continue
+            if depth < MAX_NESTING and (entry.get('_type') == 'playlist' or
+                                        is_collection(entry_url, self.downloader.detect_platform(entry_url))):
+                self._expand_collection(ydl, entry_url, result, seen, depth + 1)
+                continue
+            if not self.downloader.validate_url(entry_url):
+                result['skipped'].append({'url': entry_url, 'reason': 'URL domain not whitelisted'})
+                continue
+            if not self._add(result, seen, entry_url):
+                break
+            source['entries'] += 1
+
+
+def create_batch(db: Session, expansion: Dict[str, Any], investigator_id: str, case_number: str = None,
+                 notes: str = None, max_in_flight: int = None) -> AcquisitionBatch:
+    """Record the batch and all of its child jobs, waiting to be dispatched, in one transaction.
+
+    The jobs go in as a single executemany insert rather than one ORM
+    flush per row.
+    """
+    limit = min(max_in_flight or settings.BATCH_MAX_IN_FLIGHT, settings.BATCH_MAX_IN_FLIGHT)
+    batch = AcquisitionBatch(
+        id=str(uuid.uuid4()), investigator_id=investigator_id, case_number=case_number, notes=notes,
+        sources=expansion['sources'], skipped=expansion['skipped'], total_jobs=len(expansion['items']),
+        max_in_flight=limit
+    )
+    db.add(batch)
+    db.flush()
+    jobs = [{
+        'id': str(uuid.uuid4()), 'status': 'pending', 'source': 'url', 'original_url': url,
+        'investigator_id': investigator_id, 'case_number': case_number, 'notes': notes,
+        'stage': WAITING_STAGE, 'progress': 0.0, 'batch_id': batch.id, 'batch_index': index
+    } for index, url in enumerate(expansion['items'])]
+    if jobs:
+        db.execute(insert(Job), jobs)
+    db.commit()
+
+    for job in jobs:
+        ForensicLogger.log_acquisition(job_id=job['id'], source='url', investigator_id=investigator_id,
+                                       url=job['original_url'])
+    logger.info(f"Batch {batch.id}: {len(jobs)} jobs from {len(expansion['sources'])} collections, "
+                f"{len(expansion['skipped'])} URLs skipped")
+    return batch
+
+
+def claim_batch_jobs(batch_id: str) -> List[Dict[str, Any]]:
+    """Queue the batch's next waiting jobs, as many as its in-flight limit leaves room for.
+
+    Called when the batch is submitted and again whenever one of its jobs
+    finishes, so at most ``max_in_flight`` of them are ever queued or
+    downloading. The batch row is locked while counting, so two jobs
+    finishing together cannot both fill the same slot.
+    """
+    db: Session = SessionLocal()
+    try:
+        batch = db.query(AcquisitionBatch).filter(AcquisitionBatch.id == batch_id).with_for_update().first()
+        if batch is None:
+            return []
+        in_flight = db.query(func.count(Job.id)).filter(
+            Job.batch_id == batch_id, Job.status.notin_(TERMINAL_STATUSES), Job.stage != WAITING_STAGE
+        ).scalar()
+        slots = (batch.max_in_flight or settings.BATCH_MAX_IN_FLIGHT) - in_flight
+        if slots <= 0:
+            db.commit()
+            return []
+        jobs = db.query(Job).filter(
+            Job.batch_id == batch_id, Job.status == 'pending', Job.stage == WAITING_STAGE
+        ).order_by(Job.batch_index).limit(slots).all()
+        claimed = [{'job_id': job.id, 'url': job.original_url, 'investigator_id': job.investigator_id,
+                    'case_number': job.case_number} for job in jobs]
+        for job in jobs:
+            job.stage = QUEUED_STAGE
+        db.commit()
+        return claimed
+    finally:
+        db.close()
+
+
+def release_batch_jobs(job_ids: List[str]) -> None:
+    """Put claimed jobs that could not be queued back in line"""
+    db: Session = SessionLocal()
+    try:
+        db.query(Job).filter(Job.id.in_(job_ids), Job.status == 'pending', Job.stage == QUEUED_STAGE).update(
+            {Job.stage: WAITING_STAGE}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def cancel_batch(db: Session, batch_id: str) -> int:
+    """Fail the batch's jobs still waiting; those already queued or downloading run to the end"""
+    cancelled = db.query(Job).filter(
+        Job.batch_id == batch_id, Job.status == 'pending', Job.stage == WAITING_STAGE
+    ).update({Job.status: 'failed', Job.stage: 'Cancelled', Job.notes: 'Batch cancelled'},
+             synchronize_session=False)
+    db.commit()
+    return cancelled
+
+
+def batch_status(db: Session, batch: AcquisitionBatch, include_jobs: bool = False) -> Dict[str, Any]:
+    """Aggregate the child jobs' state with a couple of GROUP BY queries rather than loading them"""
+    counts, done = {}, 0.0
+    rows = db.query(Job.status, func.count(Job.id), func.coalesce(func.sum(Job.progress), 0.0)).filter(
+        Job.batch_id == batch.id).group_by(Job.status).all()
+    for status, count, progress in rows:
+        counts[status] = count
+        # A failed job is as finished as a completed one as far as the batch is concerned
+        done += 100.0 * count if status in TERMINAL_STATUSES else progress
+    waiting = db.query(func.count(Job.id)).filter(
+        Job.batch_id == batch.id, Job.status == 'pending', Job.stage == WAITING_STAGE).scalar()
+    total = sum(counts.values())
+    finished = sum(counts.get(status, 0) for status in TERMINAL_STATUSES)
+
+    if total and finished == total:
+        if not counts.get('failed'):
+            status = 'completed'
+        elif counts.get('completed'):
+            status = 'completed_with_errors'
+        else:
+            status = 'failed'
+    elif total and waiting == total:
+        status = 'pending'
+    else:
+        status = 'processing' if total else 'completed'
+
+    response = {
+        'batch_id': batch.id,
+        'status': status,
+        'investigator_id': batch.investigator_id,
+        'case_number': batch.case_number,
+        'total_jobs': total,
+        'progress': round(done / total, 2) if total else 100.0,
+        'counts': counts,
+        'waiting': waiting,
+        'in_flight': total - finished - waiting,
+        'max_in_flight': batch.max_in_flight or settings.BATCH_MAX_IN_FLIGHT,
+        'sources': batch.sources or [],
+        'skipped': batch.skipped or [],
+        'created_at': batch.created_at,
+    }
+    if include_jobs:
+        response['jobs'] = db.query(Job).filter(Job.batch_id == batch.id).order_by(Job.batch_index).all()
+    return response
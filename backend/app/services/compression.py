@@ -0,0 +1,279 @@
+"""Seekable zstd compression of evidence at rest.
+
+Stored files use the zstd seekable format: the data is cut into
+independently compressed frames, followed by a skippable frame holding a
+seek table (compressed and decompressed size of every frame). A reader
+decompresses only the frames covering the bytes it needs, so range
+requests, previews and segment verification stay random-access. Files in
+this format carry the ``.zst`` suffix. Every evidence digest is computed
+over the original bytes.
+
+Only storage decides what is compressed: a file is read as zstd when it
+lies in a directory a storage backend owns, has the suffix and ends in a
+seek table. Acquisition inputs (uploads, downloads) named ``*.zst`` are
+read as they are, and raw evidence is never stored under the suffix.
+"""
+
+import bisect
+import hashlib
+import io
+import logging
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Any, Callable, Iterable, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+COMPRESSED_SUFFIX = ".zst"
+FORMAT_NAME = "zstd-seekable"
+SKIPPABLE_MAGIC = 0x184D2A5E
+SEEKABLE_MAGIC = 0x8F92EAB1
+SEEK_ENTRY = struct.Struct("<II")  # compressed size, decompressed size
+SEEK_FOOTER = struct.Struct("<IBI")  # frame count, descriptor, seekable magic
+SKIPPABLE_HEADER = struct.Struct("<II")  # magic, frame size
+# Raw evidence whose own name ends in .zst is stored with this appended
+RAW_SUFFIX = ".raw"
+# Subdirectories of a storage root holding acquisition inputs rather than stored evidence
+INPUT_DIRS = ("temp_uploads",)
+
+# Directories storage backends write evidence into (see register_storage_root)
+_storage_roots = set()
+
+
+def compression_available() -> bool:
+    return zstandard is not None and settings.STORAGE_COMPRESSION_ENABLED
+
+
+def register_storage_root(path) -> None:
+    """Called by a storage backend for the directory it keeps (or caches) evidence in"""
+    _storage_roots.add(Path(path).resolve())
+
+
+def _in_storage(path: Path) -> bool:
+    roots = _storage_roots | {Path(settings.LOCAL_STORAGE_PATH).resolve(), Path(settings.S3_CACHE_DIR).resolve()}
+    inputs = {Path(settings.ACQUISITION_WORKSPACE_DIR).resolve()} | {root / name for root in roots for name in INPUT_DIRS}
+    parents = set(path.parents)
+    return bool(parents & roots) and not parents & inputs
+
+
+def has_seek_table(file_path) -> bool:
+    """Whether the file ends in a seekable zstd seek table"""
+    try:
+        with open(file_path, "rb") as f:
+            f.seek(-SEEK_FOOTER.size, os.SEEK_END)
+            return SEEK_FOOTER.unpack(f.read(SEEK_FOOTER.size))[2] == SEEKABLE_MAGIC
+    except (OSError, struct.error):
+        return False
+
+
+def is_compressed(file_path) -> bool:
+    """Whether the file is evidence storage compressed (and so is read through SeekableZstdReader)"""
+    if not str(file_path).endswith(COMPRESSED_SUFFIX):
+        return False
+    return _in_storage(Path(file_path).resolve()) and has_seek_table(file_path)
+
+
+def stored_suffix(original_suffix: str, compressed: bool) -> str:
+    """Suffix of a stored evidence name; only evidence storage compressed ends in ``.zst``"""
+    if compressed:
+        return original_suffix + COMPRESSED_SUFFIX
+    if original_suffix.lower().endswith(COMPRESSED_SUFFIX):
+        return original_suffix + RAW_SUFFIX
+    return original_suffix
+
+
+def should_compress(mime_type: Optional[str], file_path: str = None) -> bool:
+    """Whether evidence of this type is worth compressing.
+
+    Formats that are already compressed (JPEG, MP4, MP3, ...) are skipped by
+    type; for anything else with a file at hand, the first frame is test
+    compressed and the file is skipped if it saves too little.
+    """
+    if not compression_available():
+        return False
+    if mime_type and mime_type.lower() in settings.STORAGE_COMPRESSION_SKIP_MIME_TYPES:
+        return False
+    if file_path is None:
+        return True
+    with open(file_path, "rb") as f:
+        sample = f.read(settings.STORAGE_COMPRESSION_FRAME_SIZE)
+    if not sample:
+        return False
+    compressed = zstandard.ZstdCompressor(level=settings.STORAGE_COMPRESSION_LEVEL).compress(sample)
+    return 1 - len(compressed) / len(sample) >= settings.STORAGE_COMPRESSION_MIN_SAVINGS
+
+
+class SeekableZstdWriter:
+    """Compresses a stream of chunks into the seekable format on ``dest`` (anything with ``write``).
+
+    The SHA-256 and size of the original bytes are tracked as they pass
+    through, so the caller can check the input without reading it again.
+    """
+
+    def __init__(self, dest, frame_size: int = None, level: int = None):
+        self.dest = dest
+        self.frame_size = frame_size or settings.STORAGE_COMPRESSION_FRAME_SIZE
+        self._compressor = zstandard.ZstdCompressor(level=level or settings.STORAGE_COMPRESSION_LEVEL,
+                                                    write_checksum=True)
+        self._buffer = bytearray()
+        self._entries: List[bytes] = []
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.stored_size = 0
+
+    def write(self, chunk) -> None:
+        view = memoryview(chunk)
+        self.sha256.update(view)
+        self.size += len(view)
+        while len(view):
+            take = min(len(view), self.frame_size - len(self._buffer))
+            self._buffer += view[:take]
+            view = view[take:]
+            if len(self._buffer) == self.frame_size:
+                self._flush_frame()
+
+    def _flush_frame(self) -> None:
+        frame = self._compressor.compress(self._buffer)
+        self.dest.write(frame)
+        self._entries.append(SEEK_ENTRY.pack(len(frame), len(self._buffer)))
+        self.stored_size += len(frame)
+        self._buffer = bytearray()
+
+    def close(self) -> Dict[str, Any]:
+        """Write the last frame and the seek table"""
+        if self._buffer:
+            self._flush_frame()
+        entries = b"".join(self._entries)
+        footer = SEEK_FOOTER.pack(len(self._entries), 0, SEEKABLE_MAGIC)
+        table = SKIPPABLE_HEADER.pack(SKIPPABLE_MAGIC, len(entries) + len(footer)) + entries + footer
+        self.dest.write(table)
+        self.stored_size += len(table)
+        return {
+            'sha256': self.sha256.hexdigest(),
+            'size': self.size,
+            'stored_size': self.stored_size,
+            'frames': len(self._entries)
+        }
+
+
+class SeekableZstdReader(io.RawIOBase):
+    """Random-access reader over a seekable zstd file, decompressing one frame at a time"""
+
+    def __init__(self, file_path):
+        super().__init__()
+        self._file = open(file_path, "rb")
+        try:
+            self._load_seek_table()
+        except Exception:
+            self._file.close()
+            raise
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._position = 0
+        self._frame_index = -1
+        self._frame = b""
+
+    def _load_seek_table(self) -> None:
+        self._file.seek(-SEEK_FOOTER.size, os.SEEK_END)
+        frames, descriptor, magic = SEEK_FOOTER.unpack(self._file.read(SEEK_FOOTER.size))
+        if magic != SEEKABLE_MAGIC:
+            raise ValueError("Not a seekable zstd file")
+        entry_size = SEEK_ENTRY.size + (4 if descriptor & 0x80 else 0)
+        self._file.seek(-(SEEK_FOOTER.size + frames * entry_size), os.SEEK_END)
+        table = self._file.read(frames * entry_size)
+
+        # Start offsets of every frame, plus the end of the last one
+        self._compressed_offsets = [0]
+        self._offsets = [0]
+        for index in range(frames):
+            compressed_size, size = SEEK_ENTRY.unpack_from(table, index * entry_size)
+            self._compressed_offsets.append(self._compressed_offsets[-1] + compressed_size)
+            self._offsets.append(self._offsets[-1] + size)
+        self.size = self._offsets[-1]
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError("Negative seek position")
+        self._position = offset
+        return offset
+
+    def _load_frame(self, index: int) -> None:
+        start, end = self._compressed_offsets[index], self._compressed_offsets[index + 1]
+        self._file.seek(start)
+        self._frame = self._decompressor.decompress(self._file.read(end - start))
+        self._frame_index = index
+
+    def readinto(self, buffer) -> int:
+        if self._position >= self.size:
+            return 0
+        index = bisect.bisect_right(self._offsets, self._position) - 1
+        if index != self._frame_index:
+            self._load_frame(index)
+        start = self._position - self._offsets[index]
+        count = min(len(buffer), len(self._frame) - start)
+        memoryview(buffer)[:count] = memoryview(self._frame)[start:start + count]
+        self._position += count
+        return count
+
+    def close(self) -> None:
+        if not self.closed:
+            self._file.close()
+            self._frame = b""
+        super().close()
+
+
+def open_evidence(file_path) -> io.BufferedIOBase:
+    """Open stored evidence for reading its original bytes, compressed or not"""
+    if is_compressed(file_path):
+        return io.BufferedReader(SeekableZstdReader(file_path), buffer_size=settings.HASH_BLOCK_SIZE)
+    return open(file_path, "rb")
+
+
+def evidence_size(file_path) -> int:
+    """Size of the original bytes of stored evidence"""
+    if is_compressed(file_path):
+        with SeekableZstdReader(file_path) as reader:
+            return reader.size
+    return os.path.getsize(file_path)
+
+
+def compress_file(source_path, dest_path, progress_callback: Callable[[int], None] = None) -> Dict[str, Any]:
+    """Compress a file into the seekable format in one read pass; returns the original SHA-256 and sizes"""
+    with open(source_path, "rb") as src, open(dest_path, "wb") as dst:
+        writer = SeekableZstdWriter(dst)
+        while True:
+            chunk = src.read(writer.frame_size)
+            if not chunk:
+                break
+            writer.write(chunk)
+            if progress_callback:
+                progress_callback(len(chunk))
+        return writer.close()
+
+
+def compress_chunks(chunks: Iterable[bytes], dest) -> Dict[str, Any]:
+    """Compress an iterable of chunks into ``dest``"""
+    writer = SeekableZstdWriter(dest)
+    for chunk in chunks:
+        writer.write(chunk)
+    return writer.close()
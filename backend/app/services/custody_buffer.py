@@ -0,0 +1,124 @@
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.sql_models import ChainOfCustody
+
+logger = logging.getLogger(__name__)
+
+RANGES_PER_ENTRY = 20  # byte ranges listed in one custody entry; the rest are only counted
+
+
+class CustodyBuffer:
+    """Batches EVIDENCE_ACCESSED custody rows so serving evidence never waits on the database.
+
+    A player scrubbing through a video issues a range request every few
+    seconds. Accesses by the same client to the same job are merged until
+    the next flush into one entry counting the requests and bytes served
+    and listing the ranges; a background thread inserts all pending
+    entries every ``flush_seconds``, or sooner once ``max_pending`` are
+    waiting.
+    """
+
+    def __init__(self, flush_seconds: float = None, max_pending: int = None, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self.flush_seconds = flush_seconds if flush_seconds is not None else settings.CUSTODY_ACCESS_FLUSH_SECONDS
+        self.max_pending = max_pending or settings.CUSTODY_ACCESS_MAX_PENDING
+        self._pending: Dict[Tuple[str, str, str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record_access(self, job_id: str, investigator_id: str, client: str, delivery: str,
+                      start: int = None, end: int = None, sha256: str = None) -> None:
+        """Note one access to a job's evidence (``start``/``end`` inclusive, None when unknown)"""
+        now = datetime.now()
+        key = (job_id, investigator_id, client, delivery)
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                entry = self._pending[key] = {
+                    'first_access': now, 'requests': 0, 'bytes_served': 0, 'ranges': [], 'sha256': sha256
+                }
+            entry['last_access'] = now
+            entry['requests'] += 1
+            if start is not None:
+                entry['bytes_served'] += end - start + 1
+                if len(entry['ranges']) < RANGES_PER_ENTRY:
+                    entry['ranges'].append([start, end])
+            pending = len(self._pending)
+        self._ensure_thread()
+        if pending >= self.max_pending:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """Insert all pending entries; returns how many were written"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        db = self.session_factory()
+        try:
+            db.add_all([
+                ChainOfCustody(
+                    job_id=job_id,
+                    timestamp=entry['first_access'],
+                    event="EVIDENCE_ACCESSED",
+                    investigator_id=investigator_id,
+                    details={
+                        "client": client,
+                        "delivery": delivery,
+                        "requests": entry['requests'],
+                        "bytes_served": entry['bytes_served'],
+                        "ranges": entry['ranges'],
+                        "first_access": entry['first_access'].isoformat(),
+                        "last_access": entry['last_access'].isoformat()
+                    },
+                    hash_verification=entry['sha256']
+                )
+                for (job_id, investigator_id, client, delivery), entry in pending.items()
+            ])
+            db.commit()
+            return len(pending)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to write {len(pending)} evidence access entries: {str(e)}")
+            # Keep them for the next flush rather than losing custody records
+            with self._lock:
+                for key, entry in pending.items():
+                    newer = self._pending.get(key)
+                    self._pending[key] = entry if newer is None else self._merge(entry, newer)
+            return 0
+        finally:
+            db.close()
+
+    @staticmethod
+    def _merge(earlier: Dict[str, Any], later: Dict[str, Any]) -> Dict[str, Any]:
+        """One entry covering a failed flush's entry and the accesses recorded since"""
+        return {
+            'first_access': earlier['first_access'],
+            'last_access': later['last_access'],
+            'requests': earlier['requests'] + later['requests'],
+            'bytes_served': earlier['bytes_served'] + later['bytes_served'],
+            'ranges': (earlier['ranges'] + later['ranges'])[:RANGES_PER_ENTRY],
+            'sha256': later['sha256'] or earlier['sha256']
+        }
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="custody-flush", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+
+custody_buffer = CustodyBuffer()
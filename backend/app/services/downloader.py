@@ -1,15 +1,18 @@
 import yt_dlp
-import requests
-import tempfile
 import asyncio
 from typing import Optional, Dict, Any
 from urllib.parse import urlparse
 import logging
 from datetime import datetime
 import os
+import uuid
 
 from app.core.config import settings
 from app.models.schemas import Platform
+from app.services.acquisition import (
+    AcquisitionCancelled, acquisition_manager, acquisition_workspace, load_checkpoint, save_checkpoint
+)
+from app.services.fetcher import http_fetcher
 
 logger = logging.getLogger(__name__)
 
@@ -64,225 +67,278 @@ class URLDownloader:
             return Platform.INSTAGRAM
         return None
     
-    async def download_youtube(self, url: str) -> Dict[str, Any]:
+    async def download_youtube(self, url: str, progress=None, job_id: str = None) -> Dict[str, Any]:
         """Download content from YouTube"""
+        return await self._acquire(Platform.YOUTUBE.value, self._download_youtube, url, progress, job_id)
+    
+    def _download_youtube(self, url: str, progress=None, acquisition=None) -> Dict[str, Any]:
         ydl_opts = {
             'format': 'best[ext=mp4]/best',
             'outtmpl': '%(title)s.%(ext)s',
             'quiet': True,
             'no_warnings': True,
+            'socket_timeout': settings.ACQUISITION_SOCKET_TIMEOUT,
+            # Continue .part files (and fragment state) left in the workspace by an interrupted attempt
+            'continuedl': True,
             'extract_flat': False,
         }
         
         try:
-            with tempfile.TemporaryDirectory() as tmpdir:
-                ydl_opts['outtmpl'] = os.path.join(tmpdir, '%(title)s.%(ext)s')
+            workspace = self._workspace(acquisition)
+            ydl_opts['outtmpl'] = os.path.join(workspace, '%(title)s.%(ext)s')
+            ydl_opts['progress_hooks'] = self._progress_hooks(progress, acquisition)
+            
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=True)
+                filename = self._downloaded_file(ydl, info)
+                
+                # yt-dlp wrote straight into the job's workspace; storage renames the file from there
+                if os.path.exists(filename):
+                    return {
+                        'success': True,
+                        'file_path': filename,
+                        'platform_metadata': {
+                            'title': info.get('title'),
+                            'uploader': info.get('uploader'),
+                            'upload_date': info.get('upload_date'),
+                            'duration': info.get('duration'),
+                            'view_count': info.get('view_count'),
+                            'like_count': info.get('like_count')
+                        },
+                        'platform': Platform.YOUTUBE
+                    }
                 
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(url, download=True)
-                    filename = ydl.prepare_filename(info)
-                    
-                    # Get actual downloaded file
-                    if os.path.exists(filename):
-                        # Create a permanent temp file
-                        permanent_temp = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4')
-                        with open(filename, 'rb') as src, open(permanent_temp.name, 'wb') as dst:
-                            dst.write(src.read())
-                        
-                        return {
-                            'success': True,
-                            'file_path': permanent_temp.name,
-                            'platform_metadata': {
-                                'title': info.get('title'),
-                                'uploader': info.get('uploader'),
-                                'upload_date': info.get('upload_date'),
-                                'duration': info.get('duration'),
-                                'view_count': info.get('view_count'),
-                                'like_count': info.get('like_count')
-                            },
-                            'platform': Platform.YOUTUBE
-                        }
-                    
             return {'success': False, 'error': 'Download completed but file not found'}
                 
+        except AcquisitionCancelled:
+            raise
         except Exception as e:
             logger.error(f"YouTube download failed: {str(e)}")
             return {'success': False, 'error': str(e)}
     
-    async def download_twitter(self, url: str) -> Dict[str, Any]:
+    async def download_twitter(self, url: str, progress=None, job_id: str = None) -> Dict[str, Any]:
         """Download content from Twitter/X"""
+        return await self._acquire(Platform.TWITTER.value, self._download_twitter, url, progress, job_id)
+    
+    def _download_twitter(self, url: str, progress=None, acquisition=None) -> Dict[str, Any]:
         ydl_opts = {
             'format': 'best',
             'outtmpl': '%(id)s.%(ext)s',
             'quiet': True,
             'no_warnings': True,
+            'socket_timeout': settings.ACQUISITION_SOCKET_TIMEOUT,
+            # Continue .part files (and fragment state) left in the workspace by an interrupted attempt
+            'continuedl': True,
         }
         
         try:
-            with tempfile.TemporaryDirectory() as tmpdir:
-                ydl_opts['outtmpl'] = os.path.join(tmpdir, '%(id)s.%(ext)s')
+            workspace = self._workspace(acquisition)
+            ydl_opts['outtmpl'] = os.path.join(workspace, '%(id)s.%(ext)s')
+            ydl_opts['progress_hooks'] = self._progress_hooks(progress, acquisition)
+            
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=True)
+                filename = self._downloaded_file(ydl, info)
                 
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(url, download=True)
-                    filename = ydl.prepare_filename(info)
-                    
-                    if os.path.exists(filename):
-                        permanent_temp = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4')
-                        with open(filename, 'rb') as src, open(permanent_temp.name, 'wb') as dst:
-                            dst.write(src.read())
-                        
-                        return {
-                            'success': True,
-                            'file_path': permanent_temp.name,
-                            'platform_metadata': {
-                                'id': info.get('id'),
-                                'uploader': info.get('uploader'),
-                                'upload_date': info.get('upload_date'),
-                                'title': info.get('title'),
-                                'description': info.get('description')
-                            },
-                            'platform': Platform.TWITTER
-                        }
+                if os.path.exists(filename):
+                    return {
+                        'success': True,
+                        'file_path': filename,
+                        'platform_metadata': {
+                            'id': info.get('id'),
+                            'uploader': info.get('uploader'),
+                            'upload_date': info.get('upload_date'),
+                            'title': info.get('title'),
+                            'description': info.get('description')
+                        },
+                        'platform': Platform.TWITTER
+                    }
             
             return {'success': False, 'error': 'Download completed but file not found'}
                 
+        except AcquisitionCancelled:
+            raise
         except Exception as e:
             logger.error(f"Twitter download failed: {str(e)}")
             return {'success': False, 'error': str(e)}
     
-    async def download_facebook(self, url: str) -> Dict[str, Any]:
+    async def download_facebook(self, url: str, progress=None, job_id: str = None) -> Dict[str, Any]:
         """Download content from Facebook"""
+        return await self._acquire(Platform.FACEBOOK.value, self._download_facebook, url, progress, job_id)
+    
+    def _download_facebook(self, url: str, progress=None, acquisition=None) -> Dict[str, Any]:
         ydl_opts = {
             'format': 'best[ext=mp4]/best',
             'outtmpl': '%(id)s.%(ext)s',
             'quiet': True,
             'no_warnings': True,
+            'socket_timeout': settings.ACQUISITION_SOCKET_TIMEOUT,
+            # Continue .part files (and fragment state) left in the workspace by an interrupted attempt
+            'continuedl': True,
         }
         
         try:
-            with tempfile.TemporaryDirectory() as tmpdir:
-                ydl_opts['outtmpl'] = os.path.join(tmpdir, '%(id)s.%(ext)s')
+            workspace = self._workspace(acquisition)
+            ydl_opts['outtmpl'] = os.path.join(workspace, '%(id)s.%(ext)s')
+            ydl_opts['progress_hooks'] = self._progress_hooks(progress, acquisition)
+            
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=True)
+                filename = self._downloaded_file(ydl, info)
                 
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(url, download=True)
-                    filename = ydl.prepare_filename(info)
-                    
-                    if os.path.exists(filename):
-                        # Determine extension based on format
-                        ext = os.path.splitext(filename)[1] or '.mp4'
-                        permanent_temp = tempfile.NamedTemporaryFile(delete=False, suffix=ext)
-                        with open(filename, 'rb') as src, open(permanent_temp.name, 'wb') as dst:
-                            dst.write(src.read())
-                        
-                        return {
-                            'success': True,
-                            'file_path': permanent_temp.name,
-                            'platform_metadata': {
-                                'id': info.get('id'),
-                                'title': info.get('title'),
-                                'uploader': info.get('uploader'),
-                                'upload_date': info.get('upload_date'),
-                                'duration': info.get('duration'),
-                                'view_count': info.get('view_count'),
-                                'description': info.get('description')
-                            },
-                            'platform': Platform.FACEBOOK
-                        }
+                if os.path.exists(filename):
+                    return {
+                        'success': True,
+                        'file_path': filename,
+                        'platform_metadata': {
+                            'id': info.get('id'),
+                            'title': info.get('title'),
+                            'uploader': info.get('uploader'),
+                            'upload_date': info.get('upload_date'),
+                            'duration': info.get('duration'),
+                            'view_count': info.get('view_count'),
+                            'description': info.get('description')
+                        },
+                        'platform': Platform.FACEBOOK
+                    }
             
             return {'success': False, 'error': 'Download completed but file not found'}
                 
+        except AcquisitionCancelled:
+            raise
         except Exception as e:
             logger.error(f"Facebook download failed: {str(e)}")
             return {'success': False, 'error': str(e)}
     
-    async def download_instagram(self, url: str) -> Dict[str, Any]:
+    async def download_instagram(self, url: str, progress=None, job_id: str = None) -> Dict[str, Any]:
         """Download content from Instagram"""
+        return await self._acquire(Platform.INSTAGRAM.value, self._download_instagram, url, progress, job_id)
+    
+    def _download_instagram(self, url: str, progress=None, acquisition=None) -> Dict[str, Any]:
         ydl_opts = {
             'format': 'best[ext=mp4]/best',
             'outtmpl': '%(id)s.%(ext)s',
             'quiet': True,
             'no_warnings': True,
+            'socket_timeout': settings.ACQUISITION_SOCKET_TIMEOUT,
+            # Continue .part files (and fragment state) left in the workspace by an interrupted attempt
+            'continuedl': True,
         }
         
         try:
-            with tempfile.TemporaryDirectory() as tmpdir:
-                ydl_opts['outtmpl'] = os.path.join(tmpdir, '%(id)s.%(ext)s')
+            workspace = self._workspace(acquisition)
+            ydl_opts['outtmpl'] = os.path.join(workspace, '%(id)s.%(ext)s')
+            ydl_opts['progress_hooks'] = self._progress_hooks(progress, acquisition)
+            
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=True)
+                filename = self._downloaded_file(ydl, info)
                 
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(url, download=True)
-                    filename = ydl.prepare_filename(info)
-                    
-                    if os.path.exists(filename):
-                        # Determine extension based on format
-                        ext = os.path.splitext(filename)[1] or '.mp4'
-                        permanent_temp = tempfile.NamedTemporaryFile(delete=False, suffix=ext)
-                        with open(filename, 'rb') as src, open(permanent_temp.name, 'wb') as dst:
-                            dst.write(src.read())
-                        
-                        return {
-                            'success': True,
-                            'file_path': permanent_temp.name,
-                            'platform_metadata': {
-                                'id': info.get('id'),
-                                'title': info.get('title'),
-                                'uploader': info.get('uploader') or info.get('channel'),
-                                'upload_date': info.get('upload_date'),
-                                'duration': info.get('duration'),
-                                'like_count': info.get('like_count'),
-                                'comment_count': info.get('comment_count'),
-                                'description': info.get('description')
-                            },
-                            'platform': Platform.INSTAGRAM
-                        }
+                if os.path.exists(filename):
+                    return {
+                        'success': True,
+                        'file_path': filename,
+                        'platform_metadata': {
+                            'id': info.get('id'),
+                            'title': info.get('title'),
+                            'uploader': info.get('uploader') or info.get('channel'),
+                            'upload_date': info.get('upload_date'),
+                            'duration': info.get('duration'),
+                            'like_count': info.get('like_count'),
+                            'comment_count': info.get('comment_count'),
+                            'description': info.get('description')
+                        },
+                        'platform': Platform.INSTAGRAM
+                    }
             
             return {'success': False, 'error': 'Download completed but file not found'}
                 
+        except AcquisitionCancelled:
+            raise
         except Exception as e:
             logger.error(f"Instagram download failed: {str(e)}")
             return {'success': False, 'error': str(e)}
     
-    async def download_generic(self, url: str) -> Dict[str, Any]:
+    async def download_generic(self, url: str, progress=None, job_id: str = None) -> Dict[str, Any]:
         """Download content from generic URLs"""
+        return await self._acquire('web', self._download_generic, url, progress, job_id)
+    
+    def _download_generic(self, url: str, progress=None, acquisition=None) -> Dict[str, Any]:
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(url, headers=headers, stream=True, timeout=30)
-            response.raise_for_status()
-            
-            # Create temp file
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=self._get_extension(url))
-            
-            # Download content
-            file_size = 0
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    temp_file.write(chunk)
-                    file_size += len(chunk)
-                    
-                    if file_size > settings.MAX_FILE_SIZE:
-                        temp_file.close()
-                        os.unlink(temp_file.name)
-                        raise ValueError(f"File exceeds maximum size of {settings.MAX_FILE_SIZE} bytes")
-            
-            temp_file.close()
+            # Parallel ranges over the pooled session where the server allows, straight into the workspace
+            file_path = os.path.join(self._workspace(acquisition), 'download' + self._get_extension(url))
+            fetched = http_fetcher.fetch(url, file_path, progress, acquisition, max_size=settings.MAX_FILE_SIZE)
             
             return {
                 'success': True,
-                'file_path': temp_file.name,
+                'file_path': file_path,
+                'acquisition_receipt': fetched['receipt'],
                 'platform_metadata': {
                     'url': url,
-                    'content_type': response.headers.get('content-type'),
-                    'file_size': file_size,
+                    'content_type': fetched['content_type'],
+                    'file_size': fetched['size'],
+                    'transfer_sha256': fetched['sha256'],
+                    'segments': fetched['segments'],
+                    'resumed_bytes': fetched['resumed_bytes'],
                     'download_timestamp': datetime.utcnow().isoformat()
                 },
                 'platform': None
             }
             
+        except AcquisitionCancelled:
+            raise
         except Exception as e:
             logger.error(f"Generic download failed: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    @staticmethod
+    def _workspace(acquisition=None) -> str:
+        """Directory a download is written to: the job's acquisition workspace
+
+        Calls made outside an acquisition get an ad-hoc workspace under the same
+        root, so ``cleanup_workspaces`` removes it once the TTL has passed.
+        """
+        job_id = acquisition.job_id if acquisition is not None else f'adhoc-{uuid.uuid4()}'
+        return str(acquisition_workspace(job_id))
+    
+    @staticmethod
+    def _downloaded_file(ydl, info: Dict[str, Any]) -> str:
+        """Path of the file yt-dlp produced (after any merge or remux), else the output template's"""
+        for download in info.get('requested_downloads') or []:
+            if download.get('filepath'):
+                return download['filepath']
+        return ydl.prepare_filename(info)
+    
+    @staticmethod
+    async def _acquire(platform: str, download, url: str, progress, job_id: Optional[str]) -> Dict[str, Any]:
+        """Run a blocking download on the platform's acquisition pool without blocking the event loop"""
+        job_id = job_id or getattr(progress, 'job_id', None) or f'adhoc-{uuid.uuid4()}'
+        try:
+            return await acquisition_manager.run(job_id, platform, download, url, progress)
+        except AcquisitionCancelled as e:
+            return {'success': False, 'error': str(e), 'cancelled': True, 'resumable': e.resumable}
+        except asyncio.TimeoutError:
+            return {'success': False, 'error': f'Download timed out after {acquisition_manager.timeout} seconds',
+                    'cancelled': True}
+    
+    @staticmethod
+    def _progress_hooks(progress, acquisition=None) -> list:
+        """yt-dlp hooks forwarding byte counts to a ``ProgressReporter`` and aborting cancelled downloads"""
+        if progress is None and acquisition is None:
+            return []
+        
+        def hook(status: Dict[str, Any]):
+            if acquisition is not None:
+                # Raising here is how yt-dlp downloads are stopped part-way
+                acquisition.check()
+            if progress is None:
+                return
+            if status.get('status') == 'downloading' and status.get('downloaded_bytes') is not None:
+                progress.update(status['downloaded_bytes'],
+                                status.get('total_bytes') or status.get('total_bytes_estimate'))
+        
+        return [hook]
+    
     def _get_extension(self, url: str) -> str:
         """Extract file extension from URL"""
         parsed = urlparse(url)
@@ -293,20 +349,51 @@ class URLDownloader:
                 return ext
         return '.bin'
     
-    async def download(self, url: str) -> Dict[str, Any]:
-        """Main download method"""
+    async def download(self, url: str, progress=None, job_id: str = None) -> Dict[str, Any]:
+        """Main download method; ``progress`` is an optional ``ProgressReporter`` for the transfer.
+        
+        The download runs on the acquisition pool of its platform, so concurrent
+        jobs on one event loop proceed in parallel; ``job_id`` (defaulting to the
+        progress reporter's) is the handle for ``acquisition_manager.cancel``.
+        
+        Downloads for a job write into its workspace and resume what an
+        interrupted attempt left there; a download that already finished is
+        returned from its checkpoint without touching the network.
+        """
         if not self.validate_url(url):
             return {'success': False, 'error': 'URL domain not whitelisted'}
         
+        job_id = job_id or getattr(progress, 'job_id', None)
+        checkpoint = load_checkpoint(job_id) if job_id else None
+        if checkpoint and checkpoint.get('url') == url:
+            logger.info(f"Job {job_id} reuses its finished download {checkpoint['file_path']}")
+            return {
+                'success': True,
+                'file_path': checkpoint['file_path'],
+                'platform_metadata': checkpoint['platform_metadata'],
+                'platform': Platform(checkpoint['platform']) if checkpoint['platform'] else None,
+                'from_checkpoint': True
+            }
+        
         platform = self.detect_platform(url)
         
         if platform == Platform.YOUTUBE:
-            return await self.download_youtube(url)
+            result = await self.download_youtube(url, progress, job_id)
         elif platform == Platform.TWITTER:
-            return await self.download_twitter(url)
+            result = await self.download_twitter(url, progress, job_id)
         elif platform == Platform.FACEBOOK:
-            return await self.download_facebook(url)
+            result = await self.download_facebook(url, progress, job_id)
         elif platform == Platform.INSTAGRAM:
-            return await self.download_instagram(url)
+            result = await self.download_instagram(url, progress, job_id)
         else:
-            return await self.download_generic(url)
\ No newline at end of file
+            result = await self.download_generic(url, progress, job_id)
+        
+        if result['success'] and job_id:
+            save_checkpoint(job_id, {
+                'url': url,
+                'file_path': result['file_path'],
+                'file_size': os.path.getsize(result['file_path']),
+                'platform_metadata': result.get('platform_metadata'),
+                'platform': result['platform'].value if result.get('platform') else None
+            })
+        return result
\ No newline at end of file
@@ -0,0 +1,140 @@
+"""Serving stored evidence bytes over HTTP with byte ranges."""
+
+import os
+import logging
+from typing import AsyncIterator, Mapping, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from app.core.config import settings
+from app.services.compression import is_compressed, open_evidence
+
+logger = logging.getLogger(__name__)
+
+ZEROCOPY_EXTENSION = "http.response.zerocopy"
+
+
+class RangeNotSatisfiable(ValueError):
+    """The requested range starts beyond the end of the evidence"""
+
+
+def content_disposition(filename: str, disposition: str = "inline") -> str:
+    """``Content-Disposition`` value for any file name, as Starlette's ``FileResponse`` builds it.
+
+    Names that need quoting (quotes, spaces, non-ASCII characters) are sent
+    in the RFC 5987 ``filename*=utf-8''`` form, after an ASCII-only
+    ``filename`` fallback for clients that do not understand it.
+    """
+    quoted = quote(filename)
+    if quoted == filename:
+        return f'{disposition}; filename="{filename}"'
+    fallback = "".join(c if " " <= c <= "~" and c not in '"\\' else "_" for c in filename)
+    return f"{disposition}; filename=\"{fallback}\"; filename*=utf-8''{quoted}"
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive ``(start, end)`` of a single ``bytes=`` range; None to send the whole file.
+
+    Malformed headers and multi-range requests are answered with the whole
+    file, as RFC 9110 allows.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, separator, last = spec.strip().partition("-")
+    if not separator:
+        return None
+    try:
+        start = int(first) if first.strip() else None
+        last_byte = int(last) if last.strip() else None
+    except ValueError:
+        return None
+    if start is None:
+        # Suffix range: the last N bytes
+        if last_byte is None:
+            return None
+        if last_byte <= 0 or size == 0:
+            raise RangeNotSatisfiable(header)
+        return max(0, size - last_byte), size - 1
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    end = size - 1 if last_byte is None else min(last_byte, size - 1)
+    return (start, end) if end >= start else None
+
+
+class EvidenceFileResponse(Response):
+    """Sends ``length`` bytes of a stored evidence file from ``start``.
+
+    Uncompressed files are handed to the server's zero-copy extension
+    (sendfile) when it offers one and otherwise read with ``os.pread`` on a
+    worker thread; compressed files go through the seekable reader, which
+    decompresses only the frames covering the range. Nothing outside the
+    requested range is read.
+    """
+
+    def __init__(self, path: str, start: int, length: int, status_code: int = 200,
+                 headers: Mapping[str, str] = None, media_type: str = None):
+        self.path = str(path)
+        self.start = start
+        self.length = length
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers({**(headers or {}), "content-length": str(length)})
+
+    async def _chunks(self) -> AsyncIterator[bytes]:
+        chunk_size = settings.EVIDENCE_STREAM_CHUNK_SIZE
+        remaining = self.length
+        if is_compressed(self.path):
+            reader = await anyio.to_thread.run_sync(open_evidence, self.path)
+            try:
+                reader.seek(self.start)
+                while remaining:
+                    chunk = await anyio.to_thread.run_sync(reader.read, min(chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+            finally:
+                reader.close()
+            return
+
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(fd, self.start, self.length, os.POSIX_FADV_SEQUENTIAL)
+            offset = self.start
+            while remaining:
+                chunk = await anyio.to_thread.run_sync(os.pread, fd, min(chunk_size, remaining), offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            os.close(fd)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD" or self.length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if ZEROCOPY_EXTENSION in scope.get("extensions", {}) and not is_compressed(self.path):
+            with open(self.path, "rb") as f:
+                await send({"type": ZEROCOPY_EXTENSION, "file": f, "offset": self.start,
+                            "count": self.length, "more_body": False})
+            return
+
+        sent = 0
+        async for chunk in self._chunks():
+            sent += len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        if sent < self.length:
+            logger.error(f"Evidence file {self.path} ended {self.length - sent} bytes short of the range")
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
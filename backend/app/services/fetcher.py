@@ -0,0 +1,370 @@
+"""HTTP evidence fetching: pooled connections, parallel byte ranges, resumable segments.
+
+A fetch first asks for byte 0 alone. A ``206`` answer gives the size and
+proves that the server honours ranges; the file is then preallocated and
+split into up to ``FETCH_SEGMENTS`` ranges fetched in parallel, each
+written at its offset. Meanwhile the calling thread hashes the file from
+the start as far as it is contiguous, so the acquisition receipt of the
+reassembled stream (every configured digest, segment hashes, Merkle leaves
+and TLSH) is ready when the last range lands, and the pipeline needs no
+second read pass.
+
+Segment progress is checkpointed next to the file. A fetch that is
+interrupted (cancelled, timed out, worker restarted) resumes each segment
+where it stopped, provided the server still reports the same size and
+validator (strong ETag or Last-Modified). Servers without range support
+are streamed over a single connection.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.core.config import settings
+from app.services.receipt import build_receipt, receipt_digest
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+STATE_SUFFIX = '.fetch.json'
+CHECKPOINT_SECONDS = 2.0
+# Transient transport failures a segment retries from its current position
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout, urllib3.exceptions.HTTPError)
+
+
+class FetchError(IOError):
+    """The server's answers are unusable for a consistent download"""
+
+
+class _Segment:
+    """Inclusive byte range ``[start, end]``; ``end`` is None while streaming a body of unknown length"""
+
+    def __init__(self, start: int, end: Optional[int], done: int = 0):
+        self.start = start
+        self.end = end
+        self.done = done
+
+    @property
+    def position(self) -> int:
+        return self.start + self.done
+
+    @property
+    def complete(self) -> bool:
+        return self.end is not None and self.position > self.end
+
+
+class _FetchState:
+    """Shared between the segment threads and the hashing thread of one fetch"""
+
+    def __init__(self, segments: List[_Segment], acquisition=None, max_size: int = None):
+        self.segments = segments
+        self.acquisition = acquisition
+        self.max_size = max_size
+        self.condition = threading.Condition()
+        self.error: Optional[BaseException] = None
+        self.running = 0
+
+    def check(self) -> None:
+        """Stop the calling thread if the fetch failed elsewhere or was cancelled"""
+        if self.error is not None:
+            raise self.error
+        if self.acquisition is not None:
+            self.acquisition.check()
+
+    def advance(self, segment: _Segment, amount: int) -> None:
+        with self.condition:
+            segment.done += amount
+            if self.max_size and self.received() > self.max_size:
+                raise ValueError(f"File exceeds maximum size of {self.max_size} bytes")
+            self.condition.notify_all()
+
+    def fail(self, error: BaseException) -> None:
+        with self.condition:
+            if self.error is None:
+                self.error = error
+            self.condition.notify_all()
+
+    def received(self) -> int:
+        return sum(segment.done for segment in self.segments)
+
+    def contiguous(self) -> int:
+        """Bytes present from offset 0 without a gap"""
+        for segment in self.segments:
+            if not segment.complete:
+                return segment.position
+        return self.segments[-1].position if self.segments else 0
+
+
+class HTTPFetcher:
+    """Downloads URLs to files over one pooled keep-alive session per process"""
+
+    def __init__(self, pool_size: int = None):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=pool_size or settings.FETCH_POOL_CONNECTIONS,
+            # Connection setup only; interrupted bodies are resumed by the segments themselves
+            max_retries=Retry(total=3, connect=3, read=0, backoff_factor=0.2,
+                              status_forcelist=(502, 503, 504), allowed_methods=frozenset(['GET']))
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # Byte offsets must refer to the stored representation, never to a gzip stream
+        self.session.headers.update({'User-Agent': USER_AGENT, 'Accept-Encoding': 'identity'})
+
+    def fetch(self, url: str, path: str, progress=None, acquisition=None,
+              max_size: int = None) -> Dict[str, Any]:
+        """Download ``url`` to ``path``; returns size, SHA-256, the acquisition receipt and how the transfer went.
+
+        ``progress`` is an optional ``ProgressReporter``; ``acquisition`` an
+        ``Acquisition`` whose cancellation stops every segment and keeps the
+        checkpoint for a later resume.
+        """
+        path = Path(path)
+        response = self.session.get(url, headers={'Range': 'bytes=0-0'}, stream=True,
+                                    timeout=settings.ACQUISITION_SOCKET_TIMEOUT)
+        if response.status_code == 416:
+            # Empty resource: nothing to range over
+            response.close()
+            response = self.session.get(url, stream=True, timeout=settings.ACQUISITION_SOCKET_TIMEOUT)
+        response.raise_for_status()
+        content_type = response.headers.get('content-type')
+        if response.status_code == 206:
+            size = self._range_total(response)
+            validator = self._validator(response)
+            # Reading the single byte hands the connection back to the pool
+            response.content
+            if max_size and size > max_size:
+                raise ValueError(f"File exceeds maximum size of {max_size} bytes")
+            segments, resumed = self._plan(url, path, size, validator)
+            # Segments go to the final URL after redirects; checkpoints stay keyed by the requested one
+            result = self._fetch_ranges(url, response.url, path, size, validator, segments, progress, acquisition)
+        else:
+            # No range support: stream the body of this very response
+            length = response.headers.get('content-length', '')
+            if max_size and length.isdigit() and int(length) > max_size:
+                response.close()
+                raise ValueError(f"File exceeds maximum size of {max_size} bytes")
+            resumed = 0
+            result = self._fetch_stream(response, path, progress, acquisition, max_size)
+        result.update({'content_type': content_type, 'resumed_bytes': resumed})
+        return result
+
+    # --- planning and checkpoints ---
+
+    @staticmethod
+    def _range_total(response: requests.Response) -> int:
+        content_range = response.headers.get('content-range', '')
+        total = content_range.rpartition('/')[2]
+        if not total.isdigit():
+            raise FetchError(f"Unusable Content-Range {content_range!r}")
+        return int(total)
+
+    @staticmethod
+    def _validator(response: requests.Response) -> Optional[str]:
+        """A validator If-Range accepts: a strong ETag, else Last-Modified"""
+        etag = response.headers.get('etag')
+        if etag and not etag.startswith('W/'):
+            return etag
+        return response.headers.get('last-modified')
+
+    @staticmethod
+    def _state_path(path: Path) -> Path:
+        return path.with_name(path.name + STATE_SUFFIX)
+
+    def _plan(self, url: str, path: Path, size: int, validator: Optional[str]):
+        """Segments to fetch (resumed from a matching checkpoint) and the bytes already present"""
+        state_path = self._state_path(path)
+        try:
+            state = json.loads(state_path.read_text())
+            if (path.exists() and state['url'] == url and state['size'] == size and validator
+                    and state['validator'] == validator):
+                segments = [_Segment(start, end, done) for start, end, done in state['segments']]
+                resumed = sum(segment.done for segment in segments)
+                logger.info(f"Resuming download of {url} with {resumed} of {size} bytes present")
+                return segments, resumed
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        state_path.unlink(missing_ok=True)
+        count = max(1, min(settings.FETCH_SEGMENTS, size // settings.FETCH_MIN_SEGMENT_BYTES))
+        step = -(-size // count)
+        segments = [_Segment(start, min(start + step, size) - 1) for start in range(0, size, step)]
+        with open(path, 'wb') as f:
+            f.truncate(size)
+        return segments, 0
+
+    def _checkpoint(self, url: str, path: Path, fd: int, size: int, validator: Optional[str],
+                    state: _FetchState) -> None:
+        if not validator:
+            # Without a validator a resumed fetch could mix two versions of the resource
+            return
+        with state.condition:
+            segments = [[segment.start, segment.end, segment.done] for segment in state.segments]
+        # Data first, so the checkpoint never claims bytes that are not on disk
+        if hasattr(os, 'fdatasync'):
+            os.fdatasync(fd)
+        else:
+            os.fsync(fd)
+        temp_path = self._state_path(path).with_suffix('.tmp')
+        temp_path.write_text(json.dumps({'url': url, 'size': size, 'validator': validator, 'segments': segments}))
+        os.replace(temp_path, self._state_path(path))
+
+    # --- transfer ---
+
+    @staticmethod
+    def _copy(response: requests.Response, fd: int, segment: _Segment, state: _FetchState) -> None:
+        """Write a response body at the segment's position, growing reads while the link keeps up"""
+        chunk_size = settings.FETCH_CHUNK_MIN
+        while True:
+            state.check()
+            started = time.monotonic()
+            data = response.raw.read(chunk_size)
+            if not data:
+                return
+            if segment.end is not None and segment.position + len(data) > segment.end + 1:
+                raise FetchError("Server sent more bytes than the range requested")
+            view = memoryview(data)
+            while view:
+                written = os.pwrite(fd, view, segment.position + len(data) - len(view))
+                view = view[written:]
+            state.advance(segment, len(data))
+            elapsed = time.monotonic() - started
+            if elapsed < 0.05 and chunk_size < settings.FETCH_CHUNK_MAX:
+                chunk_size *= 2
+            elif elapsed > 0.5 and chunk_size > settings.FETCH_CHUNK_MIN:
+                chunk_size //= 2
+
+    def _fetch_segment(self, url: str, fd: int, segment: _Segment, validator: Optional[str],
+                       state: _FetchState) -> None:
+        failures = 0
+        while not segment.complete:
+            state.check()
+            headers = {'Range': f'bytes={segment.position}-{segment.end}'}
+            if validator:
+                headers['If-Range'] = validator
+            try:
+                with self.session.get(url, headers=headers, stream=True,
+                                      timeout=settings.ACQUISITION_SOCKET_TIMEOUT) as response:
+                    if response.status_code != 206:
+                        # 200 to an If-Range request: the resource changed under us
+                        raise FetchError(f"Range request answered with HTTP {response.status_code}")
+                    self._copy(response, fd, segment, state)
+                if not segment.complete:
+                    raise requests.ConnectionError("Range body ended early")
+            except TRANSIENT_ERRORS as e:
+                failures += 1
+                if failures > settings.FETCH_RETRIES:
+                    raise
+                logger.warning(f"Segment at {segment.position} of {url} interrupted ({str(e)}); retrying")
+                time.sleep(min(2 ** failures * 0.1, 2.0))
+
+    def _run_segment(self, url: str, fd: int, segment: _Segment, validator: Optional[str],
+                     state: _FetchState) -> None:
+        try:
+            self._fetch_segment(url, fd, segment, validator, state)
+        except BaseException as e:
+            state.fail(e)
+        finally:
+            with state.condition:
+                state.running -= 1
+                state.condition.notify_all()
+
+    def _fetch_ranges(self, url: str, fetch_url: str, path: Path, size: int, validator: Optional[str],
+                      segments: List[_Segment], progress, acquisition) -> Dict[str, Any]:
+        state = _FetchState(segments, acquisition)
+        digest = receipt_digest()
+        hashed = 0
+        if progress is not None:
+            progress.total_bytes = size
+        fd = os.open(path, os.O_RDWR)
+        pending = [segment for segment in segments if not segment.complete]
+        state.running = len(pending)
+        executor = ThreadPoolExecutor(max_workers=max(1, len(pending)), thread_name_prefix='fetch-segment')
+        try:
+            for segment in pending:
+                executor.submit(self._run_segment, fetch_url, fd, segment, validator, state)
+            last_checkpoint = time.monotonic()
+            while True:
+                with state.condition:
+                    if state.error is None and state.running and state.contiguous() == hashed:
+                        state.condition.wait(0.5)
+                    available, running = state.contiguous(), state.running
+                    received = state.received()
+                state.check()
+                # Hash what is contiguous; it was just written, so this reads the page cache
+                while hashed < available:
+                    data = os.pread(fd, min(settings.HASH_BLOCK_SIZE, available - hashed), hashed)
+                    if not data:
+                        raise FetchError(f"{path} is shorter than the bytes received")
+                    digest.update(data)
+                    hashed += len(data)
+                if progress is not None:
+                    progress.update(received, size)
+                if time.monotonic() - last_checkpoint >= CHECKPOINT_SECONDS:
+                    self._checkpoint(url, path, fd, size, validator, state)
+                    last_checkpoint = time.monotonic()
+                if not running and hashed >= size:
+                    break
+                if not running and state.error is None and hashed < size:
+                    raise FetchError(f"Download of {url} stopped at {hashed} of {size} bytes")
+        except BaseException as e:
+            # Stop the other segments, then record how far each got for a resume
+            state.fail(e)
+            executor.shutdown(wait=True)
+            self._checkpoint(url, path, fd, size, validator, state)
+            os.close(fd)
+            raise
+        executor.shutdown(wait=True)
+        os.close(fd)
+        self._state_path(path).unlink(missing_ok=True)
+        return self._result(digest, size, len(segments), True)
+
+    def _fetch_stream(self, response: requests.Response, path: Path, progress, acquisition,
+                      max_size: int = None) -> Dict[str, Any]:
+        length = response.headers.get('content-length', '')
+        segment = _Segment(0, int(length) - 1 if length.isdigit() else None)
+        state = _FetchState([segment], acquisition, max_size)
+        digest = receipt_digest()
+        if progress is not None and segment.end is not None:
+            progress.total_bytes = segment.end + 1
+        try:
+            with response, open(path, 'wb') as f:
+                chunk_size = settings.FETCH_CHUNK_MIN
+                while True:
+                    state.check()
+                    started = time.monotonic()
+                    data = response.raw.read(chunk_size)
+                    if not data:
+                        break
+                    f.write(data)
+                    digest.update(data)
+                    state.advance(segment, len(data))
+                    if progress is not None:
+                        progress.advance(len(data))
+                    if time.monotonic() - started < 0.05 and chunk_size < settings.FETCH_CHUNK_MAX:
+                        chunk_size *= 2
+            if segment.end is not None and segment.done != segment.end + 1:
+                raise FetchError(f"Body ended after {segment.done} of {segment.end + 1} bytes")
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+        return self._result(digest, segment.done, 1, False)
+
+    @staticmethod
+    def _result(digest, size: int, segments: int, ranged: bool) -> Dict[str, Any]:
+        receipt = build_receipt(digest, size)
+        return {'size': size, 'sha256': receipt['hashes']['sha256'], 'receipt': receipt,
+                'segments': segments, 'ranged': ranged}
+
+
+http_fetcher = HTTPFetcher()
@@ -1,24 +1,277 @@
 import hashlib
-from typing import Optional
+import mmap
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable, Iterable, Iterator, List, Union
 import logging
 from pathlib import Path
 
+from app.core.config import settings
+from app.services.compression import SeekableZstdReader, evidence_size, is_compressed
+from app.models.enums import HashAlgorithm
+
 logger = logging.getLogger(__name__)
 
+def _fadvise(fd: int, offset: int, length: int, advice_name: str) -> None:
+    """Best-effort page cache hint; silently ignored where unsupported"""
+    advice = getattr(os, advice_name, None)
+    if not settings.HASH_FADVISE or advice is None or not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        os.posix_fadvise(fd, offset, length, advice)
+    except OSError:
+        pass
+
+class RateLimiter:
+    """Token bucket capping read bandwidth in bytes per second (thread-safe)"""
+    
+    def __init__(self, bytes_per_second: float, burst: float = None):
+        self.rate = float(bytes_per_second)
+        self.capacity = float(burst or bytes_per_second)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def consume(self, amount: int) -> None:
+        """Block until ``amount`` bytes may be read"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            deficit = -self._tokens
+        if deficit > 0:
+            time.sleep(deficit / self.rate)
+
+def iter_file_blocks(file_path: str,
+                     block_size: int = None,
+                     offset: int = 0,
+                     length: int = None,
+                     buffers: int = 2,
+                     rate_limiter: RateLimiter = None) -> Iterator[memoryview]:
+    """Yield read-only views over a file (or a byte range of it) without per-block allocation.
+
+    Files at or above ``HASH_MMAP_THRESHOLD`` are memory-mapped and sliced;
+    smaller ones are read with ``readinto`` into a ring of ``buffers``
+    reusable bytearrays, so a view stays valid until ``buffers - 1`` further
+    blocks have been produced. The range is hinted as sequential up front and
+    dropped from the page cache afterwards so bulk hashing does not evict the
+    API's working set. An optional ``rate_limiter`` caps read bandwidth.
+    """
+    block_size = block_size or settings.HASH_BLOCK_SIZE
+    
+    if is_compressed(file_path):
+        yield from _iter_compressed_blocks(file_path, block_size, offset, length, buffers, rate_limiter)
+        return
+    
+    with open(file_path, "rb", buffering=0) as f:
+        fd = f.fileno()
+        file_size = os.fstat(fd).st_size
+        end = file_size if length is None else min(file_size, offset + length)
+        if offset >= end:
+            return
+        
+        _fadvise(fd, offset, end - offset, 'POSIX_FADV_SEQUENTIAL')
+        try:
+            if file_size >= settings.HASH_MMAP_THRESHOLD:
+                mapped = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+                if hasattr(mapped, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                view = memoryview(mapped)
+                try:
+                    for position in range(offset, end, block_size):
+                        block_end = min(position + block_size, end)
+                        if rate_limiter:
+                            rate_limiter.consume(block_end - position)
+                        yield view[position:block_end]
+                finally:
+                    view.release()
+                    try:
+                        mapped.close()
+                    except BufferError:
+                        # A caller still holds a slice; the mapping is released with it
+                        pass
+            else:
+                ring = [memoryview(bytearray(block_size)) for _ in range(max(1, buffers))]
+                f.seek(offset)
+                remaining = end - offset
+                index = 0
+                while remaining > 0:
+                    buffer = ring[index % len(ring)]
+                    if rate_limiter:
+                        rate_limiter.consume(min(block_size, remaining))
+                    read = f.readinto(buffer[:min(block_size, remaining)])
+                    if not read:
+                        break
+                    remaining -= read
+                    index += 1
+                    yield buffer[:read]
+        finally:
+            _fadvise(fd, offset, end - offset, 'POSIX_FADV_DONTNEED')
+
+def _iter_compressed_blocks(file_path: str, block_size: int, offset: int, length: Optional[int],
+                            buffers: int, rate_limiter: Optional[RateLimiter]) -> Iterator[memoryview]:
+    """iter_file_blocks over the original bytes of seekable zstd evidence"""
+    with SeekableZstdReader(file_path) as reader:
+        end = reader.size if length is None else min(reader.size, offset + length)
+        reader.seek(offset)
+        ring = [memoryview(bytearray(block_size)) for _ in range(max(1, buffers))]
+        remaining = end - offset
+        index = 0
+        while remaining > 0:
+            buffer = ring[index % len(ring)][:min(block_size, remaining)]
+            if rate_limiter:
+                rate_limiter.consume(len(buffer))
+            filled = 0
+            while filled < len(buffer):
+                read = reader.readinto(buffer[filled:])
+                if not read:
+                    break
+                filled += read
+            if not filled:
+                break
+            remaining -= filled
+            index += 1
+            yield buffer[:filled]
+
+def iter_stream_blocks(stream, block_size: int = None, buffers: int = 2) -> Iterator[memoryview]:
+    """Yield views over a file-like object using reusable buffers where ``readinto`` is available"""
+    block_size = block_size or settings.HASH_BLOCK_SIZE
+    
+    if not hasattr(stream, 'readinto'):
+        for byte_block in iter(lambda: stream.read(block_size), b""):
+            yield memoryview(byte_block)
+        return
+    
+    ring = [memoryview(bytearray(block_size)) for _ in range(max(1, buffers))]
+    index = 0
+    while True:
+        buffer = ring[index % len(ring)]
+        read = stream.readinto(buffer)
+        if not read:
+            break
+        index += 1
+        yield buffer[:read]
+
+class SegmentDigest:
+    """SHA-256 over consecutive fixed-size segments of a stream (dc3dd-style hash windows)"""
+    
+    def __init__(self, segment_size: int):
+        self.segment_size = segment_size
+        self._segments = []
+        self._current = hashlib.sha256()
+        self._offset = 0
+        self._filled = 0
+    
+    def update(self, data) -> None:
+        view = memoryview(data)
+        while len(view):
+            take = min(len(view), self.segment_size - self._filled)
+            self._current.update(view[:take])
+            self._filled += take
+            view = view[take:]
+            if self._filled == self.segment_size:
+                self._close_segment()
+    
+    def _close_segment(self) -> None:
+        self._segments.append({
+            'index': len(self._segments),
+            'offset': self._offset,
+            'length': self._filled,
+            'sha256': self._current.hexdigest()
+        })
+        self._offset += self._filled
+        self._filled = 0
+        self._current = hashlib.sha256()
+    
+    def segments(self) -> List[Dict[str, Any]]:
+        """Close the trailing partial segment and return all segments"""
+        if self._filled:
+            self._close_segment()
+        return self._segments
+
+class MultiDigest:
+    """Feeds a single stream of blocks into several digests at once.
+
+    When an executor is supplied, each digest is updated on its own worker
+    thread (hashlib releases the GIL for large buffers), so the caller can
+    read the next block while the previous one is still being hashed. The
+    caller must not mutate a block until the next ``update``/``wait`` call.
+    With ``segment_size`` set, per-segment SHA-256 digests are produced from
+    the same pass; any other object with an ``update`` method can be passed
+    in ``consumers`` (e.g. a Merkle tree builder) and read back by name.
+    """
+    
+    def __init__(self, algorithms: Iterable[Union[str, HashAlgorithm]] = None,
+                 executor: ThreadPoolExecutor = None,
+                 segment_size: int = None,
+                 consumers: Dict[str, Any] = None):
+        self.algorithms = HashService.normalize_algorithms(algorithms)
+        self._digests = {name: hashlib.new(name) for name in self.algorithms}
+        self._segments = SegmentDigest(segment_size) if segment_size else None
+        self.consumers = dict(consumers or {})
+        self._consumers = list(self._digests.values()) + list(self.consumers.values())
+        if self._segments:
+            self._consumers.append(self._segments)
+        self._executor = executor if len(self._consumers) > 1 else None
+        self._pending = []
+        self.bytes_processed = 0
+    
+    def update(self, data) -> None:
+        """Queue a block for every digest"""
+        self.wait()
+        self.bytes_processed += len(data)
+        
+        if self._executor is None:
+            for consumer in self._consumers:
+                consumer.update(data)
+        else:
+            self._pending = [self._executor.submit(consumer.update, data)
+                             for consumer in self._consumers]
+    
+    def wait(self) -> None:
+        """Block until all queued digest updates have finished"""
+        pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
+    
+    def hexdigests(self) -> Dict[str, str]:
+        """Finalize and return every digest keyed by algorithm name"""
+        self.wait()
+        return {name: digest.hexdigest() for name, digest in self._digests.items()}
+    
+    def segments(self) -> List[Dict[str, Any]]:
+        """Per-segment digests (empty unless ``segment_size`` was given)"""
+        self.wait()
+        return self._segments.segments() if self._segments else []
+
 class HashService:
     """SHA-256 hashing service with verification capabilities"""
     
-    CHUNK_SIZE = 8192
+    CHUNK_SIZE = settings.HASH_BLOCK_SIZE
+    
+    @staticmethod
+    def normalize_algorithms(algorithms: Iterable[Union[str, HashAlgorithm]] = None) -> List[str]:
+        """Validate requested algorithms; SHA-256 is always computed first"""
+        requested = algorithms if algorithms is not None else settings.HASH_ALGORITHMS
+        names = [HashAlgorithm.SHA256.value]
+        for algorithm in requested:
+            name = HashAlgorithm(str(getattr(algorithm, 'value', algorithm)).lower()).value
+            if name not in names:
+                names.append(name)
+        return names
     
     @staticmethod
-    def compute_file_hash(file_path: str) -> Optional[str]:
+    def compute_file_hash(file_path: str, rate_limiter: RateLimiter = None) -> Optional[str]:
         """Compute SHA-256 hash of a file"""
         try:
             sha256_hash = hashlib.sha256()
             
-            with open(file_path, "rb") as f:
-                for byte_block in iter(lambda: f.read(HashService.CHUNK_SIZE), b""):
-                    sha256_hash.update(byte_block)
+            for byte_block in iter_file_blocks(file_path, HashService.CHUNK_SIZE, buffers=1,
+                                               rate_limiter=rate_limiter):
+                sha256_hash.update(byte_block)
             
             return sha256_hash.hexdigest()
             
@@ -26,6 +279,91 @@ class HashService:
             logger.error(f"Hash computation failed: {str(e)}")
             return None
     
+    @staticmethod
+    def digest_file(file_path: str,
+                    algorithms: Iterable[Union[str, HashAlgorithm]] = None,
+                    segment_size: int = None,
+                    consumers: Dict[str, Any] = None,
+                    progress_callback: Callable[[int], None] = None) -> MultiDigest:
+        """Run every requested digest (and optional segment/extra consumers) over one read pass.
+
+        ``progress_callback`` receives the size of each block read.
+        """
+        names = HashService.normalize_algorithms(algorithms)
+        workers = len(names) + len(consumers or {}) + 1
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="digest") as executor:
+            digests = MultiDigest(names, executor=executor, segment_size=segment_size, consumers=consumers)
+            
+            # Two buffers: the next block is read while the previous one is still being hashed
+            for byte_block in iter_file_blocks(file_path, HashService.CHUNK_SIZE, buffers=2):
+                digests.update(byte_block)
+                if progress_callback:
+                    progress_callback(len(byte_block))
+            
+            digests.wait()
+            return digests
+    
+    @staticmethod
+    def compute_file_hashes(file_path: str,
+                            algorithms: Iterable[Union[str, HashAlgorithm]] = None) -> Optional[Dict[str, str]]:
+        """Compute several digests of a file in a single read pass"""
+        try:
+            return HashService.digest_file(file_path, algorithms).hexdigests()
+            
+        except Exception as e:
+            logger.error(f"Multi-digest computation failed: {str(e)}")
+            return None
+    
+    @staticmethod
+    def _hash_range(file_path: str, offset: int, length: int) -> str:
+        sha256_hash = hashlib.sha256()
+        for byte_block in iter_file_blocks(file_path, HashService.CHUNK_SIZE, offset=offset, length=length, buffers=1):
+            sha256_hash.update(byte_block)
+        return sha256_hash.hexdigest()
+    
+    @staticmethod
+    def compute_segment_hashes(file_path: str,
+                               segment_size: int = None,
+                               max_workers: int = None) -> List[Dict[str, Any]]:
+        """Hash fixed-size segments of a file in parallel, one worker thread per segment"""
+        segment_size = segment_size or settings.HASH_SEGMENT_SIZE
+        file_size = evidence_size(file_path)
+        bounds = [(offset, min(segment_size, file_size - offset))
+                  for offset in range(0, file_size, segment_size)]
+        
+        with ThreadPoolExecutor(max_workers=max_workers or settings.HASH_SEGMENT_WORKERS or os.cpu_count(),
+                                thread_name_prefix="segment") as executor:
+            digests = list(executor.map(lambda b: HashService._hash_range(file_path, *b), bounds))
+        
+        return [
+            {'index': index, 'offset': offset, 'length': length, 'sha256': digest}
+            for index, ((offset, length), digest) in enumerate(zip(bounds, digests))
+        ]
+    
+    @staticmethod
+    def verify_segments(file_path: str,
+                        segments: List[Dict[str, Any]],
+                        max_workers: int = None) -> List[Dict[str, Any]]:
+        """Re-hash recorded segments in parallel and return those whose bytes changed"""
+        file_size = evidence_size(file_path)
+        
+        def check(segment):
+            offset, length = segment['offset'], segment['length']
+            if offset + length > file_size:
+                return None
+            return HashService._hash_range(file_path, offset, length)
+        
+        with ThreadPoolExecutor(max_workers=max_workers or settings.HASH_SEGMENT_WORKERS or os.cpu_count(),
+                                thread_name_prefix="segment") as executor:
+            current = list(executor.map(check, segments))
+        
+        return [
+            {**segment, 'current_sha256': digest}
+            for segment, digest in zip(segments, current)
+            if digest != segment['sha256']
+        ]
+    
     @staticmethod
     def verify_hash(file_path: str, expected_hash: str) -> bool:
         """Verify file integrity by comparing hashes"""
@@ -39,7 +377,7 @@ class HashService:
             sha256_hash = hashlib.sha256()
             
             file_like_object.seek(0)
-            for byte_block in iter(lambda: file_like_object.read(HashService.CHUNK_SIZE), b""):
+            for byte_block in iter_stream_blocks(file_like_object, HashService.CHUNK_SIZE, buffers=1):
                 sha256_hash.update(byte_block)
             
             file_like_object.seek(0)
@@ -54,17 +392,16 @@ class HashService:
         """Compute hash with progress reporting"""
         try:
             sha256_hash = hashlib.sha256()
-            file_size = Path(file_path).stat().st_size
+            file_size = evidence_size(file_path)
             bytes_processed = 0
             
-            with open(file_path, "rb") as f:
-                for byte_block in iter(lambda: f.read(HashService.CHUNK_SIZE), b""):
-                    sha256_hash.update(byte_block)
-                    bytes_processed += len(byte_block)
-                    
-                    if progress_callback and file_size > 0:
-                        progress = (bytes_processed / file_size) * 100
-                        progress_callback(progress)
+            for byte_block in iter_file_blocks(file_path, HashService.CHUNK_SIZE, buffers=1):
+                sha256_hash.update(byte_block)
+                bytes_processed += len(byte_block)
+                
+                if progress_callback and file_size > 0:
+                    progress = (bytes_processed / file_size) * 100
+                    progress_callback(progress)
             
             return sha256_hash.hexdigest()
             
@@ -0,0 +1,325 @@
+"""Known-file hash sets (NSRL-style) stored as memory-mapped sorted tables.
+
+A set file (``<name>.hset``) holds a fixed header, a Bloom filter and the
+sorted, de-duplicated binary digests. Lookups test the Bloom filter first
+and only binary-search the mapped table on a hit, so a worker keeps no
+per-digest Python objects in memory regardless of the set size.
+
+Bulk loading from text/CSV exports:
+
+    cd backend
+    python -m app.services.hashsets build NSRL --status good --algorithm sha1 NSRLFile.txt
+"""
+
+import argparse
+import hashlib
+import heapq
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SET_SUFFIX = ".hset"
+SET_MAGIC = b"FEASHSET"
+# magic, algorithm, status, digest_size, digest_count, bloom_bits, bloom_hashes
+SET_HEADER = struct.Struct(">8s8s8sHQQB")
+STATUSES = ("good", "bad")
+RUN_DIGESTS = 2_000_000  # digests sorted in memory per run while building
+
+
+class BloomFilter:
+    """Bit array probed with double hashing taken from the digest bytes themselves.
+
+    Cryptographic digests are already uniformly distributed, so no further
+    hashing is needed to derive the probe positions.
+    """
+
+    def __init__(self, bits: int, hashes: int, data=None):
+        self.bits = bits
+        self.hashes = hashes
+        self.data = data if data is not None else bytearray((bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity: int, fp_rate: float) -> "BloomFilter":
+        capacity = max(1, capacity)
+        bits = max(64, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        hashes = min(16, max(1, round(bits / capacity * math.log(2))))
+        return cls(bits, hashes)
+
+    def _positions(self, digest: bytes) -> Iterator[int]:
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:16], "big") | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.bits
+
+    def add(self, digest: bytes) -> None:
+        for position in self._positions(digest):
+            self.data[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, digest: bytes) -> bool:
+        return all(self.data[position >> 3] & (1 << (position & 7)) for position in self._positions(digest))
+
+
+class HashSetTable:
+    """Read-only view of one ``.hset`` file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = Path(path).stem
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, algorithm, status, digest_size, count, bloom_bits, bloom_hashes = SET_HEADER.unpack_from(self._map)
+        if magic != SET_MAGIC:
+            raise ValueError(f"{path} is not a FEAS hash set")
+        self.algorithm = algorithm.rstrip(b"\0").decode()
+        self.status = status.rstrip(b"\0").decode()
+        self.digest_size = digest_size
+        self.count = count
+
+        bloom_start = SET_HEADER.size
+        bloom_end = bloom_start + (bloom_bits + 7) // 8
+        self.bloom = BloomFilter(bloom_bits, bloom_hashes, memoryview(self._map)[bloom_start:bloom_end])
+        self._table_offset = bloom_end
+
+    def _record(self, index: int) -> bytes:
+        start = self._table_offset + index * self.digest_size
+        return self._map[start:start + self.digest_size]
+
+    def __contains__(self, digest: bytes) -> bool:
+        if len(digest) != self.digest_size or digest not in self.bloom:
+            return False
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            record = self._record(middle)
+            if record < digest:
+                low = middle + 1
+            elif record > digest:
+                high = middle
+            else:
+                return True
+        return False
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "algorithm": self.algorithm,
+            "status": self.status,
+            "count": self.count,
+            "bloom_bits": self.bloom.bits,
+            "bloom_hashes": self.bloom.hashes,
+            "size_bytes": os.path.getsize(self.path)
+        }
+
+    def close(self) -> None:
+        self.bloom.data.release()
+        self._map.close()
+        self._file.close()
+
+
+def _iter_source_digests(sources: Iterable[str], digest_size: int) -> Iterator[bytes]:
+    """Pull the first hex digest of the right width out of every line (plain lists or NSRL/CSV exports)"""
+    pattern = re.compile(rb"(?<![0-9A-Fa-f])[0-9A-Fa-f]{%d}(?![0-9A-Fa-f])" % (digest_size * 2))
+    for source in sources:
+        with open(source, "rb") as f:
+            for line in f:
+                match = pattern.search(line)
+                if match:
+                    yield bytes.fromhex(match.group().decode())
+
+
+def _write_run(digests: List[bytes], directory: str) -> str:
+    digests.sort()
+    handle = tempfile.NamedTemporaryFile(delete=False, dir=directory, suffix=".run")
+    with handle:
+        handle.write(b"".join(digests))
+    return handle.name
+
+
+def _read_run(path: str, digest_size: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(digest_size * 65536)
+            if not block:
+                return
+            for offset in range(0, len(block), digest_size):
+                yield block[offset:offset + digest_size]
+
+
+def build_hash_set(sources: List[str], name: str, status: str = "good", algorithm: str = "sha256",
+                   output_dir: str = None, fp_rate: float = None) -> Dict[str, Any]:
+    """Build ``<output_dir>/<name>.hset`` from text/CSV hash lists with an external merge sort.
+
+    Digests are sorted in fixed-size runs spilled to disk and merged, so
+    memory stays bounded by ``RUN_DIGESTS`` however large the input is.
+    """
+    if status not in STATUSES:
+        raise ValueError(f"Status must be one of {STATUSES}")
+    digest_size = hashlib.new(algorithm).digest_size
+    output_dir = output_dir or settings.HASHSET_DIR
+    fp_rate = fp_rate or settings.HASHSET_BLOOM_FP_RATE
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, f"{name}{SET_SUFFIX}")
+
+    runs = []
+    total = 0
+    try:
+        buffer = []
+        for digest in _iter_source_digests(sources, digest_size):
+            buffer.append(digest)
+            if len(buffer) >= RUN_DIGESTS:
+                runs.append(_write_run(buffer, output_dir))
+                total += len(buffer)
+                buffer = []
+        if buffer or not runs:
+            runs.append(_write_run(buffer, output_dir))
+            total += len(buffer)
+
+        # The input count bounds the unique count, so the filter is sized before merging
+        bloom = BloomFilter.for_capacity(total, fp_rate)
+        table_offset = SET_HEADER.size + len(bloom.data)
+        temp_path = output_path + ".tmp"
+        count = 0
+        with open(temp_path, "wb") as out:
+            out.seek(table_offset)
+            previous = None
+            pending = []
+            for digest in heapq.merge(*(_read_run(run, digest_size) for run in runs)):
+                if digest == previous:
+                    continue
+                previous = digest
+                bloom.add(digest)
+                pending.append(digest)
+                count += 1
+                if len(pending) >= 65536:
+                    out.write(b"".join(pending))
+                    pending = []
+            out.write(b"".join(pending))
+
+            out.seek(0)
+            out.write(SET_HEADER.pack(SET_MAGIC, algorithm.encode(), status.encode(),
+                                      digest_size, count, bloom.bits, bloom.hashes))
+            out.write(bloom.data)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(temp_path, output_path)
+    finally:
+        for run in runs:
+            os.unlink(run)
+
+    logger.info(f"Built hash set {name}: {count} unique {algorithm} digests from {total} input lines")
+    KnownFileFilter.reload()
+    return {"name": name, "path": output_path, "algorithm": algorithm, "status": status,
+            "count": count, "input_count": total}
+
+
+class KnownFileFilter:
+    """Checks evidence digests against every hash set in ``HASHSET_DIR``.
+
+    Each process (the API and every Celery worker) keeps its own mappings.
+    Adding, replacing or removing a set file changes the directory's mtime,
+    which every process checks before a lookup, so new sets are picked up
+    everywhere without a restart or a broadcast. The mappings a reload
+    replaces are closed straight away, so a replaced set file is not held
+    open; lookups run under the same lock and never see a closed table.
+    """
+
+    _tables: Optional[List[HashSetTable]] = None
+    _mtime: Optional[int] = None
+    _lock = threading.RLock()
+
+    @staticmethod
+    def _directory_mtime() -> Optional[int]:
+        try:
+            return os.stat(settings.HASHSET_DIR).st_mtime_ns
+        except OSError:
+            return None
+
+    @classmethod
+    def tables(cls) -> List[HashSetTable]:
+        mtime = cls._directory_mtime()
+        if cls._tables is None or mtime != cls._mtime:
+            with cls._lock:
+                if cls._tables is None or mtime != cls._mtime:
+                    cls._swap(cls._load(), mtime)
+        return cls._tables
+
+    @staticmethod
+    def _load() -> List[HashSetTable]:
+        tables = []
+        directory = Path(settings.HASHSET_DIR)
+        if not directory.is_dir():
+            return tables
+        for path in sorted(directory.glob(f"*{SET_SUFFIX}")):
+            try:
+                tables.append(HashSetTable(str(path)))
+            except Exception as e:
+                logger.error(f"Failed to load hash set {path}: {str(e)}")
+        return tables
+
+    @classmethod
+    def _swap(cls, tables: List[HashSetTable], mtime: Optional[int]) -> None:
+        """Install freshly loaded tables and close the ones they replace (caller holds the lock)"""
+        previous, cls._tables, cls._mtime = cls._tables, tables, mtime
+        for table in previous or ():
+            table.close()
+
+    @classmethod
+    def reload(cls) -> None:
+        """Pick up new or rebuilt set files now, closing the previous mappings"""
+        with cls._lock:
+            cls._swap(cls._load(), cls._directory_mtime())
+
+    @classmethod
+    def lookup(cls, hashes: Dict[str, str]) -> Dict[str, Any]:
+        """Match hex digests keyed by algorithm; a known-bad hit wins over known-good"""
+        matches = []
+        with cls._lock:
+            for table in cls.tables():
+                digest = hashes.get(table.algorithm)
+                if digest and bytes.fromhex(digest) in table:
+                    matches.append({"set": table.name, "status": table.status, "algorithm": table.algorithm})
+
+        status = None
+        if any(match["status"] == "bad" for match in matches):
+            status = "known_bad"
+        elif matches:
+            status = "known_good"
+        return {"status": status, "matches": matches}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage FEAS known-file hash sets")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Build a hash set from text/CSV hash lists")
+    build.add_argument("name")
+    build.add_argument("sources", nargs="+")
+    build.add_argument("--status", choices=STATUSES, default="good")
+    build.add_argument("--algorithm", default="sha256")
+    build.add_argument("--output-dir", default=None)
+
+    commands.add_parser("list", help="List installed hash sets")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        print(build_hash_set(args.sources, args.name, args.status, args.algorithm, args.output_dir))
+    else:
+        for table in KnownFileFilter.tables():
+            print(table.describe())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,262 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import re
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import and_, or_
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.sql_models import ChainOfCustody, Job
+from app.services.compression import evidence_size
+from app.services.hashing import HashService, RateLimiter
+from app.services.storage import StorageService
+from app.storage.cache import CacheFillMismatch
+
+logger = logging.getLogger(__name__)
+
+# Sweep ids name the state file, so they are kept to a safe file name
+SWEEP_ID_PATTERN = r"^[A-Za-z0-9_-]{1,64}$"
+# Failed items listed in the state file; every one of them has its own custody row
+FAILURE_SAMPLE_LIMIT = 20
+
+# Per-process limiter, set by the pool initializer
+_worker_limiter: Optional[RateLimiter] = None
+
+
+def _init_worker(bytes_per_second: Optional[float]) -> None:
+    global _worker_limiter
+    _worker_limiter = RateLimiter(bytes_per_second) if bytes_per_second else None
+
+
+def _verify_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Re-hash one stored item (runs in a pool worker)
+
+    The evidence is read through the storage backend (object storage goes
+    through the local cache); it is only reported missing when the backend
+    says so.
+    """
+    rejected = None
+    try:
+        try:
+            path = asyncio.run(StorageService.local_path(item['storage_path'], item['sha256_hash']))
+        except FileNotFoundError:
+            return {**item, 'status': 'missing', 'current_hash': None, 'bytes': 0}
+        except CacheFillMismatch as e:
+            # The cache refused the object for its hash; hash the rejected copy to record the change
+            path = rejected = str(e.path)
+
+        size = evidence_size(path)
+        current_hash = HashService.compute_file_hash(path, rate_limiter=_worker_limiter)
+        if current_hash is None:
+            return {**item, 'status': 'error', 'current_hash': None, 'bytes': 0, 'error': 'hash failed'}
+        status = 'verified' if current_hash == item['sha256_hash'] else 'mismatch'
+        return {**item, 'status': status, 'current_hash': current_hash, 'bytes': size}
+    except Exception as e:
+        return {**item, 'status': 'error', 'current_hash': None, 'bytes': 0, 'error': str(e)}
+    finally:
+        if rejected:
+            os.unlink(rejected)
+
+
+def _state_path(sweep_id: str) -> Path:
+    if not re.match(SWEEP_ID_PATTERN, sweep_id or ""):
+        raise ValueError(f"Invalid sweep id: {sweep_id!r}")
+    return Path(settings.INTEGRITY_SWEEP_STATE_DIR) / f"{sweep_id}.json"
+
+
+class IntegritySweep:
+    """Re-verifies stored evidence in bulk with a bandwidth cap and resumable checkpoints.
+
+    Items are selected in (created_at, id) order and processed in batches on a
+    process pool. After each batch the custody rows are written in one commit
+    and the keyset cursor is checkpointed, so an interrupted sweep resumes from
+    the last completed batch. A sweep stopped between the two re-verifies that
+    batch on resume but skips the custody rows it already wrote.
+    """
+
+    def __init__(self,
+                 sweep_id: str = None,
+                 case_number: str = None,
+                 since: datetime = None,
+                 until: datetime = None,
+                 investigator_id: str = "SYSTEM",
+                 workers: int = None,
+                 bandwidth_mb_s: float = None,
+                 batch_size: int = None):
+        self.sweep_id = sweep_id or f"sweep-{uuid.uuid4().hex[:12]}"
+        self.investigator_id = investigator_id
+        self.workers = workers or settings.INTEGRITY_SWEEP_WORKERS or os.cpu_count() or 1
+        self.bandwidth_mb_s = bandwidth_mb_s if bandwidth_mb_s is not None else settings.INTEGRITY_SWEEP_BANDWIDTH_MB_S
+        self.batch_size = batch_size or settings.INTEGRITY_SWEEP_BATCH_SIZE
+        self.state_path = _state_path(self.sweep_id)
+        self.state = self._load_state() or {
+            'sweep_id': self.sweep_id,
+            'filters': {
+                'case_number': case_number,
+                'since': since.isoformat() if since else None,
+                'until': until.isoformat() if until else None
+            },
+            'status': 'pending',
+            'cursor': None,
+            'started_at': None,
+            'finished_at': None,
+            'counts': {'total': 0, 'verified': 0, 'mismatch': 0, 'missing': 0, 'error': 0},
+            'bytes_verified': 0,
+            # A sample of the failed items (the counts above have the totals)
+            'failures': []
+        }
+
+    @staticmethod
+    def load_state(sweep_id: str) -> Optional[Dict[str, Any]]:
+        """Read the checkpoint/summary of a sweep"""
+        state_path = _state_path(sweep_id)
+        if not state_path.exists():
+            return None
+        with open(state_path, 'r') as f:
+            return json.load(f)
+
+    def _load_state(self) -> Optional[Dict[str, Any]]:
+        state = self.load_state(self.sweep_id)
+        if state and state.get('cursor'):
+            logger.info(f"Resuming integrity sweep {self.sweep_id} after {state['cursor']['id']}")
+        return state
+
+    def _save_state(self) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.state_path.with_suffix('.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump(self.state, f, indent=2, default=str)
+        os.replace(temp_path, self.state_path)
+
+    def _next_batch(self, db) -> List[Job]:
+        filters = self.state['filters']
+        query = db.query(Job).filter(Job.storage_path.isnot(None), Job.sha256_hash.isnot(None))
+        if filters.get('case_number'):
+            query = query.filter(Job.case_number == filters['case_number'])
+        if filters.get('since'):
+            query = query.filter(Job.created_at >= datetime.fromisoformat(filters['since']))
+        if filters.get('until'):
+            query = query.filter(Job.created_at < datetime.fromisoformat(filters['until']))
+
+        cursor = self.state['cursor']
+        if cursor:
+            created_at = datetime.fromisoformat(cursor['created_at'])
+            query = query.filter(or_(
+                Job.created_at > created_at,
+                and_(Job.created_at == created_at, Job.id > cursor['id'])
+            ))
+        return query.order_by(Job.created_at, Job.id).limit(self.batch_size).all()
+
+    def _executor(self):
+        per_worker = self.bandwidth_mb_s * 1024 * 1024 / self.workers if self.bandwidth_mb_s else None
+        # Daemonic processes (e.g. Celery prefork children) cannot fork a pool;
+        # hashlib releases the GIL, so threads are the next best thing there
+        if multiprocessing.current_process().daemon:
+            _init_worker(self.bandwidth_mb_s * 1024 * 1024 if self.bandwidth_mb_s else None)
+            return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sweep")
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(per_worker,))
+
+    def run(self) -> Dict[str, Any]:
+        """Run (or resume) the sweep and return its summary"""
+        if self.state['status'] == 'completed':
+            return self.state
+
+        # A previous run may have committed the custody rows of the batch after its cursor
+        resuming = self.state['status'] != 'pending'
+        self.state['status'] = 'running'
+        self.state['started_at'] = self.state['started_at'] or datetime.utcnow().isoformat()
+        self._save_state()
+
+        db = SessionLocal()
+        try:
+            with self._executor() as executor:
+                while True:
+                    jobs = self._next_batch(db)
+                    if not jobs:
+                        break
+
+                    items = [{
+                        'job_id': job.id,
+                        'storage_path': job.storage_path,
+                        'sha256_hash': job.sha256_hash
+                    } for job in jobs]
+                    results = list(executor.map(_verify_item, items, chunksize=max(1, len(items) // (self.workers * 4))))
+
+                    self._record_batch(db, results, skip_recorded=resuming)
+                    resuming = False
+                    self.state['cursor'] = {'created_at': jobs[-1].created_at.isoformat(), 'id': jobs[-1].id}
+                    self._save_state()
+                    db.expunge_all()
+
+            self.state['status'] = 'completed'
+            self.state['finished_at'] = datetime.utcnow().isoformat()
+            self._save_state()
+
+            counts = self.state['counts']
+            logger.info(
+                f"Integrity sweep {self.sweep_id} finished: {counts['total']} items, "
+                f"{counts['mismatch']} mismatched, {counts['missing']} missing, {counts['error']} errors"
+            )
+            return self.state
+
+        except Exception as e:
+            logger.error(f"Integrity sweep {self.sweep_id} interrupted: {str(e)}")
+            self.state['status'] = 'interrupted'
+            self._save_state()
+            raise
+        finally:
+            db.close()
+
+    def _recorded_jobs(self, db, job_ids: List[str]) -> set:
+        """Those of ``job_ids`` that already have an INTEGRITY_VERIFICATION row from this sweep"""
+        rows = db.query(ChainOfCustody.job_id, ChainOfCustody.details).filter(
+            ChainOfCustody.event == "INTEGRITY_VERIFICATION", ChainOfCustody.job_id.in_(job_ids)
+        ).all()
+        return {job_id for job_id, details in rows if (details or {}).get('sweep_id') == self.sweep_id}
+
+    def _record_batch(self, db, results: List[Dict[str, Any]], skip_recorded: bool = False) -> None:
+        """Write one INTEGRITY_VERIFICATION row per item in a single commit
+
+        With ``skip_recorded``, items that already have a row from this sweep
+        are counted but not written again.
+        """
+        timestamp = datetime.utcnow().isoformat()
+        recorded = self._recorded_jobs(db, [result['job_id'] for result in results]) if skip_recorded else set()
+        db.add_all([
+            ChainOfCustody(
+                job_id=result['job_id'],
+                event="INTEGRITY_VERIFICATION",
+                investigator_id=self.investigator_id,
+                details={
+                    "sweep_id": self.sweep_id,
+                    "status": result['status'],
+                    "matches": result['status'] == 'verified',
+                    "original_hash": result['sha256_hash'],
+                    "current_hash": result['current_hash'],
+                    "error": result.get('error'),
+                    "timestamp": timestamp
+                },
+                hash_verification=result['current_hash']
+            ) for result in results if result['job_id'] not in recorded
+        ])
+        db.commit()
+
+        counts = self.state['counts']
+        for result in results:
+            counts['total'] += 1
+            counts[result['status']] += 1
+            self.state['bytes_verified'] += result['bytes']
+            if result['status'] != 'verified' and len(self.state['failures']) < FAILURE_SAMPLE_LIMIT:
+                self.state['failures'].append({
+                    'job_id': result['job_id'],
+                    'status': result['status'],
+                    'error': result.get('error')
+                })
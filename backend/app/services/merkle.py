@@ -0,0 +1,249 @@
+import hashlib
+import struct
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+import os
+
+from app.core.config import settings
+from app.services.compression import evidence_size
+from app.services.hashing import iter_file_blocks
+
+logger = logging.getLogger(__name__)
+
+# Domain separation between leaves and interior nodes (as in RFC 6962)
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+# File name of the serialized tree stored next to the evidence
+SIDECAR_NAME = "merkle.tree"
+TREE_MAGIC = b"FEASMKL1"
+TREE_HEADER = struct.Struct(">8sQQQ")  # magic, leaf_size, file_size, leaf_count
+DIGEST_SIZE = 32
+
+
+def hash_leaf(data) -> bytes:
+    digest = hashlib.sha256(LEAF_PREFIX)
+    digest.update(data)
+    return digest.digest()
+
+
+def hash_node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+class MerkleTree:
+    """SHA-256 Merkle tree over fixed-size leaf blocks of an evidence file.
+
+    ``levels[0]`` holds the leaf hashes and ``levels[-1]`` the root. An
+    unpaired node is promoted to the next level unchanged.
+    """
+
+    def __init__(self, leaf_size: int, file_size: int, levels: List[List[bytes]]):
+        self.leaf_size = leaf_size
+        self.file_size = file_size
+        self.levels = levels
+
+    @classmethod
+    def from_leaves(cls, leaf_size: int, file_size: int, leaves: List[bytes]) -> "MerkleTree":
+        if not leaves:
+            leaves = [hash_leaf(b"")]
+        levels = [list(leaves)]
+        while len(levels[-1]) > 1:
+            below = levels[-1]
+            above = [hash_node(below[i], below[i + 1]) for i in range(0, len(below) - 1, 2)]
+            if len(below) % 2:
+                above.append(below[-1])
+            levels.append(above)
+        return cls(leaf_size, file_size, levels)
+
+    @property
+    def leaves(self) -> List[bytes]:
+        return self.levels[0]
+
+    @property
+    def root(self) -> bytes:
+        return self.levels[-1][0]
+
+    @property
+    def root_hex(self) -> str:
+        return self.root.hex()
+
+    def summary(self) -> Dict[str, Any]:
+        return {"root": self.root_hex, "leaf_size": self.leaf_size, "leaf_count": len(self.leaves)}
+
+    def leaf_bounds(self, index: int) -> Tuple[int, int]:
+        """(offset, length) of the bytes covered by a leaf"""
+        offset = index * self.leaf_size
+        return offset, max(0, min(self.leaf_size, self.file_size - offset))
+
+    def leaves_for_range(self, start: int, end: int) -> range:
+        """Indices of the leaves overlapping the byte range [start, end)"""
+        if self.file_size == 0:
+            return range(0, 1)
+        start = max(0, start)
+        end = min(self.file_size, end)
+        if end <= start:
+            return range(0)
+        return range(start // self.leaf_size, (end - 1) // self.leaf_size + 1)
+
+    def proof(self, index: int) -> List[Tuple[bytes, bool]]:
+        """Audit path for a leaf: (sibling hash, sibling_is_left) pairs from the bottom up"""
+        path = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                path.append((level[sibling], sibling < index))
+            index //= 2
+        return path
+
+    @staticmethod
+    def verify_proof(leaf: bytes, proof: List[Tuple[bytes, bool]], root: bytes) -> bool:
+        node = leaf
+        for sibling, sibling_is_left in proof:
+            node = hash_node(sibling, node) if sibling_is_left else hash_node(node, sibling)
+        return node == root
+
+    def to_bytes(self) -> bytes:
+        """Serialize as a fixed header followed by every level, leaves first"""
+        parts = [TREE_HEADER.pack(TREE_MAGIC, self.leaf_size, self.file_size, len(self.leaves))]
+        for level in self.levels:
+            parts.extend(level)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "MerkleTree":
+        """Load a serialized tree, rejecting it if the stored interior nodes do not match the leaves"""
+        if len(data) < TREE_HEADER.size:
+            raise ValueError("Merkle tree is truncated")
+        magic, leaf_size, file_size, leaf_count = TREE_HEADER.unpack_from(data)
+        if magic != TREE_MAGIC:
+            raise ValueError("Not a FEAS Merkle tree")
+        offset = TREE_HEADER.size
+        if len(data) < offset + leaf_count * DIGEST_SIZE:
+            raise ValueError("Merkle tree is truncated")
+        leaves = [data[offset + i * DIGEST_SIZE:offset + (i + 1) * DIGEST_SIZE] for i in range(leaf_count)]
+        tree = cls.from_leaves(leaf_size, file_size, leaves)
+        if tree.to_bytes() != data:
+            raise ValueError("Merkle tree is corrupt")
+        return tree
+
+
+class MerkleBuilder:
+    """Accumulates leaf hashes from a stream of blocks of any size"""
+
+    def __init__(self, leaf_size: int = None):
+        self.leaf_size = leaf_size or settings.HASH_MERKLE_LEAF_SIZE
+        self._leaves = []
+        self._current = hashlib.sha256(LEAF_PREFIX)
+        self._filled = 0
+        self._size = 0
+
+    def update(self, data) -> None:
+        view = memoryview(data)
+        self._size += len(view)
+        while len(view):
+            take = min(len(view), self.leaf_size - self._filled)
+            self._current.update(view[:take])
+            self._filled += take
+            view = view[take:]
+            if self._filled == self.leaf_size:
+                self._close_leaf()
+
+    def _close_leaf(self) -> None:
+        self._leaves.append(self._current.digest())
+        self._current = hashlib.sha256(LEAF_PREFIX)
+        self._filled = 0
+
+    def tree(self) -> MerkleTree:
+        if self._filled:
+            self._close_leaf()
+        return MerkleTree.from_leaves(self.leaf_size, self._size, self._leaves)
+
+
+def _hash_leaves(file_path: str, leaf_size: int, first: int, last: int) -> List[bytes]:
+    """Hash leaves [first, last) of a file; blocks are read leaf-aligned"""
+    return [
+        hash_leaf(block)
+        for block in iter_file_blocks(file_path, leaf_size, offset=first * leaf_size,
+                                      length=(last - first) * leaf_size, buffers=1)
+    ]
+
+
+def hash_leaves_parallel(file_path: str, leaf_size: int, indices: range,
+                         max_workers: int = None) -> Dict[int, bytes]:
+    """Re-hash a run of leaves, splitting it into contiguous batches across worker threads"""
+    if not len(indices):
+        return {}
+    workers = max_workers or settings.HASH_SEGMENT_WORKERS or os.cpu_count() or 1
+    batch = max(1, -(-len(indices) // workers))
+    batches = [(start, min(start + batch, indices.stop)) for start in range(indices.start, indices.stop, batch)]
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="merkle") as executor:
+        results = executor.map(lambda b: (b[0], _hash_leaves(file_path, leaf_size, *b)), batches)
+        current = {}
+        for first, hashes in results:
+            current.update({first + i: digest for i, digest in enumerate(hashes)})
+    return current
+
+
+def _coalesce(indices: List[int], leaf_size: int, file_size: int) -> List[Dict[str, Any]]:
+    """Merge adjacent changed leaves into byte ranges"""
+    ranges = []
+    for index in indices:
+        offset = index * leaf_size
+        length = max(0, min(leaf_size, file_size - offset))
+        if ranges and ranges[-1]["offset"] + ranges[-1]["length"] == offset:
+            ranges[-1]["length"] += length
+        else:
+            ranges.append({"offset": offset, "length": length})
+    return ranges
+
+
+def verify_tree(file_path: str, tree: MerkleTree, expected_root: Optional[str] = None,
+                max_workers: int = None) -> Dict[str, Any]:
+    """Re-hash every leaf in parallel and compare against the stored tree and root"""
+    if expected_root and tree.root_hex != expected_root:
+        raise ValueError("Stored Merkle tree does not match the recorded root")
+
+    current_size = evidence_size(file_path)
+    leaf_count = max(1, -(-current_size // tree.leaf_size))
+    current = hash_leaves_parallel(file_path, tree.leaf_size, range(0, leaf_count), max_workers)
+    current_leaves = [current[i] for i in range(leaf_count)] if current_size else []
+    current_root = MerkleTree.from_leaves(tree.leaf_size, current_size, current_leaves).root_hex
+
+    changed = [i for i in range(max(len(tree.leaves), len(current_leaves)))
+               if i >= len(tree.leaves) or i >= len(current_leaves) or tree.leaves[i] != current_leaves[i]]
+    if not current_size and tree.file_size == 0:
+        changed = []
+
+    return {
+        "matches": current_root == tree.root_hex and current_size == tree.file_size,
+        "current_root": current_root,
+        "changed_ranges": _coalesce(changed, tree.leaf_size, max(current_size, tree.file_size))
+    }
+
+
+def verify_range(file_path: str, tree: MerkleTree, start: int, end: int,
+                 expected_root: Optional[str] = None) -> Dict[str, Any]:
+    """Prove a byte range intact by re-reading only the leaves that cover it.
+
+    Each re-hashed leaf is checked against its audit path up to the root, so
+    the proof holds even if the rest of the stored tree were altered.
+    """
+    root = bytes.fromhex(expected_root) if expected_root else tree.root
+    indices = tree.leaves_for_range(start, end)
+    if evidence_size(file_path) != tree.file_size:
+        return {"intact": False, "reason": "file size changed", "leaves_checked": 0, "changed_ranges": []}
+
+    current = hash_leaves_parallel(file_path, tree.leaf_size, indices)
+    # An empty file has a single leaf over zero bytes
+    changed = [i for i in indices
+               if not MerkleTree.verify_proof(current.get(i, hash_leaf(b"")), tree.proof(i), root)]
+
+    return {
+        "intact": not changed,
+        "leaves_checked": len(indices),
+        "bytes_read": sum(tree.leaf_bounds(i)[1] for i in indices),
+        "changed_ranges": _coalesce(changed, tree.leaf_size, tree.file_size)
+    }
@@ -9,6 +9,8 @@ from datetime import datetime
 import ffmpeg
 import tempfile
 
+from app.services.perceptual import perceptual_hashing_available, image_hashes, video_keyframe_hashes
+
 logger = logging.getLogger(__name__)
 
 class MetadataExtractor:
@@ -124,6 +126,26 @@ class MetadataExtractor:
             logger.error(f"Audio metadata extraction failed: {str(e)}")
             return {}
     
+    @staticmethod
+    def extract_perceptual_hashes(file_path: str, mime_type: str,
+                                  duration: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Perceptual hashes of an image or of sampled video keyframes (optional analyzer)"""
+        if not perceptual_hashing_available():
+            return None
+        try:
+            if mime_type.startswith('image/'):
+                frames = [image_hashes(file_path)]
+            elif mime_type.startswith('video/'):
+                frames = video_keyframe_hashes(file_path, duration)
+            else:
+                return None
+            
+            return {'algorithms': ['phash', 'dhash'], 'frames': frames} if frames else None
+            
+        except Exception as e:
+            logger.error(f"Perceptual hashing failed: {str(e)}")
+            return None
+    
     @staticmethod
     def extract_all_metadata(file_path: str) -> Dict[str, Any]:
         """Extract all available metadata based on file type"""
@@ -160,4 +182,11 @@ class MetadataExtractor:
             if media_data:
                 metadata['media'] = media_data
         
+        duration = metadata.get('media', {}).get('duration')
+        perceptual = MetadataExtractor.extract_perceptual_hashes(
+            file_path, mime_type, float(duration) if duration else None
+        )
+        if perceptual:
+            metadata['perceptual'] = perceptual
+        
         return metadata
\ No newline at end of file
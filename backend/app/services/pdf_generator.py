@@ -307,6 +307,35 @@ class PDFReportGenerator:
             
             hash_data = [
                 ["SHA-256 Hash:", job_details.metadata.sha256_hash or "N/A"],
+            ]
+            
+            # Additional interop digests computed in the same read pass
+            digest_labels = {"sha1": "SHA-1 Hash:", "md5": "MD5 Hash:", "sha512": "SHA-512 Hash:"}
+            for algorithm, digest in (job_details.metadata.hashes or {}).items():
+                if algorithm in digest_labels:
+                    hash_data.append([digest_labels[algorithm], Paragraph(digest, styles['HashText'])])
+            
+            merkle = job_details.metadata.merkle
+            if merkle:
+                hash_data.append(["Merkle Root:", Paragraph(merkle.get("root", "N/A"), styles['HashText'])])
+                hash_data.append([
+                    "Merkle Tree:",
+                    f"{merkle.get('leaf_count', 0):,} leaves of {merkle.get('leaf_size', 0):,} bytes (SHA-256)"
+                ])
+            
+            known_status = job_details.metadata.known_file_status
+            if known_status:
+                known_sets = ", ".join(
+                    f"{match['set']} ({match['algorithm'].upper()})" for match in job_details.metadata.known_file_sets or []
+                )
+                color = "#c53030" if known_status == "known_bad" else "#276749"
+                label = "KNOWN BAD" if known_status == "known_bad" else "KNOWN GOOD"
+                hash_data.append([
+                    "Known File:",
+                    Paragraph(f'<font color="{color}"><b>{label}</b></font> - {known_sets}', styles['ForensicBodyText'])
+                ])
+            
+            hash_data += [
                 ["File Name:", job_details.metadata.file_name or "N/A"],
                 ["File Size:", size_str],
                 ["MIME Type:", job_details.metadata.mime_type or "N/A"],
@@ -324,6 +353,14 @@ class PDFReportGenerator:
             )
             story.append(Paragraph(notice_text, styles['ForensicBodyText']))
             
+            if known_status == "known_bad":
+                story.append(Spacer(1, 6))
+                story.append(Paragraph(
+                    '<font color="#c53030"><b>⚠ KNOWN FILE ALERT:</b></font> This evidence matches a '
+                    'known-bad reference hash set. Handle and review in accordance with agency policy.',
+                    styles['ForensicBodyText']
+                ))
+            
             # ==================== CHAIN OF CUSTODY ====================
             story.append(Spacer(1, 25))
             story.append(PDFReportGenerator._create_section_header_table("CHAIN OF CUSTODY", "🔗"))
@@ -0,0 +1,242 @@
+import itertools
+import logging
+import re
+import subprocess
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:  # optional dependencies
+    np = None
+    Image = None
+
+HASH_SIZE = 8
+DCT_SIZE = 32
+_PTS_TIME = re.compile(r"pts_time:\s*([0-9.]+)")
+_dct_matrix = None
+
+
+def perceptual_hashing_available() -> bool:
+    return np is not None and settings.PERCEPTUAL_HASH_ENABLED
+
+
+def _low_frequency_dct():
+    """First HASH_SIZE rows of the orthonormal DCT-II matrix for DCT_SIZE samples"""
+    global _dct_matrix
+    if _dct_matrix is None:
+        n = np.arange(DCT_SIZE)
+        k = np.arange(HASH_SIZE)[:, None]
+        matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * DCT_SIZE)) * np.sqrt(2.0 / DCT_SIZE)
+        matrix[0] /= np.sqrt(2.0)
+        _dct_matrix = matrix
+    return _dct_matrix
+
+
+def _pack(bits) -> List[str]:
+    """(n, 64) boolean array -> 16-character hex strings"""
+    return [row.tobytes().hex() for row in np.packbits(bits.reshape(len(bits), -1), axis=1)]
+
+
+def phash_batch(frames) -> List[str]:
+    """pHash of (n, 32, 32) grayscale frames: low-frequency DCT coefficients above their median"""
+    dct = _low_frequency_dct()
+    coefficients = dct @ frames.astype(np.float64) @ dct.T
+    flat = coefficients.reshape(len(frames), -1)
+    return _pack(flat > np.median(flat, axis=1, keepdims=True))
+
+
+def dhash_batch(frames) -> List[str]:
+    """dHash of (n, 8, 9) grayscale frames: horizontal gradient signs"""
+    frames = frames.astype(np.int16)
+    return _pack(frames[:, :, 1:] > frames[:, :, :-1])
+
+
+def hamming(first: int, second: int) -> int:
+    return (first ^ second).bit_count()
+
+
+def image_hashes(file_path: str) -> Optional[Dict[str, Any]]:
+    """pHash and dHash of an image file"""
+    with Image.open(file_path) as image:
+        # Let JPEG decode at reduced scale; we only need a thumbnail
+        image.draft("L", (DCT_SIZE * 2, DCT_SIZE * 2))
+        gray = image.convert("L")
+        large = np.asarray(gray.resize((DCT_SIZE, DCT_SIZE), Image.Resampling.LANCZOS))
+        small = np.asarray(gray.resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS))
+    return {
+        "index": 0,
+        "timestamp": None,
+        "phash": phash_batch(large[None])[0],
+        "dhash": dhash_batch(small[None])[0]
+    }
+
+
+def video_keyframe_hashes(file_path: str, duration: Optional[float], frames: int = None) -> List[Dict[str, Any]]:
+    """pHash and dHash of keyframes sampled evenly across a video.
+
+    ffmpeg decodes only keyframes, downsamples them to 32x32 grayscale and
+    streams raw pixels back, so all frames are hashed in one vectorized batch.
+    """
+    frames = frames or settings.PERCEPTUAL_VIDEO_FRAMES
+    interval = (duration / frames) if duration else 0
+    video_filter = (
+        f"select='isnan(prev_selected_t)+gte(t-prev_selected_t,{interval:.3f})',"
+        f"scale={DCT_SIZE}:{DCT_SIZE}:flags=area,format=gray,showinfo"
+    )
+    result = subprocess.run(
+        ["ffmpeg", "-v", "info", "-nostdin", "-skip_frame", "nokey", "-i", file_path,
+         "-vf", video_filter, "-vsync", "vfr", "-frames:v", str(frames),
+         "-f", "rawvideo", "-pix_fmt", "gray", "pipe:1"],
+        capture_output=True,
+        timeout=settings.PERCEPTUAL_FFMPEG_TIMEOUT
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode(errors="replace")[-500:])
+
+    frame_bytes = DCT_SIZE * DCT_SIZE
+    count = len(result.stdout) // frame_bytes
+    if not count:
+        return []
+    pixels = np.frombuffer(result.stdout[:count * frame_bytes], dtype=np.uint8).reshape(count, DCT_SIZE, DCT_SIZE)
+    small = np.stack([
+        np.asarray(Image.fromarray(frame).resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS))
+        for frame in pixels
+    ])
+    timestamps = [float(t) for t in _PTS_TIME.findall(result.stderr.decode(errors="replace"))]
+
+    return [
+        {
+            "index": i,
+            "timestamp": timestamps[i] if i < len(timestamps) else None,
+            "phash": phash,
+            "dhash": dhash
+        }
+        for i, (phash, dhash) in enumerate(zip(phash_batch(pixels), dhash_batch(small)))
+    ]
+
+
+class MultiIndexHash:
+    """Multi-index hashing over 64-bit hashes under Hamming distance.
+
+    Each hash is split into ``chunks`` disjoint bit substrings, each with
+    its own exact-match table. By the pigeonhole principle anything within
+    ``radius`` differs in at most ``radius // chunks`` bits in some chunk, so
+    probing every chunk value within that sub-radius finds all candidates;
+    only those are checked against the full distance.
+    """
+
+    def __init__(self, chunks: int = 4):
+        self.chunks = chunks
+        self.chunk_bits = 64 // chunks
+        self._chunk_mask = (1 << self.chunk_bits) - 1
+        self._tables = [{} for _ in range(chunks)]
+        self._values = []
+        self._payloads = []
+        self._flips = {}
+
+    @property
+    def size(self) -> int:
+        return len(self._values)
+
+    def _split(self, value: int) -> List[int]:
+        return [(value >> (i * self.chunk_bits)) & self._chunk_mask for i in range(self.chunks)]
+
+    def _flip_masks(self, radius: int) -> List[int]:
+        """Every chunk-sized mask with at most ``radius`` bits set"""
+        if radius not in self._flips:
+            masks = [0]
+            for bits in range(1, radius + 1):
+                masks.extend(sum(1 << b for b in combo)
+                              for combo in itertools.combinations(range(self.chunk_bits), bits))
+            self._flips[radius] = masks
+        return self._flips[radius]
+
+    def add(self, value: int, payload: Any) -> None:
+        entry = len(self._values)
+        self._values.append(value)
+        self._payloads.append(payload)
+        for table, chunk in zip(self._tables, self._split(value)):
+            table.setdefault(chunk, []).append(entry)
+
+    def remove(self, predicate) -> int:
+        """Drop every entry whose payload matches ``predicate``; returns how many were dropped"""
+        kept = [(value, payload) for value, payload in zip(self._values, self._payloads) if not predicate(payload)]
+        removed = len(self._values) - len(kept)
+        if removed:
+            self._tables = [{} for _ in range(self.chunks)]
+            self._values, self._payloads = [], []
+            for value, payload in kept:
+                self.add(value, payload)
+        return removed
+
+    def search(self, value: int, radius: int) -> List[Tuple[int, Any]]:
+        """(distance, payload) pairs within ``radius`` of ``value``"""
+        masks = self._flip_masks(radius // self.chunks)
+        seen = set()
+        found = []
+        for table, chunk in zip(self._tables, self._split(value)):
+            for mask in masks:
+                for entry in table.get(chunk ^ mask, ()):
+                    if entry in seen:
+                        continue
+                    seen.add(entry)
+                    distance = hamming(value, self._values[entry])
+                    if distance <= radius:
+                        found.append((distance, self._payloads[entry]))
+        return found
+
+
+class PerceptualIndex:
+    """In-memory multi-index hash table of every stored pHash.
+
+    Built from the database at startup and topped up incrementally from rows
+    with a higher id before each query, so hashes written by Celery workers in
+    other processes become searchable without a rebuild. Rows of deleted
+    jobs are not seen by the refresh; callers ``evict`` them when a search
+    turns up a job that no longer exists.
+    """
+
+    def __init__(self):
+        self._table = MultiIndexHash()
+        self._last_id = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._table.size
+
+    def refresh(self, db) -> int:
+        """Load rows added since the last refresh; returns how many were added"""
+        from app.models.sql_models import PerceptualHash
+
+        with self._lock:
+            rows = db.query(PerceptualHash.id, PerceptualHash.job_id, PerceptualHash.frame_index,
+                            PerceptualHash.timestamp, PerceptualHash.phash)\
+                .filter(PerceptualHash.id > self._last_id)\
+                .order_by(PerceptualHash.id)\
+                .yield_per(10000)
+            added = 0
+            for row in rows:
+                self._table.add(int(row.phash, 16), (row.job_id, row.frame_index, row.timestamp))
+                self._last_id = row.id
+                added += 1
+            return added
+
+    def evict(self, job_ids) -> int:
+        """Drop the hashes of jobs that no longer exist; returns how many were dropped"""
+        job_ids = set(job_ids)
+        with self._lock:
+            return self._table.remove(lambda payload: payload[0] in job_ids)
+
+    def search(self, phash: str, max_distance: int) -> List[Tuple[int, Any]]:
+        with self._lock:
+            return self._table.search(int(phash, 16), max_distance)
+
+
+perceptual_index = PerceptualIndex()
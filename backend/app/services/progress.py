@@ -0,0 +1,93 @@
+import logging
+import threading
+import time
+from typing import Optional
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.sql_models import Job
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressReporter:
+    """Coalesces byte-level progress of one job stage into occasional Job row updates.
+
+    Callers report every chunk; a single UPDATE is issued only when at least
+    ``interval_ms`` has passed since the last one and the stage advanced by
+    ``min_step`` percent of its bytes or more. The stage occupies the
+    ``[start, end]`` band of ``Job.progress``.
+    """
+
+    def __init__(self, job_id: str, start: float, end: float, total_bytes: Optional[int] = None,
+                 interval_ms: int = None, min_step: float = None):
+        self.job_id = job_id
+        self.start = start
+        self.end = end
+        self.total_bytes = total_bytes
+        self.done_bytes = 0
+        self.interval = (interval_ms if interval_ms is not None else settings.PROGRESS_INTERVAL_MS) / 1000
+        self.min_step = min_step if min_step is not None else settings.PROGRESS_MIN_STEP
+        self.published = 0
+        self._last_time = 0.0
+        self._last_fraction = 0.0
+        # yt-dlp reports from its own thread
+        self._lock = threading.Lock()
+
+    def _fraction(self) -> float:
+        if not self.total_bytes:
+            return 0.0
+        return min(1.0, self.done_bytes / self.total_bytes)
+
+    def advance(self, amount: int) -> None:
+        """Record ``amount`` more bytes processed"""
+        with self._lock:
+            self.done_bytes += amount
+            self._maybe_publish()
+
+    def update(self, done_bytes: int, total_bytes: Optional[int] = None) -> None:
+        """Record an absolute position (e.g. from a downloader hook)"""
+        with self._lock:
+            self.done_bytes = done_bytes
+            if total_bytes:
+                self.total_bytes = total_bytes
+            self._maybe_publish()
+
+    def finish(self) -> None:
+        """Publish the final position of the stage"""
+        with self._lock:
+            if self.total_bytes is None:
+                self.total_bytes = self.done_bytes
+            self._publish(1.0 if self.total_bytes == self.done_bytes else self._fraction())
+
+    def _maybe_publish(self) -> None:
+        now = time.monotonic()
+        if now - self._last_time < self.interval:
+            return
+        fraction = self._fraction()
+        if (fraction - self._last_fraction) * 100 < self.min_step:
+            return
+        self._publish(fraction)
+
+    def _publish(self, fraction: float) -> None:
+        self._last_time = time.monotonic()
+        self._last_fraction = fraction
+        progress = self.start + (self.end - self.start) * fraction
+        db = SessionLocal()
+        try:
+            db.query(Job).filter(Job.id == self.job_id).update(
+                {
+                    Job.progress: round(progress, 2),
+                    Job.bytes_processed: self.done_bytes,
+                    Job.bytes_total: self.total_bytes
+                },
+                synchronize_session=False
+            )
+            db.commit()
+            self.published += 1
+        except Exception as e:
+            # Progress is advisory; never fail the stage over it
+            db.rollback()
+            logger.warning(f"Progress update for job {self.job_id} failed: {str(e)}")
+        finally:
+            db.close()
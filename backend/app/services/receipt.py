@@ -0,0 +1,42 @@
+"""Acquisition receipts: the digests fixed while evidence is first written to disk.
+
+The upload endpoint and the HTTP fetcher feed the bytes, as they arrive, to
+the same digests, segment hashes, Merkle leaves and TLSH the pipeline would
+otherwise compute in a second read pass. ``UnifiedForensicPipeline`` reuses a
+receipt that covers everything it needs instead of re-reading the file.
+"""
+
+from typing import Any, Dict
+
+from app.core.config import settings
+from app.services.hashing import MultiDigest
+from app.services.merkle import MerkleBuilder
+from app.services.similarity import FuzzyHasher, fuzzy_hashing_available
+
+
+def receipt_digest() -> MultiDigest:
+    """Digest to feed the evidence bytes to in order as they are received"""
+    consumers = {"merkle": MerkleBuilder()} if settings.HASH_MERKLE_ENABLED else {}
+    if fuzzy_hashing_available():
+        consumers["fuzzy"] = FuzzyHasher()
+    return MultiDigest(segment_size=settings.HASH_SEGMENT_SIZE, consumers=consumers)
+
+
+def build_receipt(digests: MultiDigest, file_size: int, **details) -> Dict[str, Any]:
+    """Receipt for the pipeline: digests, size, segments and the Merkle leaves / TLSH when enabled"""
+    receipt = {"hashes": digests.hexdigests(), "file_size": file_size, **details, "segments": digests.segments()}
+    if "merkle" in digests.consumers:
+        tree = digests.consumers["merkle"].tree()
+        receipt["merkle_leaf_size"] = tree.leaf_size
+        receipt["merkle_leaves"] = [leaf.hex() for leaf in tree.leaves]
+        receipt["merkle_root"] = tree.root_hex
+    if "fuzzy" in digests.consumers:
+        receipt["fuzzy_hash"] = digests.consumers["fuzzy"].hexdigest()
+    return receipt
+
+
+def receipt_summary(receipt: Dict[str, Any]) -> Dict[str, Any]:
+    """The receipt without its per-segment and per-leaf lists, for the custody log"""
+    summary = {k: v for k, v in receipt.items() if k not in ("segments", "merkle_leaves")}
+    summary["segment_count"] = len(receipt["segments"])
+    return summary
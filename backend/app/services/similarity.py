@@ -0,0 +1,109 @@
+import logging
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.sql_models import Job, SimilarityBand
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tlsh
+except ImportError:  # optional dependency (py-tlsh)
+    tlsh = None
+
+# TLSH digest layout: "T1" version prefix, 3 header bytes, 32-byte bucket body
+TLSH_BODY_HEX = 64
+
+
+def fuzzy_hashing_available() -> bool:
+    return tlsh is not None and settings.FUZZY_HASH_ENABLED
+
+
+class FuzzyHasher:
+    """Streaming TLSH digest, usable as a ``MultiDigest`` consumer"""
+
+    def __init__(self):
+        self._hash = tlsh.Tlsh()
+
+    def update(self, data) -> None:
+        # tlsh only takes read-only buffers, so pooled read buffers are copied
+        self._hash.update(data if isinstance(data, bytes) else bytes(data))
+
+    def hexdigest(self) -> Optional[str]:
+        """TLSH digest, or None when the input is too short or uniform to be fingerprinted"""
+        try:
+            self._hash.final()
+            digest = self._hash.hexdigest()
+        except ValueError:
+            return None
+        return digest if digest and digest != "TNULL" else None
+
+
+class SimilarityIndex:
+    """Locality-sensitive index over TLSH digests.
+
+    The bucket body of a digest is cut into fixed bands and each band is
+    stored as an exact-match key. Near-duplicates keep most of their buckets,
+    so they share at least one band; only jobs sharing a band are scored with
+    the full TLSH distance instead of comparing against every job.
+    """
+
+    @staticmethod
+    def band_keys(digest: str) -> List[str]:
+        width = settings.FUZZY_HASH_BAND_WIDTH
+        body = digest[-TLSH_BODY_HEX:]
+        return [f"{i // width}:{body[i:i + width]}" for i in range(0, TLSH_BODY_HEX, width)]
+
+    @staticmethod
+    def distance(first: str, second: str) -> int:
+        return tlsh.diff(first, second)
+
+    @staticmethod
+    def index_job(db: Session, job_id: str, digest: str) -> None:
+        """Add band rows for a job (committed by the caller)"""
+        db.add_all([SimilarityBand(job_id=job_id, band=key) for key in SimilarityIndex.band_keys(digest)])
+
+    @staticmethod
+    def find_similar(db: Session, digest: str, limit: int = 20, max_distance: int = None,
+                     exclude_job_id: str = None) -> List[Dict[str, Any]]:
+        """Jobs whose TLSH distance to ``digest`` is within ``max_distance``, closest first"""
+        if tlsh is None:
+            return []
+        max_distance = settings.FUZZY_HASH_MAX_DISTANCE if max_distance is None else max_distance
+
+        # Jobs sharing the most bands are the most likely matches; cap how many get scored
+        shared = func.count(SimilarityBand.id)
+        query = db.query(SimilarityBand.job_id, shared)\
+            .filter(SimilarityBand.band.in_(SimilarityIndex.band_keys(digest)))
+        if exclude_job_id:
+            query = query.filter(SimilarityBand.job_id != exclude_job_id)
+        candidates = dict(
+            query.group_by(SimilarityBand.job_id)
+            .order_by(shared.desc())
+            .limit(settings.FUZZY_HASH_MAX_CANDIDATES)
+            .all()
+        )
+        if not candidates:
+            return []
+
+        jobs = db.query(Job.id, Job.fuzzy_hash, Job.filename, Job.case_number, Job.sha256_hash)\
+            .filter(Job.id.in_(list(candidates)), Job.fuzzy_hash.isnot(None)).all()
+
+        matches = []
+        for job in jobs:
+            score = SimilarityIndex.distance(digest, job.fuzzy_hash)
+            if score <= max_distance:
+                matches.append({
+                    "job_id": job.id,
+                    "filename": job.filename,
+                    "case_number": job.case_number,
+                    "sha256_hash": job.sha256_hash,
+                    "fuzzy_hash": job.fuzzy_hash,
+                    "distance": score,
+                    "shared_bands": candidates[job.id]
+                })
+        matches.sort(key=lambda match: match["distance"])
+        return matches[:limit]
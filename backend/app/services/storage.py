@@ -1,65 +1,127 @@
+import importlib
 import logging
-import shutil
-import json
-from pathlib import Path
-from datetime import datetime
-import uuid
-from typing import Dict, Any
+import os
+import threading
+from typing import Dict, Any, Callable, Optional
 
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# STORAGE_TYPE -> "module:Class"; imported on first use so boto3 is only loaded for S3
+STORAGE_BACKENDS: Dict[str, str] = {
+    "local": "app.storage.local_storage:LocalStorage",
+    "s3": "app.storage.s3_storage:S3Storage",
+}
+
 class StorageService:
-    """Storage service for handling evidence files"""
+    """Storage service for handling evidence files.
+
+    Routes every call to the backend registered for ``STORAGE_TYPE``; one
+    backend instance is kept per process.
+    """
     
     storage_type = settings.STORAGE_TYPE
+    _backend = None
+    _backend_key = None
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def register_backend(name: str, target: str) -> None:
+        """Make a backend class ("module:Class") selectable through STORAGE_TYPE"""
+        STORAGE_BACKENDS[name] = target
+    
+    @classmethod
+    def backend(cls):
+        """The backend for the configured storage type, created once per process"""
+        key = (cls.storage_type, os.getpid())
+        if cls._backend_key != key:
+            with cls._lock:
+                if cls._backend_key != key:
+                    target = STORAGE_BACKENDS.get(cls.storage_type)
+                    if target is None:
+                        raise ValueError(f"Unsupported storage type: {cls.storage_type}")
+                    module_name, class_name = target.split(":")
+                    cls._backend = getattr(importlib.import_module(module_name), class_name)()
+                    cls._backend_key = key
+        return cls._backend
     
     @classmethod
     async def initialize(cls):
         """Initialize storage service"""
-        if cls.storage_type == "local":
-            Path(settings.LOCAL_STORAGE_PATH).mkdir(parents=True, exist_ok=True)
-            logger.info(f"Local storage initialized at {settings.LOCAL_STORAGE_PATH}")
+        cls.backend()
+        logger.info(f"Storage backend initialized: {cls.storage_type}")
+    
+    @classmethod
+    async def check_health(cls) -> Dict[str, Any]:
+        return await cls.backend().check_health()
     
     @classmethod
-    async def store_evidence(cls, file_path: str, job_id: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
-        """Store evidence file"""
-        if cls.storage_type == "local":
-            return await cls._store_local(file_path, job_id, metadata)
-        else:
-            raise ValueError(f"Unsupported storage type: {cls.storage_type}")
+    async def store_evidence(cls, file_path: str, job_id: str, metadata: Dict[str, Any],
+                             sidecars: Dict[str, bytes] = None, move: bool = False,
+                             progress_callback: Callable[[int], None] = None) -> Dict[str, Any]:
+        """Store evidence file along with optional binary sidecars (e.g. the Merkle tree).
 
+        ``move`` hands the file over to storage, which may rename it into place.
+        """
+        return await cls.backend().store(file_path, job_id, metadata, sidecars, move, progress_callback)
+    
+    @classmethod
+    async def retrieve(cls, job_id: str, local_copy: bool = False) -> Optional[Dict[str, Any]]:
+        return await cls.backend().retrieve(job_id, local_copy)
+    
+    @classmethod
+    async def local_path(cls, storage_path: str, sha256: str) -> str:
+        """A local file with the evidence at ``storage_path``, for verification and previews.
+
+        Raises ``FileNotFoundError`` when the backend no longer holds the evidence.
+        """
+        return await cls.backend().local_path(storage_path, sha256)
+    
+    @classmethod
+    async def delete(cls, job_id: str) -> bool:
+        return await cls.backend().delete(job_id)
+    
+    @classmethod
+    async def list_jobs(cls) -> list:
+        return await cls.backend().list_jobs()
+    
+    @classmethod
+    async def list_jobs_page(cls, cursor: str = None, limit: int = 100) -> Dict[str, Any]:
+        """One page of stored jobs plus the cursor of the next page (None at the end)"""
+        jobs = []
+        listing = cls.backend().iter_jobs(cursor)
+        try:
+            async for job in listing:
+                if len(jobs) == limit:
+                    return {'jobs': jobs, 'next_cursor': jobs[-1]['cursor']}
+                jobs.append(job)
+        finally:
+            await listing.aclose()
+        return {'jobs': jobs, 'next_cursor': None}
+    
+    @classmethod
+    async def evidence_source(cls, storage_path: str, sha256: str) -> Dict[str, Any]:
+        """How to serve evidence bytes: ``{'path', 'size'}`` for a local file, ``{'key', 'size'}`` for an object"""
+        return await cls.backend().evidence_source(storage_path, sha256)
+    
+    @classmethod
+    def presigned_url(cls, storage_path: str, file_name: str = None, media_type: str = None) -> str:
+        """Short-lived direct download URL (object storage only)"""
+        return cls.backend().presigned_url(storage_path, file_name, media_type)
+    
+    @classmethod
+    def iter_range(cls, storage_path: str, start: int, end: int):
+        """Async iterator over bytes ``start``-``end`` of an object (object storage only)"""
+        return cls.backend().iter_range(storage_path, start, end)
+    
+    @classmethod
+    def cache_stats(cls) -> Optional[Dict[str, Any]]:
+        """Read-through cache statistics, for backends that keep one"""
+        backend = cls.backend()
+        return backend.cache_stats() if hasattr(backend, 'cache_stats') else None
+    
     @classmethod
-    async def _store_local(cls, file_path: str, job_id: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
-        """Store file in local filesystem"""
-        source_path = Path(file_path)
-        
-        # Create job directory
-        job_dir = Path(settings.LOCAL_STORAGE_PATH) / job_id
-        job_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Generate unique filename
-        original_name = metadata.get('basic', {}).get('file_name', 'evidence')
-        file_ext = Path(original_name).suffix
-        if not file_ext:
-            file_ext = source_path.suffix
-            
-        storage_name = f"{uuid.uuid4().hex}{file_ext}"
-        dest_path = job_dir / storage_name
-        
-        # Copy file
-        shutil.copy2(source_path, dest_path)
-        
-        # Create metadata file
-        metadata_file = job_dir / "metadata.json"
-        with open(metadata_file, 'w') as f:
-            json.dump(metadata, f, indent=2, default=str)
-        
-        return {
-            'success': True,
-            'path': str(dest_path),
-            'location': f"local://{dest_path}",
-            'size': dest_path.stat().st_size,
-            'stored_at': datetime.utcnow().isoformat()
-        }
\ No newline at end of file
+    async def read_sidecar(cls, job_id: str, name: str) -> Optional[bytes]:
+        """Read a sidecar stored next to a job's evidence"""
+        return await cls.backend().read_sidecar(job_id, name)
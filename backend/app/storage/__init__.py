@@ -0,0 +1,26 @@
+import base64
+
+from app.services.merkle import SIDECAR_NAME as MERKLE_SIDECAR
+
+METADATA_FILE = "metadata.sidecar"
+# Plain JSON metadata written before the sidecar format; still read
+LEGACY_METADATA_FILE = "metadata.json"
+# Files in a job directory/prefix that are not evidence
+NON_EVIDENCE_FILES = {METADATA_FILE, LEGACY_METADATA_FILE, MERKLE_SIDECAR}
+
+
+def is_evidence_name(name: str) -> bool:
+    """Whether a file in a job directory/prefix is evidence (not metadata, a sidecar or a temp file)"""
+    return bool(name) and name not in NON_EVIDENCE_FILES and not name.startswith(".")
+
+
+def encode_cursor(position: str) -> str:
+    """Opaque listing cursor for the API"""
+    return base64.urlsafe_b64encode(position.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid listing cursor")
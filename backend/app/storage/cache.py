@@ -0,0 +1,182 @@
+import os
+import threading
+import uuid
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Any, Optional
+
+from app.core.config import settings
+from app.services.compression import register_storage_root
+from app.services.hashing import HashService
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+
+class CacheFillMismatch(IOError):
+    """A fetched object did not hash to its cache key; ``path`` holds the rejected copy"""
+
+    def __init__(self, message: str, path: Path):
+        super().__init__(message)
+        self.path = path
+
+
+class EvidenceCache:
+    """Size-bounded local read-through cache for evidence held in object storage.
+
+    Entries are keyed by content hash, so a cached file can never be stale
+    and identical evidence in several jobs is fetched once. A fill downloads
+    into a temp file, checks its SHA-256, and renames it into place, so
+    readers only ever see complete entries. Concurrent requests for the same
+    cold entry are collapsed into a single fetch: by a per-key lock inside
+    the process and an advisory file lock across processes (API and Celery
+    workers share the directory). Hits refresh an entry's mtime, and eviction
+    removes the least recently used entries once the cache exceeds
+    ``max_bytes``.
+    """
+
+    def __init__(self, directory: str = None, max_bytes: int = None):
+        self.directory = Path(directory or settings.S3_CACHE_DIR)
+        self.max_bytes = max_bytes if max_bytes is not None else settings.S3_CACHE_MAX_BYTES
+        self.entry_root = self.directory / "entries"
+        self.temp_root = self.directory / "tmp"
+        self.lock_root = self.directory / "locks"
+        self.rejected_root = self.directory / "rejected"
+        register_storage_root(self.directory)
+        for path in (self.entry_root, self.temp_root, self.lock_root, self.rejected_root):
+            path.mkdir(parents=True, exist_ok=True)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'evictions': 0,
+                       'bytes_fetched': 0, 'bytes_served': 0, 'fill_errors': 0}
+
+    def entry_path(self, sha256: str, suffix: str = "") -> Path:
+        return self.entry_root / sha256[:2] / f"{sha256}{suffix}"
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    @contextmanager
+    def _key_lock(self, key: str):
+        with self._locks_guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_root / f"{key}.lock", "w") as handle:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _hit(self, path: Path) -> Optional[Path]:
+        try:
+            os.utime(path)
+            size = path.stat().st_size
+        except FileNotFoundError:
+            # Evicted between the check and the touch
+            return None
+        self._count('hits')
+        self._count('bytes_served', size)
+        return path
+
+    def get(self, sha256: str, fetch: Callable[[Path], None], suffix: str = "") -> Path:
+        """Local path of the entry, calling ``fetch(temp_path)`` to download it on a miss.
+
+        A fetched file whose hash differs is never published under the key
+        (other jobs with the same hash share the entry); it is moved aside and
+        reported with ``CacheFillMismatch``, which the caller must clean up.
+        """
+        path = self.entry_path(sha256, suffix)
+        if path.exists() and self._hit(path):
+            return path
+
+        with self._key_lock(sha256 + suffix):
+            # Another reader filled it while we waited for the lock
+            if path.exists() and self._hit(path):
+                self._count('coalesced')
+                return path
+
+            self._count('misses')
+            temp_path = self.temp_root / f"{uuid.uuid4().hex}{suffix}"
+            try:
+                fetch(temp_path)
+                if settings.S3_CACHE_VERIFY_FILLS:
+                    current = HashService.compute_file_hash(str(temp_path))
+                    if current != sha256:
+                        rejected = self.rejected_root / temp_path.name
+                        os.replace(temp_path, rejected)
+                        raise CacheFillMismatch(f"Fetched evidence hash {current} does not match {sha256}", rejected)
+                size = temp_path.stat().st_size
+                path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(temp_path, path)
+            except Exception:
+                self._count('fill_errors')
+                temp_path.unlink(missing_ok=True)
+                raise
+            self._count('bytes_fetched', size)
+            self._count('bytes_served', size)
+
+        self.evict()
+        return path
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits; returns how many were removed"""
+        entries = []
+        total = 0
+        for path in self.entry_root.glob("*/*"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            # Readers holding the file open keep reading it after the unlink
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        self._count('evictions', removed)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        entries = [path.stat().st_size for path in self.entry_root.glob("*/*") if path.is_file()]
+        return {
+            **stats,
+            'hit_rate': round(stats['hits'] / lookups, 4) if lookups else None,
+            'entries': len(entries),
+            'size_bytes': sum(entries),
+            'max_bytes': self.max_bytes
+        }
+
+
+_cache: Optional[EvidenceCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> EvidenceCache:
+    """The process-wide evidence cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EvidenceCache()
+    return _cache
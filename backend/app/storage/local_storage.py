@@ -1,89 +1,520 @@
+import argparse
+import errno
+import hashlib
+import os
 import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, AsyncIterator, Callable, Iterable, Optional
 import json
 from datetime import datetime
 import uuid
 import logging
 
 from app.core.config import settings
+from app.services.compression import (
+    COMPRESSED_SUFFIX, FORMAT_NAME, compress_file, evidence_size, is_compressed, register_storage_root,
+    should_compress, stored_suffix
+)
+from app.services.hashing import HashService
+from app.storage import METADATA_FILE, LEGACY_METADATA_FILE, encode_cursor, decode_cursor, is_evidence_name
+from app.storage.manifest import StorageManifest
+from app.storage.sidecar import read_sidecar, write_atomic, write_sidecar
 
 logger = logging.getLogger(__name__)
 
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+FICLONE = 0x40049409  # _IOW(0x94, 9, int) from linux/fs.h
+COPY_CHUNK_SIZE = 64 * 1024 * 1024
+BLOB_DIR = "blobs"
+JOB_DIR = "jobs"
+MANIFEST_FILE = "manifest.sqlite"
+# Top-level directories that are not jobs in the flat layout used before sharding
+RESERVED_DIRS = {BLOB_DIR, JOB_DIR, "temp_uploads"}
+LIST_PAGE_SIZE = 1000
+FSCK_BATCH_SIZE = 1000
+
+
+def _reflink(src_fd: int, dst_fd: int) -> bool:
+    """Share the source extents with the destination (XFS/Btrfs copy-on-write clone)"""
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    except OSError:
+        return False
+
+
+def _kernel_copy(src_fd: int, dst_fd: int, size: int,
+                 progress_callback: Callable[[int], None] = None) -> Optional[str]:
+    """Copy inside the kernel with copy_file_range, else sendfile; None if neither is supported"""
+    for strategy, copy_chunk in (
+        ("copy_file_range", getattr(os, "copy_file_range", None)),
+        ("sendfile", getattr(os, "sendfile", None)),
+    ):
+        if copy_chunk is None:
+            continue
+        offset = 0
+        try:
+            while offset < size:
+                count = min(COPY_CHUNK_SIZE, size - offset)
+                if strategy == "copy_file_range":
+                    sent = copy_chunk(src_fd, dst_fd, count, offset, offset)
+                else:
+                    sent = copy_chunk(dst_fd, src_fd, offset, count)
+                if sent == 0:
+                    break
+                offset += sent
+                if progress_callback:
+                    progress_callback(sent)
+        except OSError:
+            # Unsupported for this pair of files (e.g. EXDEV on older kernels); nothing reported yet
+            if offset == 0:
+                continue
+            raise
+        if offset == size:
+            return strategy
+    return None
+
+
+def commit_file(source_path: Path, dest_path: Path, expected_sha256: str = None, move: bool = False,
+                progress_callback: Callable[[int], None] = None) -> Dict[str, Any]:
+    """Place a file at ``dest_path`` with the cheapest strategy that works.
+
+    With ``move`` the source is consumed: on the same filesystem it is renamed
+    into place and no bytes are written. Otherwise the data is reflinked,
+    copied in-kernel (``copy_file_range``, then ``sendfile``) or, as a last
+    resort, copied through a buffer. Copies are hashed and checked against
+    ``expected_sha256``; a mismatch removes the copy and raises ``IOError``.
+    """
+    size = source_path.stat().st_size
+    if move:
+        try:
+            os.rename(source_path, dest_path)
+            if progress_callback:
+                progress_callback(size)
+            return {'strategy': 'rename', 'sha256': expected_sha256, 'verified': False}
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+    
+    sha256 = None
+    try:
+        with open(source_path, 'rb') as src, open(dest_path, 'wb') as dst:
+            if _reflink(src.fileno(), dst.fileno()):
+                strategy = 'reflink'
+                if progress_callback:
+                    progress_callback(size)
+            else:
+                strategy = _kernel_copy(src.fileno(), dst.fileno(), size, progress_callback)
+            if strategy is None:
+                strategy = 'buffered'
+                digest = hashlib.sha256()
+                while True:
+                    chunk = src.read(settings.HASH_BLOCK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    dst.write(chunk)
+                    if progress_callback:
+                        progress_callback(len(chunk))
+                sha256 = digest.hexdigest()
+        shutil.copystat(source_path, dest_path)
+        
+        if sha256 is None and settings.STORAGE_VERIFY_COPY:
+            # In-kernel copies never pass through user space; read the copy back once
+            sha256 = HashService.compute_file_hash(str(dest_path))
+        if expected_sha256 and sha256 and sha256 != expected_sha256:
+            raise IOError(f"Stored copy hash {sha256} does not match {expected_sha256}")
+    except Exception:
+        dest_path.unlink(missing_ok=True)
+        raise
+    
+    if move:
+        source_path.unlink()
+    return {'strategy': strategy, 'sha256': sha256, 'verified': bool(expected_sha256 and sha256)}
+
+
 class LocalStorage:
-    """Local filesystem storage adapter"""
+    """Local filesystem storage adapter.
+
+    Evidence bytes live once in a content-addressed blob store
+    (``blobs/sha256/ab/cd/<sha256>``); each job directory holds a hardlink to
+    its blob plus the job's metadata and sidecars. A blob's reference count is
+    its link count minus one, so deleting a job directory releases its
+    reference and ``collect_garbage`` removes blobs nothing links to anymore.
+    
+    Job directories are sharded by a hash of the job id
+    (``jobs/ab/cd/<job_id>``) and indexed in a SQLite manifest, so retrieval
+    and listing never scan directories; ``fsck`` rebuilds the manifest from
+    disk. Jobs stored before sharding stay in place (``<job_id>``) and are
+    indexed the same way.
+    """
     
     def __init__(self, base_path: str = None):
         self.base_path = Path(base_path or settings.LOCAL_STORAGE_PATH)
         self.base_path.mkdir(parents=True, exist_ok=True)
+        register_storage_root(self.base_path)
+        self.blob_root = self.base_path / BLOB_DIR / "sha256"
+        self.blob_tmp = self.base_path / BLOB_DIR / "tmp"
+        self.job_root = self.base_path / JOB_DIR
+        manifest_path = self.base_path / MANIFEST_FILE
+        first_open = not manifest_path.exists()
+        self.manifest = StorageManifest(manifest_path)
+        if first_open and (self.job_root.exists() or any(True for _ in self._legacy_job_dirs())):
+            # Volume written before the manifest existed: index what is already there
+            logger.info(f"Building storage manifest for {self.base_path}")
+            self.fsck(repair=True)
+    
+    def job_dir(self, job_id: str) -> Path:
+        """Sharded directory of a job: jobs/ab/cd/<job_id>, from the SHA-256 of the id"""
+        shard = hashlib.sha256(job_id.encode()).hexdigest()
+        return self.job_root / shard[:2] / shard[2:4] / job_id
+    
+    def _find_job_dir(self, job_id: str) -> Optional[Path]:
+        """The existing directory of a job, sharded or in the flat layout"""
+        candidates = [self.job_dir(job_id)]
+        if job_id not in RESERVED_DIRS:
+            candidates.append(self.base_path / job_id)
+        return next((job_dir for job_dir in candidates if job_dir.is_dir()), None)
+    
+    def _legacy_job_dirs(self) -> Iterable[Path]:
+        """Job directories of the flat layout"""
+        for entry in os.scandir(self.base_path):
+            if entry.is_dir() and entry.name not in RESERVED_DIRS:
+                yield Path(entry.path)
+    
+    def blob_path(self, sha256: str, compressed: bool = False) -> Path:
+        """Sharded location of a blob: sha256/ab/cd/abcd... (with ``.zst`` when stored compressed)"""
+        name = sha256 + (COMPRESSED_SUFFIX if compressed else '')
+        return self.blob_root / sha256[:2] / sha256[2:4] / name
+    
+    @staticmethod
+    def refcount(blob_path: Path) -> int:
+        """Number of job directories linking to a blob"""
+        return blob_path.stat().st_nlink - 1
     
-    async def store(self, file_path: str, job_id: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
-        """Store a file locally"""
+    def _existing_blob(self, sha256: str) -> Optional[Path]:
+        """The stored blob for a digest, compressed or not"""
+        for compressed in (False, True):
+            blob_path = self.blob_path(sha256, compressed)
+            if blob_path.exists():
+                return blob_path
+        return None
+    
+    def _ingest_blob(self, source_path: Path, sha256: str, move: bool = False,
+                     progress_callback: Callable[[int], None] = None,
+                     compress: bool = False) -> Dict[str, Any]:
+        """Commit the source into the blob store unless it is already there; returns the commit details"""
+        blob_path = self.blob_path(sha256, compress)
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        self.blob_tmp.mkdir(parents=True, exist_ok=True)
+        
+        temp_path = self.blob_tmp / uuid.uuid4().hex
+        try:
+            if compress:
+                compressed = compress_file(source_path, temp_path, progress_callback)
+                if compressed['sha256'] != sha256:
+                    raise IOError(f"Compressed evidence hash {compressed['sha256']} does not match {sha256}")
+                commit = {'strategy': 'zstd', 'sha256': sha256, 'verified': True}
+            else:
+                commit = commit_file(source_path, temp_path, sha256, move, progress_callback)
+            os.chmod(temp_path, 0o444)
+            try:
+                # link() never replaces, so concurrent writers of the same content cannot clobber each other
+                os.link(temp_path, blob_path)
+            except FileExistsError:
+                pass
+        finally:
+            temp_path.unlink(missing_ok=True)
+        if compress and move:
+            source_path.unlink()
+        return {**commit, 'blob_path': blob_path}
+    
+    async def store(self, file_path: str, job_id: str, metadata: Dict[str, Any],
+                    sidecars: Dict[str, bytes] = None, move: bool = False,
+                    progress_callback: Callable[[int], None] = None) -> Dict[str, Any]:
+        """Store a file locally, reusing an existing blob with the same SHA-256.
+
+        With ``move`` the source file is consumed (renamed into the store
+        when possible, deleted once it is no longer needed).
+        """
         try:
             source_path = Path(file_path)
             
             if not source_path.exists():
                 raise FileNotFoundError(f"Source file not found: {file_path}")
             
+            sha256 = metadata.get('processing_info', {}).get('sha256_hash') \
+                or HashService.compute_file_hash(str(source_path))
+            
             # Create job directory
-            job_dir = self.base_path / job_id
+            job_dir = self._find_job_dir(job_id) or self.job_dir(job_id)
             job_dir.mkdir(parents=True, exist_ok=True)
             
             # Generate unique filename
             original_name = metadata.get('basic', {}).get('file_name', 'evidence')
-            file_ext = Path(original_name).suffix or '.bin'
-            storage_name = f"{uuid.uuid4().hex}{file_ext}"
-            dest_path = job_dir / storage_name
+            file_ext = Path(original_name).suffix or source_path.suffix or '.bin'
+            storage_name = uuid.uuid4().hex
+            
+            blob_path = self._existing_blob(sha256)
+            size = source_path.stat().st_size
+            deduplicated = False
+            commit = {'strategy': 'deduplicated', 'sha256': sha256, 'verified': False}
+            for attempt in range(2):
+                if blob_path is None:
+                    mime_type = metadata.get('basic', {}).get('mime_type')
+                    commit = self._ingest_blob(source_path, sha256, move, progress_callback,
+                                               compress=should_compress(mime_type, str(source_path)))
+                    blob_path = commit['blob_path']
+                else:
+                    deduplicated = True
+                dest_path = job_dir / (storage_name + stored_suffix(file_ext, is_compressed(blob_path)))
+                try:
+                    os.link(blob_path, dest_path)
+                    break
+                except FileNotFoundError:
+                    # Garbage-collected between the existence check and the link; ingest again
+                    deduplicated = False
+                    blob_path = None
+                except OSError as e:
+                    # Filesystem without hardlinks: keep a private copy (no deduplication)
+                    logger.warning(f"Hardlink to blob failed, copying instead: {str(e)}")
+                    commit = commit_file(blob_path, dest_path, None if is_compressed(blob_path) else sha256,
+                                         progress_callback=progress_callback)
+                    deduplicated = False
+                    break
             
-            # Copy file
-            shutil.copy2(source_path, dest_path)
+            if deduplicated:
+                if progress_callback:
+                    progress_callback(size)
+                if move:
+                    source_path.unlink()
             
             # Store metadata
-            metadata_path = job_dir / "metadata.json"
-            with open(metadata_path, 'w') as f:
-                json.dump(metadata, f, indent=2, default=str)
+            write_sidecar(job_dir / METADATA_FILE, {**metadata, 'storage': {
+                'file_name': dest_path.name,
+                'sha256': sha256,
+                'compression': FORMAT_NAME if is_compressed(dest_path) else None
+            }})
+            (job_dir / LEGACY_METADATA_FILE).unlink(missing_ok=True)
+            
+            for name, content in (sidecars or {}).items():
+                write_atomic(job_dir / name, content)
+            
+            stored_at = datetime.utcnow().isoformat()
+            self.manifest.upsert(self._manifest_entry(job_id, job_dir, dest_path, sha256,
+                                                      self._count_evidence(job_dir), stored_at))
             
             return {
                 'success': True,
                 'path': str(dest_path),
                 'location': f"local://{dest_path}",
-                'size': dest_path.stat().st_size,
-                'stored_at': datetime.utcnow().isoformat(),
-                'job_dir': str(job_dir)
+                'size': size,
+                'stored_size': dest_path.stat().st_size,
+                'compression': FORMAT_NAME if is_compressed(dest_path) else None,
+                'stored_at': stored_at,
+                'job_dir': str(job_dir),
+                'blob_path': str(blob_path),
+                'deduplicated': deduplicated,
+                'commit_strategy': commit['strategy'],
+                'copy_verified': commit['verified'],
+                'refcount': self.refcount(blob_path) if blob_path.exists() else 1
             }
             
         except Exception as e:
             logger.error(f"Local storage failed: {str(e)}")
             raise
     
-    async def retrieve(self, job_id: str) -> Optional[Dict[str, Any]]:
-        """Retrieve a file from local storage"""
+    async def read_sidecar(self, job_id: str, name: str) -> Optional[bytes]:
+        """Read a sidecar stored next to a job's evidence"""
+        job_dir = self._find_job_dir(job_id)
+        sidecar_path = job_dir / name if job_dir else None
+        return sidecar_path.read_bytes() if sidecar_path and sidecar_path.exists() else None
+    
+    @staticmethod
+    def _count_evidence(job_dir: Path) -> int:
+        return sum(1 for f in job_dir.iterdir() if f.is_file() and is_evidence_name(f.name))
+    
+    @staticmethod
+    def _read_metadata(job_dir: Path, sections: Iterable[str] = None) -> Dict[str, Any]:
+        """A job's metadata (only ``sections`` of it, if given); legacy JSON metadata is read too"""
+        for name in (METADATA_FILE, LEGACY_METADATA_FILE):
+            if (job_dir / name).exists():
+                return read_sidecar(job_dir / name, sections)
+        return {}
+    
+    def _manifest_entry(self, job_id: str, job_dir: Path, evidence_file: Path, sha256: Optional[str],
+                        file_count: int = 1, stored_at: str = None) -> Dict[str, Any]:
+        """Manifest row for a job's evidence file"""
+        stat = evidence_file.stat()
+        compressed = is_compressed(evidence_file)
+        blob_path = self.blob_path(sha256, compressed) if sha256 else None
         try:
-            job_dir = self.base_path / job_id
-            
-            if not job_dir.exists():
-                return None
-            
-            # Find the evidence file (skip metadata.json)
-            evidence_files = [f for f in job_dir.iterdir() 
-                            if f.is_file() and f.name != "metadata.json"]
+            # Only a blob the evidence is actually linked to (not a private copy)
+            linked = blob_path is not None and os.path.samestat(blob_path.stat(), stat)
+        except FileNotFoundError:
+            linked = False
+        return {
+            'job_id': job_id,
+            'job_path': str(job_dir.relative_to(self.base_path)),
+            'file_name': evidence_file.name,
+            'blob_path': str(blob_path.relative_to(self.base_path)) if linked else None,
+            'sha256': sha256,
+            'size': evidence_size(evidence_file),
+            'stored_size': stat.st_size,
+            'storage_class': FORMAT_NAME if compressed else 'raw',
+            'file_count': file_count,
+            'stored_at': stored_at
+        }
+    
+    def _scan_job(self, job_id: str, job_dir: Path, verify: bool = False) -> Optional[Dict[str, Any]]:
+        """Manifest row for a job directory read from disk; None if it holds no evidence"""
+        evidence_files = sorted(f for f in job_dir.iterdir() if f.is_file() and is_evidence_name(f.name))
+        if not evidence_files:
+            return None
+        # Only the small sections; probe dumps and the like are never decoded
+        metadata = self._read_metadata(job_dir, ('storage', 'processing_info'))
+        storage = metadata.get('storage', {})
+        evidence_file = job_dir / storage['file_name'] if storage.get('file_name') else None
+        if evidence_file is None or not evidence_file.exists():
+            # Layout written before content addressing: the first evidence file by name
+            evidence_file = evidence_files[0]
+        sha256 = storage.get('sha256') or metadata.get('processing_info', {}).get('sha256_hash')
+        entry = self._manifest_entry(job_id, job_dir, evidence_file, sha256, len(evidence_files))
+        if verify:
+            # None when no digest was ever recorded (nothing to check against)
+            entry['verified'] = HashService.compute_file_hash(str(evidence_file)) == sha256 if sha256 else None
+        return entry
+    
+    def _scan_jobs(self, job_dirs: Iterable[Path], verify: bool = False) -> list:
+        entries = []
+        for job_dir in job_dirs:
+            try:
+                entry = self._scan_job(job_dir.name, job_dir, verify)
+            except Exception as e:
+                logger.error(f"fsck could not read {job_dir}: {str(e)}")
+                continue
+            if entry:
+                entries.append(entry)
+        return entries
+    
+    def fsck(self, repair: bool = False, verify: bool = False, workers: int = None) -> Dict[str, Any]:
+        """Check the manifest against the job directories on disk; with ``repair`` rebuild it from them.
+
+        Shard directories are scanned in parallel (the work is stat and
+        metadata reads, plus hashing with ``verify``). The report counts jobs
+        on disk but not indexed, indexed but gone, and indexed differently,
+        and with ``verify`` those whose evidence no longer matches its digest.
+        """
+        units = []
+        if self.job_root.exists():
+            shards = sorted(shard for shard in self.job_root.glob("*/*") if shard.is_dir())
+            units.extend(lambda shard=shard: [d for d in shard.iterdir() if d.is_dir()] for shard in shards)
+        legacy = sorted(self._legacy_job_dirs())
+        units.extend(lambda chunk=legacy[i:i + FSCK_BATCH_SIZE]: chunk
+                     for i in range(0, len(legacy), FSCK_BATCH_SIZE))
+        
+        corrupt = []
+        with ThreadPoolExecutor(max_workers=workers or settings.STORAGE_FSCK_WORKERS,
+                                thread_name_prefix="fsck") as pool:
+            def batches():
+                for batch in pool.map(lambda unit: self._scan_jobs(unit(), verify), units):
+                    corrupt.extend(entry['job_id'] for entry in batch if entry.get('verified') is False)
+                    yield batch
             
-            if not evidence_files:
-                return None
+            report = self.manifest.reconcile(batches(), repair)
+        
+        if verify:
+            report['corrupt'] = {'count': len(corrupt), 'job_ids': corrupt[:20]}
+        logger.info(f"Storage fsck: scanned {report['scanned']} jobs, "
+                    f"{report['unindexed']['count']} unindexed, {report['missing_on_disk']['count']} missing, "
+                    f"{report['changed']['count']} changed{', index rebuilt' if repair else ''}")
+        return report
+    
+    def collect_garbage(self, grace_seconds: int = None, dry_run: bool = False) -> Dict[str, Any]:
+        """Delete blobs no job links to anymore.
+
+        A blob is only removed once its link count has been 1 for longer than
+        the grace period; linking or unlinking updates its ctime, so a blob a
+        concurrent ``store`` is about to reuse is never collected under it.
+        """
+        grace_seconds = settings.STORAGE_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+        cutoff = time.time() - grace_seconds
+        removed, freed, kept = 0, 0, 0
+        
+        for blob_path in self.blob_root.glob("*/*/*"):
+            try:
+                stat = blob_path.stat()
+                if stat.st_nlink > 1 or stat.st_ctime > cutoff:
+                    kept += 1
+                    continue
+                if not dry_run:
+                    blob_path.unlink()
+                    for shard in (blob_path.parent, blob_path.parent.parent):
+                        try:
+                            shard.rmdir()
+                        except OSError:
+                            break
+                removed += 1
+                freed += stat.st_size
+            except FileNotFoundError:
+                continue
+        
+        # Temp files left behind by interrupted ingests
+        if self.blob_tmp.exists():
+            for temp_path in self.blob_tmp.iterdir():
+                try:
+                    if temp_path.stat().st_mtime < cutoff and not dry_run:
+                        temp_path.unlink()
+                except FileNotFoundError:
+                    continue
+        
+        logger.info(f"Blob GC: removed {removed} blobs ({freed} bytes), kept {kept}")
+        return {'removed': removed, 'bytes_freed': freed, 'kept': kept, 'dry_run': dry_run}
+    
+    async def evidence_source(self, storage_path: str, sha256: str) -> Dict[str, Any]:
+        """Where to serve evidence from: the stored file itself"""
+        return {'path': storage_path, 'size': evidence_size(storage_path)}
+    
+    async def local_path(self, storage_path: str, sha256: str) -> str:
+        """Stored evidence is already local"""
+        if not os.path.exists(storage_path):
+            raise FileNotFoundError(f"Evidence file not found: {storage_path}")
+        return storage_path
+    
+    async def retrieve(self, job_id: str, local_copy: bool = False) -> Optional[Dict[str, Any]]:
+        """Retrieve a file from local storage (always a local copy)"""
+        try:
+            entry = self.manifest.get(job_id)
+            job_dir = self.base_path / entry['job_path'] if entry else self._find_job_dir(job_id)
+            evidence_file = job_dir / entry['file_name'] if entry else None
             
-            evidence_file = evidence_files[0]
+            if evidence_file is None or not evidence_file.exists():
+                # Not indexed, or the index is out of date: read the directory and re-index it
+                if job_dir is None or not job_dir.exists():
+                    return None
+                entry = self._scan_job(job_id, job_dir)
+                if entry is None:
+                    return None
+                self.manifest.upsert(entry)
+                evidence_file = job_dir / entry['file_name']
             
-            # Load metadata
-            metadata_path = job_dir / "metadata.json"
-            metadata = {}
-            if metadata_path.exists():
-                with open(metadata_path, 'r') as f:
-                    metadata = json.load(f)
+            metadata = self._read_metadata(job_dir)
             
             return {
                 'file_path': str(evidence_file),
                 'metadata': metadata,
-                'size': evidence_file.stat().st_size,
+                'size': entry['size'],
+                'stored_size': entry['stored_size'],
+                'sha256': entry['sha256'],
+                'storage_class': entry['storage_class'],
                 'job_dir': str(job_dir)
             }
             
@@ -94,9 +525,10 @@ class LocalStorage:
     async def delete(self, job_id: str) -> bool:
         """Delete a job's files"""
         try:
-            job_dir = self.base_path / job_id
+            job_dir = self._find_job_dir(job_id)
+            self.manifest.delete(job_id)
             
-            if job_dir.exists():
+            if job_dir is not None:
                 shutil.rmtree(job_dir)
                 logger.info(f"Deleted job directory: {job_dir}")
                 return True
@@ -107,26 +539,66 @@ class LocalStorage:
             logger.error(f"Local deletion failed: {str(e)}")
             return False
     
+    async def check_health(self) -> Dict[str, Any]:
+        """Check the storage root is writable"""
+        writable = os.access(self.base_path, os.W_OK)
+        free = shutil.disk_usage(self.base_path).free
+        return {
+            'status': 'healthy' if writable else 'unhealthy: storage path not writable',
+            'backend': 'local',
+            'free_bytes': free
+        }
+    
     async def list_jobs(self) -> list:
         """List all jobs in storage"""
         try:
-            jobs = []
-            
-            for job_dir in self.base_path.iterdir():
-                if job_dir.is_dir():
-                    # Check if it has evidence files
-                    evidence_files = [f for f in job_dir.iterdir() 
-                                    if f.is_file() and f.name != "metadata.json"]
-                    
-                    if evidence_files:
-                        jobs.append({
-                            'job_id': job_dir.name,
-                            'has_evidence': True,
-                            'file_count': len(evidence_files)
-                        })
-            
-            return jobs
+            return [job async for job in self.iter_jobs()]
             
         except Exception as e:
             logger.error(f"Local listing failed: {str(e)}")
-            return []
\ No newline at end of file
+            return []
+    
+    async def iter_jobs(self, cursor: str = None) -> AsyncIterator[Dict[str, Any]]:
+        """Jobs holding evidence, in id order, starting after ``cursor`` (pages of the manifest)"""
+        after = decode_cursor(cursor) if cursor else ''
+        while True:
+            page = self.manifest.page(after, LIST_PAGE_SIZE)
+            for entry in page:
+                yield {
+                    'job_id': entry['job_id'],
+                    'has_evidence': True,
+                    'file_count': entry['file_count'],
+                    'size': entry['size'],
+                    'sha256': entry['sha256'],
+                    'storage_class': entry['storage_class'],
+                    'cursor': encode_cursor(entry['job_id'])
+                }
+            if len(page) < LIST_PAGE_SIZE:
+                return
+            after = page[-1]['job_id']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain FEAS local evidence storage")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    fsck = commands.add_parser("fsck", help="Check the job manifest against the directories on disk")
+    fsck.add_argument("--repair", action="store_true", help="Rebuild the manifest from disk")
+    fsck.add_argument("--verify", action="store_true", help="Also re-hash every evidence file")
+    fsck.add_argument("--workers", type=int, default=None)
+    
+    gc = commands.add_parser("gc", help="Remove blobs no job references")
+    gc.add_argument("--dry-run", action="store_true")
+    
+    args = parser.parse_args()
+    storage = LocalStorage()
+    if args.command == "fsck":
+        report = storage.fsck(repair=args.repair, verify=args.verify, workers=args.workers)
+    else:
+        report = storage.collect_garbage(dry_run=args.dry_run)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,129 @@
+"""SQLite manifest of the jobs held by local storage.
+
+One row per job records where its directory and evidence file are, the
+blob it links to, its digest, original and stored size, and storage class.
+Lookups and listings are index queries instead of directory scans, so
+they stay fast and deterministic however many jobs the volume holds. The
+database lives next to the evidence (it travels with the volume) and can
+always be rebuilt from disk with ``LocalStorage.fsck``.
+"""
+
+import os
+import sqlite3
+import threading
+import logging
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("job_id", "job_path", "file_name", "blob_path", "sha256", "size", "stored_size",
+           "storage_class", "file_count", "stored_at")
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    job_id TEXT PRIMARY KEY,
+    job_path TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    blob_path TEXT,
+    sha256 TEXT,
+    size INTEGER,
+    stored_size INTEGER,
+    storage_class TEXT NOT NULL,
+    file_count INTEGER NOT NULL DEFAULT 1,
+    stored_at TEXT
+) WITHOUT ROWID
+"""
+SAMPLE_LIMIT = 20  # job ids listed per kind of discrepancy in an fsck report
+
+
+class StorageManifest:
+    """Job index of a local storage volume; one SQLite connection per thread and process"""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(SCHEMA.format(table="jobs"))
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_sha256 ON jobs (sha256)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def upsert(self, entry: Dict[str, Any]) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO jobs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                [entry.get(column) for column in COLUMNS]
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def delete(self, job_id: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def page(self, after: str = "", limit: int = 1000) -> List[Dict[str, Any]]:
+        """Entries in job id order, starting after ``after``"""
+        rows = self._connection().execute(
+            "SELECT * FROM jobs WHERE job_id > ? ORDER BY job_id LIMIT ?", (after, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def reconcile(self, batches: Iterable[List[Dict[str, Any]]], repair: bool = False) -> Dict[str, Any]:
+        """Compare the index with entries scanned from disk; with ``repair`` the index becomes the scan.
+
+        The scan is staged in a temporary table, so the comparison runs in
+        SQL rather than holding either side in memory.
+        """
+        conn = self._connection()
+        conn.execute("DROP TABLE IF EXISTS temp.scan")
+        conn.execute(SCHEMA.format(table="temp.scan"))
+        scanned = 0
+        for batch in batches:
+            with conn:
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO temp.scan ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                    [[entry.get(column) for column in COLUMNS] for entry in batch]
+                )
+            scanned += len(batch)
+
+        def sample(query: str) -> Dict[str, Any]:
+            count, ids = 0, []
+            for row in conn.execute(query):
+                count += 1
+                if len(ids) < SAMPLE_LIMIT:
+                    ids.append(row[0])
+            return {'count': count, 'job_ids': ids}
+
+        report = {
+            'scanned': scanned,
+            'indexed': self.count(),
+            'unindexed': sample("SELECT job_id FROM scan EXCEPT SELECT job_id FROM jobs"),
+            'missing_on_disk': sample("SELECT job_id FROM jobs EXCEPT SELECT job_id FROM scan"),
+            'changed': sample(
+                "SELECT scan.job_id FROM scan JOIN jobs USING (job_id) "
+                "WHERE scan.job_path IS NOT jobs.job_path OR scan.file_name IS NOT jobs.file_name "
+                "OR scan.sha256 IS NOT jobs.sha256 OR scan.stored_size IS NOT jobs.stored_size "
+                "OR scan.file_count IS NOT jobs.file_count"
+            ),
+            'repaired': False
+        }
+        if repair:
+            with conn:
+                conn.execute("DELETE FROM jobs")
+                conn.execute("INSERT INTO jobs SELECT * FROM scan")
+            report['repaired'] = True
+        conn.execute("DROP TABLE temp.scan")
+        return report
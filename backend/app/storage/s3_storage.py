@@ -1,30 +1,254 @@
-import boto3
-from botocore.exceptions import ClientError
-from typing import Dict, Any, Optional
-import json
-from datetime import datetime
+import asyncio
+import base64
+import collections
+import functools
+import hashlib
+import math
+import os
+import threading
 import uuid
 import logging
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, AsyncIterator, Callable, Iterable, Optional
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
 
 from app.core.config import settings
+from app.services.compression import (
+    COMPRESSED_SUFFIX, FORMAT_NAME, compress_chunks, evidence_size, should_compress, stored_suffix
+)
+from app.services.evidence_delivery import content_disposition
+from app.services.hashing import iter_file_blocks
+from app.storage import METADATA_FILE, LEGACY_METADATA_FILE, encode_cursor, decode_cursor, is_evidence_name
+from app.storage.cache import get_cache
+from app.storage.sidecar import encode_sidecar, read_sidecar
 
 logger = logging.getLogger(__name__)
 
-class S3Storage:
-    """S3-compatible storage adapter"""
-    
-    def __init__(self):
-        self.client = boto3.client(
-            's3',
-            endpoint_url=settings.S3_ENDPOINT,
-            aws_access_key_id=settings.S3_ACCESS_KEY,
-            aws_secret_access_key=settings.S3_SECRET_KEY,
-            region_name=settings.S3_REGION
+LIST_PAGE_SIZE = 1000
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10000
+
+_client = None
+_executor = None
+_transfer_executor = None
+_ready_buckets = set()
+_pool_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide S3 client; boto3 clients are thread-safe and pool their connections"""
+    global _client
+    if _client is None:
+        with _pool_lock:
+            if _client is None:
+                _client = boto3.session.Session().client(
+                    's3',
+                    endpoint_url=settings.S3_ENDPOINT,
+                    aws_access_key_id=settings.S3_ACCESS_KEY,
+                    aws_secret_access_key=settings.S3_SECRET_KEY,
+                    region_name=settings.S3_REGION,
+                    use_ssl=settings.S3_SECURE,
+                    config=Config(
+                        max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                        retries={'max_attempts': settings.S3_MAX_ATTEMPTS, 'mode': 'adaptive'}
+                    )
+                )
+    return _client
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Bounded pool the blocking SDK calls run on, so they never stall the event loop"""
+    global _executor
+    if _executor is None:
+        with _pool_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=settings.S3_EXECUTOR_WORKERS,
+                                               thread_name_prefix="s3")
+    return _executor
+
+
+def get_transfer_executor() -> ThreadPoolExecutor:
+    """Pool for multipart part uploads, kept apart from the call executor so callers never wait on their own pool"""
+    global _transfer_executor
+    if _transfer_executor is None:
+        with _pool_lock:
+            if _transfer_executor is None:
+                _transfer_executor = ThreadPoolExecutor(max_workers=settings.S3_MAX_POOL_CONNECTIONS,
+                                                        thread_name_prefix="s3-part")
+    return _transfer_executor
+
+
+def reset_pool() -> None:
+    """Forget the client and executors (in forked children, or after settings changed)"""
+    global _client, _executor, _transfer_executor
+    _client = None
+    _executor = None
+    _transfer_executor = None
+    _ready_buckets.clear()
+
+
+def _reporting(chunks: Iterable[bytes], progress_callback: Optional[Callable[[int], None]]) -> Iterable[bytes]:
+    for chunk in chunks:
+        if progress_callback:
+            progress_callback(len(chunk))
+        yield chunk
+
+
+def _b64(digest: bytes) -> str:
+    return base64.b64encode(digest).decode()
+
+
+class MultipartWriter:
+    """Streams evidence into one S3 object, hashing it on the way.
+
+    Written chunks are gathered into parts. Each full part gets its own
+    SHA-256, which is sent as the part checksum so S3 rejects a corrupted
+    part on receipt, and is uploaded on the transfer pool while the next
+    part fills. The evidence SHA-256 comes from the same bytes, so the
+    source is read exactly once. At most ``concurrency`` parts are buffered
+    or in flight. Objects smaller than one part go up as a single PUT.
+    """
+
+    def __init__(self, client, bucket: str, key: str, part_size: int = None, concurrency: int = None,
+                 expected_size: int = None, progress_callback: Callable[[int], None] = None):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        part_size = max(MIN_PART_SIZE, part_size or settings.S3_MULTIPART_PART_SIZE)
+        if expected_size:
+            # Stay within S3's part limit for very large evidence
+            part_size = max(part_size, math.ceil(expected_size / MAX_PARTS))
+        self.part_size = part_size
+        self.concurrency = concurrency or settings.S3_MULTIPART_CONCURRENCY
+        self.progress_callback = progress_callback
+        self.size = 0
+        self.upload_id = None
+        self._sha256 = hashlib.sha256()
+        self._buffer = bytearray()
+        self._part_digests = []
+        self._pending = collections.deque()
+        self._parts = []
+
+    def write(self, chunk) -> None:
+        view = memoryview(chunk)
+        self._sha256.update(view)
+        self.size += len(view)
+        while len(view):
+            take = min(len(view), self.part_size - len(self._buffer))
+            self._buffer += view[:take]
+            view = view[take:]
+            if len(self._buffer) == self.part_size:
+                self._dispatch()
+
+    def _dispatch(self) -> None:
+        if self.upload_id is None:
+            self.upload_id = self.client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ChecksumAlgorithm='SHA256'
+            )['UploadId']
+        body = bytes(self._buffer)
+        self._buffer = bytearray()
+        digest = hashlib.sha256(body).digest()
+        self._part_digests.append(digest)
+        part_number = len(self._part_digests)
+        
+        while len(self._pending) >= self.concurrency:
+            self._parts.append(self._pending.popleft().result())
+        self._pending.append(get_transfer_executor().submit(self._upload_part, part_number, body, digest))
+
+    def _upload_part(self, part_number: int, body: bytes, digest: bytes) -> Dict[str, Any]:
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            PartNumber=part_number, Body=body, ChecksumSHA256=_b64(digest)
         )
-        self.bucket = settings.S3_BUCKET_NAME
+        if self.progress_callback:
+            self.progress_callback(len(body))
+        return {'PartNumber': part_number, 'ETag': response['ETag'], 'ChecksumSHA256': _b64(digest)}
+
+    def abort(self) -> None:
+        # Parts still uploading would land after the abort and leave the upload behind
+        for future in self._pending:
+            future.cancel()
+        for future in self._pending:
+            if not future.cancelled():
+                future.exception()
+        self._pending.clear()
+        if self.upload_id is not None:
+            try:
+                self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+            except Exception as e:
+                logger.error(f"Failed to abort multipart upload of {self.key}: {str(e)}")
+
+    def close(self, expected_sha256: str = None) -> Dict[str, Any]:
+        """Upload what is left and complete the object.
+
+        Fails (and aborts the upload) if the streamed bytes do not hash to
+        ``expected_sha256``, or if the object's composite checksum differs
+        from the one implied by the part digests.
+        """
+        try:
+            sha256 = self._sha256.hexdigest()
+            if expected_sha256 and sha256 != expected_sha256:
+                raise IOError(f"Evidence hash {sha256} does not match {expected_sha256}")
+            
+            if self.upload_id is None:
+                body = bytes(self._buffer)
+                response = self.client.put_object(Bucket=self.bucket, Key=self.key, Body=body,
+                                                  ChecksumSHA256=_b64(hashlib.sha256(body).digest()))
+                if self.progress_callback:
+                    self.progress_callback(len(body))
+                return {'sha256': sha256, 'size': self.size, 'parts': 1, 'strategy': 'put',
+                        'etag': response.get('ETag', ''), 'checksum_verified': True}
+            
+            if self._buffer:
+                self._dispatch()
+            while self._pending:
+                self._parts.append(self._pending.popleft().result())
+            response = self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                MultipartUpload={'Parts': self._parts}
+            )
+            
+            # S3's checksum of a multipart object is the SHA-256 of the concatenated part digests
+            expected = _b64(hashlib.sha256(b"".join(self._part_digests)).digest())
+            returned = response.get('ChecksumSHA256') or self.client.head_object(
+                Bucket=self.bucket, Key=self.key, ChecksumMode='ENABLED'
+            ).get('ChecksumSHA256')
+            if returned and returned.split('-')[0] != expected:
+                self.client.delete_object(Bucket=self.bucket, Key=self.key)
+                raise IOError(f"Stored object checksum {returned} does not match the uploaded parts")
+            return {'sha256': sha256, 'size': self.size, 'parts': len(self._parts), 'strategy': 'multipart',
+                    'etag': response.get('ETag', ''), 'checksum_verified': returned is not None}
+        except Exception:
+            self.abort()
+            raise
+
+
+if hasattr(os, "register_at_fork"):
+    # Celery prefork children must not share the parent's sockets or worker threads
+    os.register_at_fork(after_in_child=reset_pool)
+
+
+class S3Storage:
+    """S3-compatible storage adapter.
+
+    Each public coroutine runs its synchronous boto3 counterpart on the
+    shared executor.
+    """
+    
+    def __init__(self, bucket: str = None):
+        self.client = get_client()
+        self.bucket = bucket or settings.S3_BUCKET_NAME
         
-        # Ensure bucket exists
-        self._ensure_bucket()
+        # Ensure bucket exists (once per process)
+        if self.bucket not in _ready_buckets:
+            self._ensure_bucket()
+            _ready_buckets.add(self.bucket)
     
     def _ensure_bucket(self):
         """Ensure the S3 bucket exists"""
@@ -39,175 +263,315 @@ class S3Storage:
                 logger.error(f"Failed to create S3 bucket: {str(e)}")
                 raise
     
-    async def store(self, file_path: str, job_id: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
-        """Store a file in S3"""
+    @staticmethod
+    async def _run(func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+    
+    async def store(self, file_path: str, job_id: str, metadata: Dict[str, Any],
+                    sidecars: Dict[str, bytes] = None, move: bool = False,
+                    progress_callback: Callable[[int], None] = None) -> Dict[str, Any]:
+        """Store a file in S3 (``move`` deletes the local source once uploaded)"""
         try:
-            import os
-            from pathlib import Path
-            
-            source_path = Path(file_path)
-            
-            if not source_path.exists():
-                raise FileNotFoundError(f"Source file not found: {file_path}")
-            
-            # Generate S3 key
-            original_name = metadata.get('basic', {}).get('file_name', 'evidence')
-            file_ext = Path(original_name).suffix or '.bin'
-            s3_key = f"{job_id}/{uuid.uuid4().hex}{file_ext}"
-            
-            # Upload file
-            self.client.upload_file(
-                str(source_path),
-                self.bucket,
-                s3_key
-            )
-            
-            # Upload metadata
-            metadata_key = f"{job_id}/metadata.json"
-            metadata_json = json.dumps(metadata, default=str)
-            
-            self.client.put_object(
-                Bucket=self.bucket,
-                Key=metadata_key,
-                Body=metadata_json,
-                ContentType='application/json'
-            )
-            
-            # Get file info
-            head_response = self.client.head_object(Bucket=self.bucket, Key=s3_key)
-            
-            return {
-                'success': True,
-                'path': s3_key,
-                'location': f"s3://{self.bucket}/{s3_key}",
-                'size': head_response['ContentLength'],
-                'stored_at': datetime.utcnow().isoformat(),
-                'etag': head_response.get('ETag', '')
-            }
-            
+            return await self._run(self._store, file_path, job_id, metadata, sidecars, move, progress_callback)
         except Exception as e:
             logger.error(f"S3 storage failed: {str(e)}")
             raise
     
-    async def retrieve(self, job_id: str) -> Optional[Dict[str, Any]]:
-        """Retrieve a file from S3"""
+    def _store(self, file_path: str, job_id: str, metadata: Dict[str, Any],
+               sidecars: Dict[str, bytes], move: bool,
+               progress_callback: Callable[[int], None]) -> Dict[str, Any]:
+        source_path = Path(file_path)
+        
+        if not source_path.exists():
+            raise FileNotFoundError(f"Source file not found: {file_path}")
+        
+        mime_type = metadata.get('basic', {}).get('mime_type')
+        compress = should_compress(mime_type, str(source_path))
+        chunks = iter_file_blocks(str(source_path))
+        
+        # Generate S3 key
+        original_name = metadata.get('basic', {}).get('file_name', 'evidence')
+        file_ext = Path(original_name).suffix or '.bin'
+        s3_key = f"{job_id}/{uuid.uuid4().hex}{stored_suffix(file_ext, compress)}"
+        expected_sha256 = metadata.get('processing_info', {}).get('sha256_hash')
+        
+        # Upload file: one read pass feeds the part checksums and the evidence SHA-256
+        writer = MultipartWriter(self.client, self.bucket, s3_key, expected_size=source_path.stat().st_size,
+                                 progress_callback=None if compress else progress_callback)
         try:
-            # List objects in job directory
-            response = self.client.list_objects_v2(
-                Bucket=self.bucket,
-                Prefix=f"{job_id}/"
-            )
-            
-            if 'Contents' not in response:
-                return None
-            
-            # Find evidence file and metadata
-            objects = response['Contents']
-            evidence_key = None
-            metadata_key = None
-            
-            for obj in objects:
-                key = obj['Key']
-                if key.endswith('metadata.json'):
-                    metadata_key = key
-                elif not key.endswith('/'):  # Not a directory
-                    evidence_key = key
-            
-            if not evidence_key:
+            if compress:
+                # Parts carry compressed bytes; the evidence digest is taken over the original ones
+                compressed = compress_chunks(_reporting(chunks, progress_callback), writer)
+                if expected_sha256 and compressed['sha256'] != expected_sha256:
+                    raise IOError(f"Evidence hash {compressed['sha256']} does not match {expected_sha256}")
+            else:
+                for chunk in chunks:
+                    writer.write(chunk)
+        except Exception:
+            writer.abort()
+            raise
+        upload = writer.close(None if compress else expected_sha256)
+        
+        # Upload metadata
+        sha256 = compressed['sha256'] if compress else upload['sha256']
+        size = compressed['size'] if compress else upload['size']
+        compression = FORMAT_NAME if compress else None
+        # A PUT replaces the object atomically; readers see the old or the new sidecar
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=f"{job_id}/{METADATA_FILE}",
+            Body=encode_sidecar({
+                **metadata,
+                'storage': {'key': s3_key, 'sha256': sha256, 'size': size, 'compression': compression}
+            }),
+            ContentType='application/octet-stream'
+        )
+        
+        for name, content in (sidecars or {}).items():
+            self.client.put_object(Bucket=self.bucket, Key=f"{job_id}/{name}", Body=content)
+        
+        if move:
+            source_path.unlink()
+        return {
+            'success': True,
+            'path': s3_key,
+            'location': f"s3://{self.bucket}/{s3_key}",
+            'size': size,
+            'stored_size': upload['size'],
+            'compression': compression,
+            'sha256': sha256,
+            'stored_at': datetime.utcnow().isoformat(),
+            'etag': upload['etag'],
+            'parts': upload['parts'],
+            'deduplicated': False,
+            'commit_strategy': upload['strategy'],
+            'copy_verified': upload['checksum_verified'] and expected_sha256 is not None
+        }
+    
+    async def read_sidecar(self, job_id: str, name: str) -> Optional[bytes]:
+        """Read a sidecar object stored next to a job's evidence"""
+        return await self._run(self._read_sidecar, job_id, name)
+    
+    def _read_sidecar(self, job_id: str, name: str) -> Optional[bytes]:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=f"{job_id}/{name}")['Body'].read()
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
                 return None
-            
-            # Get metadata
-            metadata = {}
-            if metadata_key:
-                metadata_resp = self.client.get_object(
-                    Bucket=self.bucket,
-                    Key=metadata_key
+            raise
+    
+    async def retrieve(self, job_id: str, local_copy: bool = False) -> Optional[Dict[str, Any]]:
+        """Retrieve a file from S3; with ``local_copy`` the evidence is also read through the local cache"""
+        try:
+            return await self._run(self._retrieve, job_id, local_copy)
+        except Exception as e:
+            logger.error(f"S3 retrieval failed: {str(e)}")
+            return None
+    
+    async def local_path(self, storage_path: str, sha256: str) -> str:
+        """Local file holding the evidence object ``storage_path``, fetched into the cache on first use"""
+        return await self._run(self._local_path, storage_path, sha256)
+    
+    def _local_path(self, key: str, sha256: str) -> str:
+        def fetch(temp_path: Path) -> None:
+            try:
+                self.client.download_file(
+                    self.bucket, key, str(temp_path),
+                    Config=TransferConfig(max_concurrency=settings.S3_MULTIPART_CONCURRENCY,
+                                          multipart_chunksize=settings.S3_MULTIPART_PART_SIZE,
+                                          use_threads=True)
                 )
-                metadata = json.loads(metadata_resp['Body'].read().decode('utf-8'))
-            
-            # Get evidence file info
-            head_response = self.client.head_object(
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                    raise FileNotFoundError(f"Evidence object not found: {key}") from e
+                raise
+        
+        # Compressed objects keep their suffix so the evidence readers decompress them
+        suffix = COMPRESSED_SUFFIX if key.endswith(COMPRESSED_SUFFIX) else ""
+        return str(get_cache().get(sha256, fetch, suffix))
+    
+    def _retrieve(self, job_id: str, local_copy: bool = False) -> Optional[Dict[str, Any]]:
+        # List objects in job directory
+        response = self.client.list_objects_v2(
+            Bucket=self.bucket,
+            Prefix=f"{job_id}/"
+        )
+        
+        if 'Contents' not in response:
+            return None
+        
+        keys = [obj['Key'] for obj in response['Contents']]
+        
+        # Get metadata (jobs stored before the sidecar format have plain JSON)
+        metadata = {}
+        metadata_key = next((f"{job_id}/{name}" for name in (METADATA_FILE, LEGACY_METADATA_FILE)
+                             if f"{job_id}/{name}" in keys), None)
+        if metadata_key:
+            metadata_resp = self.client.get_object(
                 Bucket=self.bucket,
-                Key=evidence_key
-            )
-            
-            # Generate a presigned URL for download (valid for 1 hour)
-            download_url = self.client.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': self.bucket, 'Key': evidence_key},
-                ExpiresIn=3600
+                Key=metadata_key
             )
-            
-            return {
-                's3_key': evidence_key,
-                'metadata': metadata,
-                'size': head_response['ContentLength'],
-                'download_url': download_url,
-                'last_modified': head_response.get('LastModified')
-            }
-            
-        except Exception as e:
-            logger.error(f"S3 retrieval failed: {str(e)}")
+            metadata = read_sidecar(metadata_resp['Body'].read())
+        
+        evidence_key = metadata.get('storage', {}).get('key')
+        if evidence_key not in keys:
+            # Objects written before the key was recorded: the one that is not metadata, a sidecar or a directory
+            evidence_key = next((key for key in keys if is_evidence_name(key.partition('/')[2])), None)
+        
+        if not evidence_key:
             return None
+        
+        # Get evidence file info
+        head_response = self.client.head_object(
+            Bucket=self.bucket,
+            Key=evidence_key
+        )
+        
+        # Generate a presigned URL for download (valid for 1 hour)
+        download_url = self.client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': evidence_key},
+            ExpiresIn=3600
+        )
+        
+        result = {
+            's3_key': evidence_key,
+            'metadata': metadata,
+            'size': metadata.get('storage', {}).get('size') or head_response['ContentLength'],
+            'stored_size': head_response['ContentLength'],
+            'compression': metadata.get('storage', {}).get('compression'),
+            'download_url': download_url,
+            'last_modified': head_response.get('LastModified')
+        }
+        
+        sha256 = metadata.get('storage', {}).get('sha256') or metadata.get('sha256')
+        if local_copy and sha256:
+            result['file_path'] = self._local_path(evidence_key, sha256)
+        return result
     
     async def delete(self, job_id: str) -> bool:
         """Delete a job's files from S3"""
         try:
-            # List all objects for this job
-            response = self.client.list_objects_v2(
-                Bucket=self.bucket,
-                Prefix=f"{job_id}/"
-            )
-            
-            if 'Contents' not in response:
-                return True
-            
-            # Delete all objects
-            objects = [{'Key': obj['Key']} for obj in response['Contents']]
-            
-            self.client.delete_objects(
-                Bucket=self.bucket,
-                Delete={'Objects': objects}
-            )
-            
-            logger.info(f"Deleted {len(objects)} objects for job {job_id}")
-            return True
-            
+            return await self._run(self._delete, job_id)
         except Exception as e:
             logger.error(f"S3 deletion failed: {str(e)}")
             return False
     
+    def _delete(self, job_id: str) -> bool:
+        # List all objects for this job
+        response = self.client.list_objects_v2(
+            Bucket=self.bucket,
+            Prefix=f"{job_id}/"
+        )
+        
+        if 'Contents' not in response:
+            return True
+        
+        # Delete all objects
+        objects = [{'Key': obj['Key']} for obj in response['Contents']]
+        
+        self.client.delete_objects(
+            Bucket=self.bucket,
+            Delete={'Objects': objects}
+        )
+        
+        logger.info(f"Deleted {len(objects)} objects for job {job_id}")
+        return True
+    
     async def list_jobs(self) -> list:
         """List all jobs in S3"""
         try:
-            jobs = []
-            
-            # List all prefixes (job directories)
-            response = self.client.list_objects_v2(
-                Bucket=self.bucket,
-                Delimiter='/'
-            )
-            
-            if 'CommonPrefixes' in response:
-                for prefix in response['CommonPrefixes']:
-                    job_id = prefix['Prefix'].rstrip('/')
-                    
-                    # Count files in this job
-                    job_objects = self.client.list_objects_v2(
-                        Bucket=self.bucket,
-                        Prefix=f"{job_id}/"
-                    )
-                    
-                    file_count = len(job_objects.get('Contents', [])) - 1  # Exclude metadata
-                    
-                    jobs.append({
-                        'job_id': job_id,
-                        'has_evidence': file_count > 0,
-                        'file_count': file_count
-                    })
-            
-            return jobs
-            
+            return [job async for job in self.iter_jobs()]
         except Exception as e:
             logger.error(f"S3 listing failed: {str(e)}")
-            return []
\ No newline at end of file
+            return []
+    
+    async def iter_jobs(self, cursor: str = None) -> AsyncIterator[Dict[str, Any]]:
+        """Every job prefix in key order, from a single paged pass over the bucket.
+
+        A job's keys are contiguous in listing order, so objects are grouped
+        as the pages stream in and each job is yielded once the next prefix
+        starts. Its ``cursor`` resumes the listing right after it.
+        """
+        params = {'Bucket': self.bucket, 'PaginationConfig': {'PageSize': LIST_PAGE_SIZE}}
+        if cursor:
+            params['StartAfter'] = decode_cursor(cursor)
+        pages = iter(self.client.get_paginator('list_objects_v2').paginate(**params))
+        
+        job_id, file_count, last_key = None, 0, None
+        while True:
+            page = await self._run(next, pages, None)
+            if page is None:
+                break
+            for obj in page.get('Contents', []):
+                key = obj['Key']
+                prefix, separator, name = key.partition('/')
+                if not separator:
+                    continue
+                if prefix != job_id:
+                    if job_id is not None:
+                        yield self._job_entry(job_id, file_count, last_key)
+                    job_id, file_count = prefix, 0
+                if is_evidence_name(name):
+                    file_count += 1
+                last_key = key
+        if job_id is not None:
+            yield self._job_entry(job_id, file_count, last_key)
+    
+    @staticmethod
+    def _job_entry(job_id: str, file_count: int, last_key: str) -> Dict[str, Any]:
+        return {
+            'job_id': job_id,
+            'has_evidence': file_count > 0,
+            'file_count': file_count,
+            'cursor': encode_cursor(last_key)
+        }
+    
+    async def evidence_source(self, storage_path: str, sha256: str) -> Dict[str, Any]:
+        """Where to serve evidence from: the local cache if it already holds the object (or the object
+        is compressed and has to be decompressed locally), else the object itself"""
+        return await self._run(self._evidence_source, storage_path, sha256)
+    
+    def _evidence_source(self, key: str, sha256: str) -> Dict[str, Any]:
+        if key.endswith(COMPRESSED_SUFFIX) or get_cache().entry_path(sha256).exists():
+            path = self._local_path(key, sha256)
+            return {'path': path, 'size': evidence_size(path)}
+        head = self.client.head_object(Bucket=self.bucket, Key=key)
+        return {'key': key, 'size': head['ContentLength']}
+    
+    def presigned_url(self, key: str, file_name: str = None, media_type: str = None,
+                      expires_in: int = 300) -> str:
+        """Short-lived GET URL for an object; S3 answers the client's Range requests itself"""
+        params = {'Bucket': self.bucket, 'Key': key}
+        if media_type:
+            params['ResponseContentType'] = media_type
+        if file_name:
+            params['ResponseContentDisposition'] = content_disposition(file_name)
+        return self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=expires_in)
+    
+    async def iter_range(self, key: str, start: int, end: int) -> AsyncIterator[bytes]:
+        """Bytes ``start`` to ``end`` (inclusive) of an object, read in chunks on the executor"""
+        response = await self._run(self.client.get_object, Bucket=self.bucket, Key=key,
+                                   Range=f"bytes={start}-{end}")
+        body = response['Body']
+        try:
+            while True:
+                chunk = await self._run(body.read, settings.EVIDENCE_STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and occupancy of the local read-through cache"""
+        return get_cache().stats()
+    
+    async def check_health(self) -> Dict[str, Any]:
+        """Check the bucket is reachable"""
+        try:
+            await self._run(self.client.head_bucket, Bucket=self.bucket)
+            return {'status': 'healthy', 'backend': 's3', 'bucket': self.bucket}
+        except Exception as e:
+            return {'status': f"unhealthy: {str(e)}", 'backend': 's3', 'bucket': self.bucket}
@@ -0,0 +1,209 @@
+"""Compact, atomically written metadata sidecars.
+
+A sidecar holds a job's metadata dict with every top-level key (``basic``,
+``processing_info``, ``storage``, large probe dumps, ...) as a separately
+encoded section, so a reader that needs one section decodes only that:
+
+    magic "FEASMETA" | version | codec | index length | index | sections...
+
+The index lists ``[name, offset, length, compressed]`` for each section.
+Sections are encoded with orjson, msgpack or compact JSON
+(``METADATA_SIDECAR_FORMAT``) and, past a size threshold, zstd-compressed.
+Files are written to a temp file, fsynced, renamed over the old one and
+the directory fsynced, so a reader never sees a partial sidecar and a
+crash leaves either the old or the new one. Plain JSON files written
+before this format are still read.
+"""
+
+import io
+import json
+import os
+import struct
+import uuid
+import logging
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Union
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+MAGIC = b"FEASMETA"
+VERSION = 1
+HEADER = struct.Struct("<8sBBI")  # magic, version, codec, index length
+CODECS = {"json": 0, "orjson": 1, "msgpack": 2}
+CODEC_NAMES = {number: name for name, number in CODECS.items()}
+
+
+def _codec_name(codec: str = None) -> str:
+    """The configured codec, falling back to JSON when its package is missing"""
+    codec = codec or settings.METADATA_SIDECAR_FORMAT
+    if codec not in CODECS:
+        raise ValueError(f"Unknown metadata sidecar format: {codec}")
+    if (codec == "orjson" and orjson is None) or (codec == "msgpack" and msgpack is None):
+        logger.warning(f"{codec} is not installed; writing metadata sidecars as JSON")
+        return "json"
+    return codec
+
+
+def _encode(codec: str, value: Any) -> bytes:
+    if codec == "orjson":
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    if codec == "msgpack":
+        return msgpack.packb(value, default=str, use_bin_type=True)
+    return json.dumps(value, default=str, separators=(",", ":")).encode("utf-8")
+
+
+def _decode(codec: str, data: bytes) -> Any:
+    if codec == "msgpack":
+        if msgpack is None:
+            raise RuntimeError("msgpack is required to read this metadata sidecar")
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    # orjson writes plain JSON
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def encode_sidecar(metadata: Dict[str, Any], codec: str = None, compress: bool = None) -> bytes:
+    """Serialize a metadata dict into the sectioned sidecar format"""
+    codec = _codec_name(codec)
+    compress = settings.METADATA_SIDECAR_COMPRESSION if compress is None else compress
+    compressor = zstandard.ZstdCompressor(level=3) if compress and zstandard is not None else None
+
+    index, blobs, offset = [], [], 0
+    for name, value in metadata.items():
+        blob = _encode(codec, value)
+        compressed = False
+        if compressor is not None and len(blob) >= settings.METADATA_SIDECAR_COMPRESS_MIN_BYTES:
+            packed = compressor.compress(blob)
+            if len(packed) < len(blob):
+                blob, compressed = packed, True
+        index.append([str(name), offset, len(blob), compressed])
+        blobs.append(blob)
+        offset += len(blob)
+
+    encoded_index = _encode(codec, index)
+    return b"".join([HEADER.pack(MAGIC, VERSION, CODECS[codec], len(encoded_index)), encoded_index, *blobs])
+
+
+def _fsync_directory(directory: Path) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    except OSError:
+        # Directories cannot be opened on every platform (Windows)
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_atomic(path: Union[str, Path], data: bytes) -> None:
+    """Replace ``path`` with ``data`` so readers see the old or the new content, never a mix"""
+    path = Path(path)
+    temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(data)
+            if settings.METADATA_SIDECAR_FSYNC:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    if settings.METADATA_SIDECAR_FSYNC:
+        _fsync_directory(path.parent)
+
+
+def write_sidecar(path: Union[str, Path], metadata: Dict[str, Any], codec: str = None,
+                  compress: bool = None) -> int:
+    """Atomically write a metadata sidecar; returns its size"""
+    data = encode_sidecar(metadata, codec, compress)
+    write_atomic(path, data)
+    return len(data)
+
+
+class SidecarReader:
+    """Reads a sidecar's header and index on open and each section only when it is asked for"""
+
+    def __init__(self, source: Union[str, Path, bytes]):
+        self._file = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else open(source, "rb")
+        self._cache: Dict[str, Any] = {}
+        self._legacy: Optional[Dict[str, Any]] = None
+        try:
+            header = self._file.read(HEADER.size)
+            if not header.startswith(MAGIC):
+                # Plain JSON metadata written before the sidecar format
+                self._legacy = json.loads(header + self._file.read())
+                self._index = {name: None for name in self._legacy}
+                return
+            _, version, codec, index_length = HEADER.unpack(header)
+            if version != VERSION:
+                raise ValueError(f"Unsupported metadata sidecar version {version}")
+            self.codec = CODEC_NAMES[codec]
+            self._index = {
+                name: (offset, length, compressed)
+                for name, offset, length, compressed in _decode(self.codec, self._file.read(index_length))
+            }
+            self._data_start = HEADER.size + index_length
+        except Exception:
+            self._file.close()
+            raise
+
+    def sections(self) -> List[str]:
+        return list(self._index)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Decode one section"""
+        if name not in self._index:
+            return default
+        if self._legacy is not None:
+            return self._legacy[name]
+        if name not in self._cache:
+            offset, length, compressed = self._index[name]
+            self._file.seek(self._data_start + offset)
+            blob = self._file.read(length)
+            if compressed:
+                if zstandard is None:
+                    raise RuntimeError("zstandard is required to read this metadata sidecar")
+                blob = zstandard.ZstdDecompressor().decompress(blob)
+            self._cache[name] = _decode(self.codec, blob)
+        return self._cache[name]
+
+    def load(self, sections: Iterable[str] = None) -> Dict[str, Any]:
+        """The metadata dict, or only the named sections of it"""
+        names = self._index if sections is None else [name for name in sections if name in self._index]
+        return {name: self.get(name) for name in names}
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "SidecarReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def read_sidecar(source: Union[str, Path, bytes], sections: Iterable[str] = None) -> Dict[str, Any]:
+    """Read a metadata sidecar (or legacy JSON metadata), optionally only some sections"""
+    with SidecarReader(source) as reader:
+        return reader.load(sections)
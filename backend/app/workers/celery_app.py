@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.schedules import crontab
 from app.core.config import settings
 
 celery_app = Celery(
@@ -16,8 +17,13 @@ celery_app.conf.update(
     timezone="UTC",
     enable_utc=True,
     task_track_started=True,
+    # Defaults; URL jobs and integrity sweeps set their own, longer limits (see tasks.py)
     task_time_limit=30 * 60,  # 30 minutes
     task_soft_time_limit=25 * 60,  # 25 minutes
+    # URL jobs are acknowledged late (see process_url_job): take one message at a time, and
+    # keep Redis from redelivering a long download to a second worker while it still runs
+    worker_prefetch_multiplier=1,
+    broker_transport_options={"visibility_timeout": settings.CELERY_VISIBILITY_TIMEOUT},
 )
 
 # Optional: Add task routes
@@ -25,4 +31,28 @@ celery_app.conf.task_routes = {
     "app.workers.tasks.process_url_job": {"queue": "url_jobs"},
     "app.workers.tasks.process_upload_job": {"queue": "upload_jobs"},
     "app.workers.tasks.generate_pdf_report": {"queue": "reports"},
-}
\ No newline at end of file
+    "integrity_sweep_task": {"queue": "integrity"},
+    "storage_gc_task": {"queue": "integrity"},
+}
+
+celery_app.conf.beat_schedule = {}
+
+# Nightly re-verification of all stored evidence
+if settings.INTEGRITY_SWEEP_NIGHTLY:
+    celery_app.conf.beat_schedule["nightly-integrity-sweep"] = {
+        "task": "integrity_sweep_task",
+        "schedule": crontab(hour=settings.INTEGRITY_SWEEP_HOUR, minute=0),
+    }
+
+# Nightly removal of content-addressed blobs no job references
+if settings.STORAGE_GC_NIGHTLY:
+    celery_app.conf.beat_schedule["nightly-storage-gc"] = {
+        "task": "storage_gc_task",
+        "schedule": crontab(hour=(settings.INTEGRITY_SWEEP_HOUR + 2) % 24, minute=0),
+    }
+
+# Hourly removal of acquisition workspaces whose jobs were abandoned mid-download
+celery_app.conf.beat_schedule["acquisition-workspace-cleanup"] = {
+    "task": "acquisition_workspace_cleanup_task",
+    "schedule": crontab(minute=30),
+}
@@ -1,4 +1,7 @@
 from celery import shared_task
+from celery.exceptions import MaxRetriesExceededError, Retry
+from celery.signals import worker_shutting_down
+from celery.worker.control import control_command, inspect_command
 import logging
 import asyncio
 from datetime import datetime
@@ -6,20 +9,37 @@ from datetime import datetime
 from app.pipelines.url_pipeline import URLPipeline
 from app.pipelines.upload_pipeline import UploadPipeline
 from app.services.pdf_generator import PDFReportGenerator
+from app.services.acquisition import acquisition_manager
+from app.services.batch import claim_batch_jobs, release_batch_jobs
 from app.core.logger import ForensicLogger
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
-@shared_task(bind=True, name="process_url_job")
-def process_url_job(self, job_id: str, url: str, investigator_id: str, case_number: str = None):
+# Acknowledged only once finished: a worker killed mid-download leaves the message to be
+# redelivered, and the retried job resumes from its acquisition workspace
+@shared_task(bind=True, name="process_url_job", acks_late=True, reject_on_worker_lost=True,
+             time_limit=settings.CELERY_ACQUISITION_TIME_LIMIT,
+             soft_time_limit=settings.CELERY_ACQUISITION_TIME_LIMIT - 5 * 60)
+def process_url_job(self, job_id: str, url: str, investigator_id: str, case_number: str = None,
+                    batch_id: str = None):
     """Celery task for processing URL jobs"""
+    retrying = False
     try:
-        logger.info(f"Starting URL job {job_id} for {url}")
+        logger.info(f"Starting URL job {job_id} for {url}" + (f" (attempt {self.request.retries + 1})"
+                                                             if self.request.retries else ""))
         
         pipeline = URLPipeline()
         # Run async pipeline in sync task (url, job_id, investigator_id, case_number)
         result = asyncio.run(pipeline.process_url(url, job_id, investigator_id, case_number))
         
+        if result.get('interrupted'):
+            # The worker is going down; hand the job to the next one to resume
+            logger.warning(f"URL job {job_id} interrupted; retrying to resume the download")
+            retrying = True
+            raise self.retry(countdown=settings.ACQUISITION_RESUME_DELAY_SECONDS,
+                             max_retries=settings.ACQUISITION_MAX_RESUMES)
+        
         if result['success']:
             logger.info(f"URL job {job_id} completed successfully")
         else:
@@ -27,13 +47,40 @@ def process_url_job(self, job_id: str, url: str, investigator_id: str, case_numb
         
         return result
         
+    except Retry:
+        raise
+    except MaxRetriesExceededError:
+        retrying = False
+        URLPipeline.fail_job(job_id, "Download interrupted too many times")
+        raise
     except Exception as e:
         logger.error(f"URL job task {job_id} failed: {str(e)}")
         raise
+    finally:
+        if batch_id and not retrying:
+            # This job's slot in the batch is free; hand it to the next waiting job
+            try:
+                dispatch_batch_jobs(batch_id)
+            except Exception as e:
+                logger.error(f"Dispatching batch {batch_id} failed: {str(e)}")
+
+def dispatch_batch_jobs(batch_id: str) -> int:
+    """Queue the batch's waiting jobs its in-flight limit leaves room for; returns how many"""
+    jobs = claim_batch_jobs(batch_id)
+    for index, job in enumerate(jobs):
+        try:
+            process_url_job.delay(batch_id=batch_id, **job)
+        except Exception:
+            release_batch_jobs([unsent['job_id'] for unsent in jobs[index:]])
+            raise
+    if jobs:
+        logger.info(f"Batch {batch_id}: queued {len(jobs)} jobs")
+    return len(jobs)
 
 @shared_task(bind=True, name="process_upload_job")
 def process_upload_job(self, job_id: str, file_path: str, filename: str, 
-                      investigator_id: str, case_number: str = None):
+                      investigator_id: str, case_number: str = None,
+                      acquisition_receipt: dict = None):
     """Celery task for processing upload jobs"""
     try:
         logger.info(f"Starting upload job {job_id} for {filename}")
@@ -41,7 +88,7 @@ def process_upload_job(self, job_id: str, file_path: str, filename: str,
         pipeline = UploadPipeline()
         # Fix: Run async pipeline in sync task and use correct method 'process_file_path'
         result = asyncio.run(pipeline.process_file_path(
-            file_path, filename, job_id, investigator_id
+            file_path, filename, job_id, investigator_id, acquisition_receipt
         ))
         
         if result['success']:
@@ -107,3 +154,86 @@ def verify_integrity_task(self, job_id: str, file_path: str,
     except Exception as e:
         logger.error(f"Integrity verification task failed: {str(e)}")
         raise
+
+@shared_task(bind=True, name="integrity_sweep_task", time_limit=settings.CELERY_SWEEP_TIME_LIMIT,
+             soft_time_limit=settings.CELERY_SWEEP_TIME_LIMIT - 5 * 60)
+def integrity_sweep_task(self, sweep_id: str = None, case_number: str = None,
+                         since: str = None, until: str = None,
+                         investigator_id: str = "SYSTEM", bandwidth_mb_s: float = None):
+    """Celery task for bulk re-verification of stored evidence"""
+    try:
+        from app.services.integrity_sweep import IntegritySweep
+        
+        # The nightly run resumes its own checkpoint if a previous attempt was cut short
+        sweep_id = sweep_id or f"nightly-{datetime.utcnow().date().isoformat()}"
+        logger.info(f"Starting integrity sweep {sweep_id}")
+        
+        sweep = IntegritySweep(
+            sweep_id=sweep_id,
+            case_number=case_number,
+            since=datetime.fromisoformat(since) if since else None,
+            until=datetime.fromisoformat(until) if until else None,
+            investigator_id=investigator_id,
+            bandwidth_mb_s=bandwidth_mb_s
+        )
+        return sweep.run()
+        
+    except Exception as e:
+        logger.error(f"Integrity sweep task failed: {str(e)}")
+        raise
+
+@shared_task(bind=True, name="storage_gc_task")
+def storage_gc_task(self, grace_seconds: int = None, dry_run: bool = False):
+    """Celery task for removing unreferenced evidence blobs"""
+    try:
+        from app.storage.local_storage import LocalStorage
+        
+        return LocalStorage().collect_garbage(grace_seconds=grace_seconds, dry_run=dry_run)
+        
+    except Exception as e:
+        logger.error(f"Storage GC task failed: {str(e)}")
+        raise
+
+@shared_task(bind=True, name="storage_fsck_task")
+def storage_fsck_task(self, repair: bool = False, verify: bool = False):
+    """Celery task for checking (or rebuilding) the local storage manifest"""
+    try:
+        from app.storage.local_storage import LocalStorage
+        
+        return LocalStorage().fsck(repair=repair, verify=verify)
+        
+    except Exception as e:
+        logger.error(f"Storage fsck task failed: {str(e)}")
+        raise
+
+@shared_task(bind=True, name="acquisition_workspace_cleanup_task")
+def acquisition_workspace_cleanup_task(self, ttl_hours: float = None):
+    """Celery task for removing acquisition workspaces abandoned past their TTL"""
+    try:
+        from app.services.acquisition import cleanup_workspaces
+        
+        ttl_seconds = ttl_hours * 3600 if ttl_hours is not None else None
+        return cleanup_workspaces(ttl_seconds, active=acquisition_manager.active_jobs())
+        
+    except Exception as e:
+        logger.error(f"Acquisition workspace cleanup task failed: {str(e)}")
+        raise
+
+# --- Acquisition pool control ---
+# URL jobs on one worker share its acquisition pools; these remote control commands
+# (celery_app.control.broadcast) let the API read their queues and cancel downloads.
+
+@inspect_command()
+def acquisition_stats(state):
+    """Running and queued downloads per platform on this worker"""
+    return acquisition_manager.stats()
+
+@control_command(args=[('job_id', str)], signature='<job_id>')
+def cancel_acquisition(state, job_id):
+    """Cancel the download of a job if it runs on this worker"""
+    return {'cancelled': acquisition_manager.cancel(job_id)}
+
+@worker_shutting_down.connect
+def stop_acquisitions(**kwargs):
+    # Interrupted downloads keep their workspace; their tasks are retried and resume them
+    acquisition_manager.shutdown()
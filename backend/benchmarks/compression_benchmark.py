@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+FEAS Compression-at-Rest Benchmark
+
+Measures the seekable zstd storage layer per MIME type in
+``ALLOWED_MIME_TYPES``: whether the type is compressed at all, the stored
+ratio (measured even for skipped types, to show why they are skipped),
+compression and sequential decompression throughput, and the latency
+of a random 64 KB read. Samples are synthesised where the type can be
+produced locally (JPEG/PNG via Pillow, PCM WAV, raw-frame AVI); pass a
+directory of real evidence with ``--samples`` to measure actual files.
+
+Usage:
+    cd backend
+    python benchmarks/compression_benchmark.py --size-mb 32
+    python benchmarks/compression_benchmark.py --samples /path/to/evidence
+"""
+
+import argparse
+import math
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.services.compression import compress_file, open_evidence, should_compress, zstandard
+
+try:
+    import numpy as np
+    from PIL import Image, ImageFilter
+except ImportError:
+    np = None
+    Image = None
+
+try:
+    import magic
+except ImportError:
+    magic = None
+
+RANDOM_READ = 64 * 1024
+
+
+def photo_like(width: int, height: int):
+    """Blurred noise with gradients: compresses like a photograph, not like a flat test card"""
+    rng = np.random.default_rng(7)
+    noise = rng.integers(0, 255, (height // 8, width // 8, 3), dtype=np.uint8)
+    image = Image.fromarray(noise).resize((width, height), Image.Resampling.BICUBIC)
+    return image.filter(ImageFilter.GaussianBlur(1.5))
+
+
+def sample_jpeg(path: str, size: int) -> None:
+    side = max(256, int(math.sqrt(size * 3)))
+    photo_like(side, side).save(path, "JPEG", quality=90)
+
+
+def sample_png(path: str, size: int) -> None:
+    side = max(256, int(math.sqrt(size / 2)))
+    photo_like(side, side).save(path, "PNG")
+
+
+def sample_wav(path: str, size: int) -> None:
+    """16-bit stereo PCM: a few tones plus room noise"""
+    rate = 44100
+    frames = size // 4
+    rng = random.Random(7)
+    with wave.open(path, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        block = []
+        for i in range(frames):
+            t = i / rate
+            value = int(8000 * math.sin(2 * math.pi * 440 * t) + 3000 * math.sin(2 * math.pi * 97 * t)
+                        + rng.gauss(0, 300))
+            block.append(struct.pack("<hh", value, value))
+            if len(block) == 65536:
+                w.writeframes(b"".join(block))
+                block = []
+        w.writeframes(b"".join(block))
+
+
+def sample_avi(path: str, size: int) -> None:
+    """Uncompressed RGB frames of a slowly moving scene in a RIFF/AVI container shell"""
+    width, height = 320, 240
+    base = np.asarray(photo_like(width * 2, height))
+    frame_bytes = width * height * 3
+    with open(path, "wb") as f:
+        f.write(b"RIFF" + struct.pack("<I", size) + b"AVI LIST")
+        for index in range(max(1, size // frame_bytes)):
+            shift = index % width
+            f.write(b"00db" + struct.pack("<I", frame_bytes))
+            f.write(np.ascontiguousarray(base[:, shift:shift + width]).tobytes())
+
+
+GENERATORS = {
+    "image/jpeg": (".jpg", sample_jpeg, "pillow"),
+    "image/png": (".png", sample_png, "pillow"),
+    "video/x-msvideo": (".avi", sample_avi, "numpy"),
+    "audio/wav": (".wav", sample_wav, None),
+}
+
+
+def measure(path: str, mime_type: str, repeats: int) -> str:
+    size = os.path.getsize(path)
+    if mime_type in settings.STORAGE_COMPRESSION_SKIP_MIME_TYPES:
+        decision = "skip:type"
+    elif not should_compress(mime_type, path):
+        decision = "skip:probe"
+    else:
+        decision = "compress"
+
+    compressed_path = path + ".zst"
+    best_compress = best_decompress = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = compress_file(path, compressed_path)
+        best_compress = min(best_compress, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with open_evidence(compressed_path) as f:
+            while f.read(settings.HASH_BLOCK_SIZE):
+                pass
+        best_decompress = min(best_decompress, time.perf_counter() - start)
+
+    rng = random.Random(1)
+    latencies = []
+    with open_evidence(compressed_path) as f:
+        for _ in range(50):
+            f.seek(rng.randrange(0, max(1, size - RANDOM_READ)))
+            start = time.perf_counter()
+            f.read(RANDOM_READ)
+            latencies.append(time.perf_counter() - start)
+    os.unlink(compressed_path)
+
+    latencies.sort()
+    return (f"{mime_type:<18} {size / 1e6:>8.1f} MB  {decision:<10}  ratio {size / result['stored_size']:>5.2f}x  "
+            f"compress {size / 1e6 / best_compress:>7.1f} MB/s  decompress {size / 1e6 / best_decompress:>7.1f} MB/s  "
+            f"64K read p50 {latencies[len(latencies) // 2] * 1000:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=32, help="Approximate size of each generated sample")
+    parser.add_argument("--repeats", type=int, default=2, help="Runs per sample (best is reported)")
+    parser.add_argument("--level", type=int, default=None, help="zstd level (default STORAGE_COMPRESSION_LEVEL)")
+    parser.add_argument("--samples", help="Directory of real evidence files to measure instead")
+    args = parser.parse_args()
+
+    if zstandard is None:
+        sys.exit("zstandard is not installed")
+    if args.level is not None:
+        settings.STORAGE_COMPRESSION_LEVEL = args.level
+    print(f"zstd level {settings.STORAGE_COMPRESSION_LEVEL}, frame size {settings.STORAGE_COMPRESSION_FRAME_SIZE} bytes")
+    print("-" * 120)
+
+    if args.samples:
+        for path in sorted(Path(args.samples).iterdir()):
+            if path.is_file():
+                mime_type = magic.from_file(str(path), mime=True) if magic else "application/octet-stream"
+                print(measure(str(path), mime_type, args.repeats))
+        return
+
+    size = args.size_mb * 1024 * 1024
+    with tempfile.TemporaryDirectory() as directory:
+        for mime_type in settings.ALLOWED_MIME_TYPES:
+            generator = GENERATORS.get(mime_type)
+            if generator is None or (generator[2] and np is None):
+                print(f"{mime_type:<18} no local encoder; measure real files with --samples")
+                continue
+            suffix, generate, _ = generator
+            path = os.path.join(directory, f"sample{suffix}")
+            generate(path, size)
+            print(measure(path, mime_type, args.repeats))
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
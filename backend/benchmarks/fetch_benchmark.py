@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+FEAS Direct Download Benchmark
+
+Compares the legacy ``requests.get`` + ``iter_content(8192)`` download with
+HTTPFetcher over one connection and over parallel byte ranges, against a
+local HTTP server that supports Range requests. CDNs typically cap each
+connection well below the line rate; ``--per-connection-mb-s`` emulates
+that cap, which is where parallel ranges pay off. Every run's SHA-256 is
+checked against the served file.
+
+Usage:
+    cd backend
+    python benchmarks/fetch_benchmark.py --size-mb 256
+    python benchmarks/fetch_benchmark.py --size-mb 256 --per-connection-mb-s 20
+"""
+
+import argparse
+import functools
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.services.fetcher import HTTPFetcher
+
+MiB = 1024 * 1024
+WRITE_SIZE = 256 * 1024
+
+
+class ThrottledRangeHandler(SimpleHTTPRequestHandler):
+    """Serves single byte ranges, each connection limited to the server's ``rate`` bytes/s"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path = self.translate_path(self.path)
+        size = os.path.getsize(path)
+        header = self.headers.get("Range")
+        start, end = 0, size - 1
+        if header:
+            first, _, last = header.partition("=")[2].partition("-")
+            start, end = int(first), min(int(last) if last else size - 1, size - 1)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", '"bench"')
+        self.end_headers()
+        rate = self.server.rate
+        started = time.monotonic()
+        sent = 0
+        with open(path, "rb") as f:
+            f.seek(start)
+            while sent < end - start + 1:
+                chunk = f.read(min(WRITE_SIZE, end - start + 1 - sent))
+                self.wfile.write(chunk)
+                sent += len(chunk)
+                if rate:
+                    ahead = sent / rate - (time.monotonic() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+
+
+def legacy_download(url: str, path: str) -> str:
+    """The pre-optimisation download: a one-off request read in 8 KB chunks, hashed afterwards"""
+    response = requests.get(url, stream=True, timeout=30)
+    response.raise_for_status()
+    with open(path, "wb") as f:
+        for chunk in response.iter_content(chunk_size=8192):
+            f.write(chunk)
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(MiB), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def measure(name: str, download, size: int, expected: str, repeats: int) -> str:
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        digest = download()
+        elapsed = time.perf_counter() - started
+        if digest != expected:
+            raise SystemExit(f"{name}: SHA-256 mismatch")
+        best = elapsed if best is None else min(best, elapsed)
+    return f"{name:<34} {best:7.2f} s  {size / MiB / best:9.1f} MB/s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=256, help="Size of the served file")
+    parser.add_argument("--per-connection-mb-s", type=float, default=0, help="Per-connection cap (0 = none)")
+    parser.add_argument("--segments", type=int, default=settings.FETCH_SEGMENTS, help="Parallel ranges")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per method (best is reported)")
+    args = parser.parse_args()
+
+    size = args.size_mb * MiB
+    with tempfile.TemporaryDirectory() as directory:
+        served = os.path.join(directory, "served")
+        os.makedirs(served)
+        source = os.path.join(served, "evidence.mp4")
+        sha256 = hashlib.sha256()
+        with open(source, "wb") as f:
+            for _ in range(0, size, MiB):
+                block = os.urandom(MiB)
+                sha256.update(block)
+                f.write(block)
+        expected = sha256.hexdigest()
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(ThrottledRangeHandler, directory=served))
+        server.rate = args.per_connection_mb_s * MiB
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/evidence.mp4"
+        target = os.path.join(directory, "download.mp4")
+        cap = f"{args.per_connection_mb_s:g} MB/s per connection" if args.per_connection_mb_s else "uncapped"
+        print(f"{args.size_mb} MB over loopback, {cap}")
+        print("-" * 64)
+
+        fetcher = HTTPFetcher()
+        settings.FETCH_MIN_SEGMENT_BYTES = max(MiB, size // max(1, args.segments))
+
+        def fetch(segments: int):
+            settings.FETCH_SEGMENTS = segments
+            return fetcher.fetch(url, target)["sha256"]
+
+        try:
+            print(measure("legacy iter_content(8192)", lambda: legacy_download(url, target), size, expected,
+                          args.repeats))
+            print(measure("fetcher, 1 connection", lambda: fetch(1), size, expected, args.repeats))
+            print(measure(f"fetcher, {args.segments} ranges", lambda: fetch(args.segments), size, expected,
+                          args.repeats))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,702 @@
+#!/usr/bin/env python3
+"""
+FEAS Acquisition Tests
+
+Covers the acquisition manager behind the URL downloader: blocking
+downloads running off the event loop in parallel, per-platform limits and
+queue depth, cancellation of queued and running downloads, timeouts, and
+downloads streaming into the acquisition workspace in constant memory, and
+parallel, resumable ranged fetches against a local HTTP server, jobs
+resuming from their workspace after an interruption, throttled progress
+reporting, and uploads hashed as they are received.
+
+Usage:
+    cd backend
+    python -m pytest tests/test_acquisition.py -v
+"""
+
+import sys
+import os
+import asyncio
+import functools
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+import hashlib
+import io
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.services import downloader as downloader_module
+from app.models.schemas import Platform
+from app.services.acquisition import (
+    Acquisition, AcquisitionCancelled, AcquisitionManager, cleanup_workspaces, release_workspace
+)
+from app.services.downloader import URLDownloader
+from app.services.fetcher import HTTPFetcher
+from app.pipelines.unified_pipeline import UnifiedForensicPipeline
+
+MiB = 1024 * 1024
+
+
+def test_acquisition_manager_pools_and_cancellation():
+    """Downloads run concurrently off the loop, queue per platform, and stop when cancelled or timed out"""
+    manager = AcquisitionManager(limits={"youtube": 4, "instagram": 1}, default_limit=2, timeout=30)
+    release = threading.Event()
+
+    def blocking_download(seconds, acquisition=None):
+        time.sleep(seconds)
+        return acquisition.job_id
+
+    def hooked_download(acquisition=None):
+        # Stands in for yt-dlp calling the progress hook every chunk
+        while not release.wait(0.01):
+            acquisition.check()
+        return "done"
+
+    async def scenario():
+        # Four blocking downloads and a ticker share one loop without serializing
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        started = time.monotonic()
+        results = await asyncio.gather(*(
+            manager.run(f"yt-{i}", "youtube", blocking_download, 0.3) for i in range(4)
+        ))
+        elapsed = time.monotonic() - started
+        ticking.cancel()
+        assert results == [f"yt-{i}" for i in range(4)]
+        assert elapsed < 0.9, f"Downloads serialized ({elapsed:.2f}s)"
+        assert ticks >= 10, "Event loop was blocked during downloads"
+
+        # One Instagram slot: the second job queues behind the first
+        running = asyncio.create_task(manager.run("ig-1", "instagram", hooked_download))
+        queued = asyncio.create_task(manager.run("ig-2", "instagram", hooked_download))
+        await asyncio.sleep(0.1)
+        stats = manager.stats()
+        assert stats["platforms"]["instagram"] == {"limit": 1, "running": 1, "queued": 1}
+        assert stats["active_jobs"] == 2
+
+        # Cancelling the queued job means it never starts; the running one stops at its next hook
+        assert manager.cancel("ig-2") and manager.cancel("ig-1")
+        assert not manager.cancel("unknown")
+        for task in (running, queued):
+            try:
+                await task
+                assert False, "Cancelled download completed"
+            except AcquisitionCancelled:
+                pass
+
+        # A timeout cancels the download too, freeing its thread
+        try:
+            await manager.run("ig-3", "instagram", hooked_download, timeout=0.1)
+            assert False, "Download did not time out"
+        except asyncio.TimeoutError:
+            pass
+        await asyncio.sleep(0.1)
+        release.set()
+        assert await manager.run("ig-4", "instagram", hooked_download) == "done"
+
+        stats = manager.stats()
+        assert stats["running"] == 0 and stats["queued"] == 0
+        assert stats["cancelled"] == 3 and stats["completed"] == 5
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        manager.shutdown()
+
+
+def test_downloader_reports_cancellation():
+    """A cancelled download is reported as a failed, cancelled result rather than raised"""
+    downloader = URLDownloader()
+    assert downloader._progress_hooks(None, None) == []
+
+    class Acquisition:
+        job_id = "job-1"
+
+        def check(self):
+            raise AcquisitionCancelled("Acquisition of job job-1 cancelled")
+
+    hook = downloader._progress_hooks(None, Acquisition())[0]
+    try:
+        hook({"status": "downloading", "downloaded_bytes": 1})
+        assert False, "Hook did not abort the download"
+    except AcquisitionCancelled:
+        pass
+
+    def cancelled_download(url, progress, acquisition=None):
+        acquisition.cancel()
+        acquisition.check()
+
+    result = asyncio.run(downloader._acquire("web", cancelled_download, "https://example.com/a.bin", None, "job-2"))
+    assert result == {"success": False, "error": "Acquisition of job job-2 cancelled", "cancelled": True,
+                      "resumable": False}
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """Static files with single byte-range and If-Range support, counting what it serves"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        path = self.translate_path(self.path)
+        size = os.path.getsize(path)
+        header = self.headers.get("Range") if server.ranges else None
+        if header and self.headers.get("If-Range") not in (None, server.etag):
+            header = None
+        server.requests.append(header)
+        start, end = 0, size - 1
+        if header:
+            first, _, last = header.partition("=")[2].partition("-")
+            start, end = int(first), min(int(last) if last else size - 1, size - 1)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("ETag", server.etag)
+        self.end_headers()
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining:
+                chunk = f.read(min(remaining, 256 * 1024))
+                try:
+                    self.wfile.write(chunk)
+                except OSError:
+                    return
+                server.served += len(chunk)
+                remaining -= len(chunk)
+                time.sleep(server.delay)
+
+
+def serve_directory(directory: str, ranges: bool = True) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(RangeRequestHandler, directory=directory))
+    server.ranges, server.etag, server.delay, server.served, server.requests = ranges, '"v1"', 0, 0, []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class FakeYoutubeDL:
+    """Writes a large 'video' to the output template in chunks, as yt-dlp does"""
+
+    size = 64 * MiB
+
+    def __init__(self, options):
+        self.options = options
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def extract_info(self, url, download=True):
+        info = {"id": "abc123", "title": "clip", "ext": "mp4", "uploader": "someone"}
+        path = self.options["outtmpl"] % info
+        chunk = b"\x00" * MiB
+        with open(path, "wb") as f:
+            for written in range(MiB, self.size + 1, MiB):
+                f.write(chunk)
+                for hook in self.options["progress_hooks"]:
+                    hook({"status": "downloading", "downloaded_bytes": written, "total_bytes": self.size})
+        info["requested_downloads"] = [{"filepath": path}]
+        return info
+
+    def prepare_filename(self, info):
+        return self.options["outtmpl"] % info
+
+
+def test_downloads_stream_into_workspace():
+    """Downloaded evidence lands in the job's workspace without being held in memory"""
+    base = tempfile.mkdtemp()
+    original_workspace, original_ydl = settings.ACQUISITION_WORKSPACE_DIR, downloader_module.yt_dlp.YoutubeDL
+    settings.ACQUISITION_WORKSPACE_DIR = os.path.join(base, "workspace")
+    downloader = URLDownloader()
+    server = None
+    try:
+        # yt-dlp output stays where yt-dlp wrote it; peak memory does not grow with the file
+        downloader_module.yt_dlp.YoutubeDL = FakeYoutubeDL
+        tracemalloc.start()
+        try:
+            result = downloader._download_youtube("https://youtube.com/watch?v=abc123", None,
+                                                  Acquisition("job-video", "youtube"))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        assert result["success"], result
+        assert result["file_path"] == os.path.join(settings.ACQUISITION_WORKSPACE_DIR, "job-video", "clip.mp4")
+        assert os.path.getsize(result["file_path"]) == FakeYoutubeDL.size
+        assert peak < 8 * MiB, f"Peak traced memory {peak / MiB:.1f} MiB for a 64 MiB download"
+
+        # Generic downloads stream from the socket into the workspace
+        served = os.path.join(base, "served")
+        os.makedirs(served)
+        with open(os.path.join(served, "evidence.bin"), "wb") as f:
+            f.truncate(64 * MiB)
+        server = serve_directory(served, ranges=False)
+        url = f"http://127.0.0.1:{server.server_address[1]}/evidence.bin"
+        tracemalloc.start()
+        try:
+            result = downloader._download_generic(url, None, Acquisition("job-web", "web"))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        assert result["success"], result
+        assert result["file_path"] == os.path.join(settings.ACQUISITION_WORKSPACE_DIR, "job-web", "download.bin")
+        assert os.path.getsize(result["file_path"]) == 64 * MiB
+        # Bounded by the largest socket read, whatever the file size
+        assert peak < 4 * settings.FETCH_CHUNK_MAX, f"Peak traced memory {peak / MiB:.1f} MiB for a 64 MiB download"
+
+        release_workspace("job-video")
+        release_workspace("job-web")
+        assert os.listdir(settings.ACQUISITION_WORKSPACE_DIR) == []
+
+        # Without an acquisition the download still goes under the workspace root, where cleanup finds it
+        result = downloader._download_generic(url, None)
+        assert result["success"], result
+        adhoc = os.path.relpath(result["file_path"], settings.ACQUISITION_WORKSPACE_DIR).split(os.sep)
+        assert adhoc[0].startswith("adhoc-") and adhoc[1:] == ["download.bin"], adhoc
+        assert cleanup_workspaces(0)["removed"] == 1
+        assert os.listdir(settings.ACQUISITION_WORKSPACE_DIR) == []
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        downloader_module.yt_dlp.YoutubeDL = original_ydl
+        settings.ACQUISITION_WORKSPACE_DIR = original_workspace
+        shutil.rmtree(base)
+
+
+def test_ranged_fetch_and_resume():
+    """Range-capable servers are fetched in parallel segments, hashed on the fly and resumed after interruption"""
+    base = tempfile.mkdtemp()
+    original = settings.FETCH_SEGMENTS, settings.FETCH_MIN_SEGMENT_BYTES
+    settings.FETCH_SEGMENTS, settings.FETCH_MIN_SEGMENT_BYTES = 4, 2 * MiB
+    served = os.path.join(base, "served")
+    os.makedirs(served)
+    data = os.urandom(24 * MiB)
+    with open(os.path.join(served, "clip.mp4"), "wb") as f:
+        f.write(data)
+    expected = hashlib.sha256(data).hexdigest()
+    server = serve_directory(served)
+    url = f"http://127.0.0.1:{server.server_address[1]}/clip.mp4"
+    fetcher = HTTPFetcher(pool_size=8)
+    target = os.path.join(base, "download.mp4")
+
+    class CancelAfter:
+        """Progress stand-in that cancels the acquisition part-way through"""
+
+        def __init__(self, acquisition, limit):
+            self.acquisition, self.limit, self.total_bytes = acquisition, limit, None
+
+        def update(self, done, total=None):
+            if done >= self.limit:
+                self.acquisition.cancel()
+
+    def interrupted_fetch():
+        acquisition = Acquisition("job-ranged", "web")
+        try:
+            fetcher.fetch(url, target, CancelAfter(acquisition, 6 * MiB), acquisition)
+            assert False, "Cancelled fetch completed"
+        except AcquisitionCancelled:
+            pass
+        assert os.path.exists(target + ".fetch.json"), "No checkpoint left for the resume"
+
+    try:
+        # Four ranges in parallel over pooled connections; the digest matches the reassembled file
+        tracemalloc.start()
+        try:
+            result = fetcher.fetch(url, target)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        assert result["ranged"] and result["segments"] == 4 and result["resumed_bytes"] == 0
+        assert result["sha256"] == expected and Path(target).read_bytes() == data
+        assert len([r for r in server.requests if r and r != "bytes=0-0"]) == 4
+        assert not os.path.exists(target + ".fetch.json")
+        # The receipt covers every digest the pipeline needs, so it does not read the file again
+        hashes, _, _, _, source = UnifiedForensicPipeline()._resolve_hashes(target, result["receipt"])
+        assert source == "acquisition_receipt" and hashes["sha256"] == expected
+        # A few reads in flight per segment plus one hash block (the test server's buffers are traced too)
+        assert peak < 3 * settings.FETCH_SEGMENTS * settings.FETCH_CHUNK_MAX + settings.HASH_BLOCK_SIZE + 2 * MiB
+
+        # Interrupted part-way, the next fetch continues each segment where it stopped
+        os.unlink(target)
+        server.delay = 0.005
+        interrupted_fetch()
+        server.served = 0
+        server.delay = 0
+        result = fetcher.fetch(url, target)
+        assert 0 < result["resumed_bytes"] < len(data)
+        assert result["sha256"] == expected and Path(target).read_bytes() == data
+        assert server.served <= len(data) - result["resumed_bytes"] + 1
+
+        # A changed resource (new ETag) is fetched from scratch instead of being spliced
+        os.unlink(target)
+        server.delay = 0.005
+        interrupted_fetch()
+        server.delay = 0
+        server.etag = '"v2"'
+        result = fetcher.fetch(url, target)
+        assert result["resumed_bytes"] == 0 and result["sha256"] == expected
+
+        # Without range support the body is streamed over one connection
+        server.ranges = False
+        result = fetcher.fetch(url, os.path.join(base, "single.mp4"))
+        assert not result["ranged"] and result["sha256"] == expected
+        assert result["receipt"]["hashes"]["sha256"] == expected and result["receipt"]["file_size"] == len(data)
+    finally:
+        server.shutdown()
+        server.server_close()
+        settings.FETCH_SEGMENTS, settings.FETCH_MIN_SEGMENT_BYTES = original
+        shutil.rmtree(base)
+
+
+def test_interrupted_acquisitions_resume():
+    """Shutdown interrupts downloads resumably, finished downloads are reused, abandoned workspaces expire"""
+    base = tempfile.mkdtemp()
+    original_workspace, original_ydl = settings.ACQUISITION_WORKSPACE_DIR, downloader_module.yt_dlp.YoutubeDL
+    settings.ACQUISITION_WORKSPACE_DIR = os.path.join(base, "workspace")
+    manager = AcquisitionManager(limits={"youtube": 1}, timeout=30)
+
+    def hooked_download(acquisition=None):
+        while True:
+            acquisition.check()
+            time.sleep(0.01)
+
+    class CountingYoutubeDL(FakeYoutubeDL):
+        size = MiB
+        calls = 0
+
+        def extract_info(self, url, download=True):
+            CountingYoutubeDL.calls += 1
+            return super().extract_info(url, download)
+
+    async def shutdown_scenario():
+        running = asyncio.create_task(manager.run("job-a", "youtube", hooked_download))
+        queued = asyncio.create_task(manager.run("job-b", "youtube", hooked_download))
+        await asyncio.sleep(0.1)
+        manager.shutdown()
+        for task in (running, queued):
+            try:
+                await task
+                assert False, "Download survived shutdown"
+            except AcquisitionCancelled as e:
+                assert e.resumable, "Shutdown must leave downloads resumable"
+
+    try:
+        asyncio.run(shutdown_scenario())
+
+        # A retried job finds its finished download in the workspace and skips the network
+        downloader_module.yt_dlp.YoutubeDL = CountingYoutubeDL
+        downloader = URLDownloader()
+        url = "https://youtube.com/watch?v=abc123"
+        first = asyncio.run(downloader.download(url, None, "job-resume"))
+        again = asyncio.run(downloader.download(url, None, "job-resume"))
+        assert first["success"] and again["success"] and again["from_checkpoint"]
+        assert CountingYoutubeDL.calls == 1
+        assert again["file_path"] == first["file_path"] and again["platform"] == Platform.YOUTUBE
+        assert again["platform_metadata"] == first["platform_metadata"]
+
+        # Only workspaces untouched past the TTL, and not in use, are removed
+        workspace = Path(settings.ACQUISITION_WORKSPACE_DIR)
+        for name in ("job-old", "job-busy"):
+            (workspace / name).mkdir()
+            (workspace / name / "clip.mp4.part").write_bytes(b"\x00" * 1000)
+            for path in (workspace / name, workspace / name / "clip.mp4.part"):
+                os.utime(path, (time.time() - 7200, time.time() - 7200))
+        stats = cleanup_workspaces(3600, active=["job-busy"])
+        assert stats == {"removed": 1, "kept": 2, "bytes_freed": 1000}
+        assert sorted(os.listdir(workspace)) == ["job-busy", "job-resume"]
+    finally:
+        manager.shutdown()
+        downloader_module.yt_dlp.YoutubeDL = original_ydl
+        settings.ACQUISITION_WORKSPACE_DIR = original_workspace
+        shutil.rmtree(base)
+
+
+class FlatYoutubeDL:
+    """Lists a channel (with its tabs) and a playlist the way extract_flat does, without the network"""
+
+    instances = 0
+    requests = []
+
+    def __init__(self, options):
+        assert options["extract_flat"] == "in_playlist" and options["skip_download"]
+        FlatYoutubeDL.instances += 1
+        self.params = dict(options)
+
+    def extract_info(self, url, download=True):
+        assert not download
+        FlatYoutubeDL.requests.append(url)
+        limit = self.params.get("playlistend") or 10 ** 6
+        if url.endswith("/@channel"):
+            return {"_type": "playlist", "id": "UCchannel", "title": "Channel", "entries": [
+                {"_type": "url", "url": "https://www.youtube.com/@channel/videos"},
+                {"_type": "url", "url": "https://www.youtube.com/@channel/shorts"}]}
+        if url.endswith("/videos"):
+            return {"_type": "playlist", "id": "videos", "title": "Channel - Videos", "entries": [
+                {"_type": "url", "url": f"https://www.youtube.com/watch?v=v{i}", "title": f"Video {i}"}
+                for i in range(min(150, limit))]}
+        if url.endswith("/shorts"):
+            return {"_type": "playlist", "id": "shorts", "title": "Channel - Shorts", "entries": [
+                {"_type": "url", "url": "https://www.youtube.com/watch?v=v0"},
+                {"_type": "url", "url": "https://www.youtube.com/shorts/s1"}][:limit]}
+        raise ValueError("This playlist does not exist")
+
+    def close(self):
+        pass
+
+
+def test_batch_expansion_and_fan_out():
+    """Collections expand in one flat pass into one bulk insert; dispatch is bounded; status aggregates"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.orm import sessionmaker
+    from app.api.v1.endpoints import batches
+    from app.db.base import Base
+    from app.db.session import get_db
+    from app.models.sql_models import Job
+    from app.services import batch as batch_module
+
+    base = tempfile.mkdtemp()
+    original_ydl, original_session = batch_module.yt_dlp.YoutubeDL, batch_module.SessionLocal
+    try:
+        batch_module.yt_dlp.YoutubeDL = FlatYoutubeDL
+        assert batch_module.is_collection("https://www.youtube.com/playlist?list=PL1", Platform.YOUTUBE)
+        assert batch_module.is_collection("https://www.youtube.com/watch?v=a&list=PL1", Platform.YOUTUBE)
+        assert batch_module.is_collection("https://www.instagram.com/someone/", Platform.INSTAGRAM)
+        assert not batch_module.is_collection("https://www.youtube.com/watch?v=a", Platform.YOUTUBE)
+        assert not batch_module.is_collection("https://x.com/someone/status/1", Platform.TWITTER)
+
+        urls = ["https://youtube.com/watch?v=single", "https://example.org/clip.mp4",
+                "https://www.youtube.com/playlist?list=gone", "https://youtube.com/watch?v=single",
+                "https://www.youtube.com/@channel", "https://youtube.com/watch?v=late"]
+        expansion = batch_module.BatchExpander(max_items=120).expand(urls)
+        # Single posts need no extraction; one YoutubeDL lists every collection
+        assert FlatYoutubeDL.instances == 1
+        assert "https://youtube.com/watch?v=single" not in FlatYoutubeDL.requests
+        assert expansion["items"][0] == "https://youtube.com/watch?v=single"
+        assert len(expansion["items"]) == 120 and len(set(expansion["items"])) == 120
+        assert expansion["truncated"] and expansion["sources"][1]["entries"] == 119
+        assert expansion["items"][-1] == "https://www.youtube.com/watch?v=v118"
+        assert [s["reason"] for s in expansion["skipped"]] == [
+            "URL domain not whitelisted", "This playlist does not exist", "Batch limit of 120 items reached"]
+        assert "https://www.youtube.com/@channel/shorts" not in FlatYoutubeDL.requests
+
+        engine = create_engine(f"sqlite:///{os.path.join(base, 'test.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        batch_module.SessionLocal = Session
+        inserts = []
+        event.listen(engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: inserts.append(statement)
+                     if statement.startswith("INSERT INTO jobs") else None)
+
+        db = Session()
+        batch = batch_module.create_batch(db, expansion, "inv-1", "CASE-7", max_in_flight=4)
+        assert len(inserts) == 1, "Child jobs must go in as one bulk insert"
+        assert db.query(Job).filter(Job.batch_id == batch.id, Job.case_number == "CASE-7").count() == 120
+
+        # At most max_in_flight jobs are ever handed out, in playlist order
+        first = batch_module.claim_batch_jobs(batch.id)
+        assert [job["url"] for job in first] == expansion["items"][:4]
+        assert batch_module.claim_batch_jobs(batch.id) == []
+        db.query(Job).filter(Job.id == first[0]["job_id"]).update({Job.status: "completed", Job.progress: 100.0})
+        db.query(Job).filter(Job.id == first[1]["job_id"]).update({Job.status: "failed"})
+        db.query(Job).filter(Job.id == first[2]["job_id"]).update({Job.status: "processing", Job.progress: 50.0})
+        db.commit()
+        second = batch_module.claim_batch_jobs(batch.id)
+        assert [job["url"] for job in second] == expansion["items"][4:6]
+        batch_module.release_batch_jobs([second[1]["job_id"]])
+
+        app = FastAPI()
+        app.include_router(batches.router)
+        app.dependency_overrides[get_db] = lambda: Session()
+        client = TestClient(app)
+        status = client.get(f"/api/v1/batches/{batch.id}").json()
+        assert status["status"] == "processing" and status["total_jobs"] == 120
+        assert status["counts"] == {"completed": 1, "failed": 1, "processing": 1, "pending": 117}
+        assert status["waiting"] == 115 and status["in_flight"] == 3 and status["max_in_flight"] == 4
+        assert status["progress"] == round(250.0 / 120, 2) and status["jobs"] is None
+        assert [source["title"] for source in status["sources"]] == ["Channel", "Channel - Videos"]
+        assert len(client.get(f"/api/v1/batches/{batch.id}?include_jobs=true").json()["jobs"]) == 120
+        assert client.get("/api/v1/batches/missing").status_code == 404
+
+        assert client.post(f"/api/v1/batches/{batch.id}/cancel").json()["cancelled"] == 115
+        assert batch_module.claim_batch_jobs(batch.id) == []
+        db.query(Job).filter(Job.batch_id == batch.id, Job.status != "failed").update({Job.status: "completed"})
+        db.commit()
+        assert client.get(f"/api/v1/batches/{batch.id}").json()["status"] == "completed_with_errors"
+        db.close()
+    finally:
+        batch_module.yt_dlp.YoutubeDL = original_ydl
+        batch_module.SessionLocal = original_session
+        shutil.rmtree(base)
+
+
+def test_progress_reporter_throttles_updates():
+    """Job rows are updated only after the interval and the step; the final position is always published"""
+    from types import SimpleNamespace
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.db.base import Base
+    from app.models.sql_models import Job
+    from app.services import progress
+
+    base = tempfile.mkdtemp()
+    original_session, original_time = progress.SessionLocal, progress.time
+    clock = SimpleNamespace(now=1000.0)
+    try:
+        engine = create_engine(f"sqlite:///{os.path.join(base, 'test.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        progress.SessionLocal = Session
+        progress.time = SimpleNamespace(monotonic=lambda: clock.now)
+        db = Session()
+        db.add_all([Job(id="job-p", status="processing"), Job(id="job-q", status="processing")])
+        db.commit()
+
+        def row(job_id):
+            db.expire_all()
+            job = db.get(Job, job_id)
+            return job.progress, job.bytes_processed, job.bytes_total
+
+        reporter = progress.ProgressReporter("job-p", 10.0, 30.0, 1000, interval_ms=500, min_step=5)
+        reporter.advance(10)
+        assert reporter.published == 0, "Below the minimum step"
+        reporter.advance(50)
+        assert reporter.published == 1 and row("job-p") == (11.2, 60, 1000)
+
+        clock.now += 0.1
+        reporter.advance(200)
+        assert reporter.published == 1, "Within the interval"
+        for _ in range(20):
+            clock.now += 1
+            reporter.advance(1)
+        assert reporter.published == 2 and row("job-p") == (15.22, 261, 1000)
+
+        clock.now += 1
+        reporter.update(900)
+        assert reporter.published == 3 and row("job-p") == (28.0, 900, 1000)
+        # The last bytes arrive within the interval; finishing publishes them regardless
+        reporter.advance(100)
+        reporter.finish()
+        assert reporter.published == 4 and row("job-p") == (30.0, 1000, 1000)
+
+        # Unknown size (e.g. a chunked download): the total is what was processed
+        unsized = progress.ProgressReporter("job-q", 5.0, 10.0, interval_ms=500, min_step=5)
+        clock.now += 1
+        unsized.advance(300)
+        assert unsized.published == 0
+        unsized.finish()
+        assert unsized.published == 1 and row("job-q") == (10.0, 300, 300)
+        db.close()
+    finally:
+        progress.SessionLocal, progress.time = original_session, original_time
+        shutil.rmtree(base)
+
+
+def test_upload_hashed_on_receipt():
+    """POST /jobs/upload: digests taken while writing match the stored file, and the pipeline reuses them"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from PIL import Image
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.api.v1.endpoints import jobs
+    from app.db.base import Base
+    from app.db.session import get_db
+    from app.models.sql_models import ChainOfCustody, Job
+    from app.pipelines import unified_pipeline, upload_pipeline
+    from app.services import progress
+    from app.services.storage import StorageService
+
+    base = tempfile.mkdtemp()
+    modules = (unified_pipeline, upload_pipeline, progress)
+    originals = ([module.SessionLocal for module in modules], settings.USE_CELERY, settings.LOCAL_STORAGE_PATH,
+                 StorageService.storage_type, UnifiedForensicPipeline.__dict__["_resolve_hashes"])
+    try:
+        engine = create_engine(f"sqlite:///{os.path.join(base, 'test.db')}",
+                               connect_args={"check_same_thread": False})
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        for module in modules:
+            module.SessionLocal = Session
+        settings.USE_CELERY = False
+        settings.LOCAL_STORAGE_PATH = os.path.join(base, "store")
+        StorageService.storage_type, StorageService._backend_key = "local", None
+
+        # Reading the file again for its digests is what the receipt avoids
+        sources = []
+        resolve_hashes = UnifiedForensicPipeline._resolve_hashes
+
+        def tracking(self, file_path, acquisition_receipt, job_id=None):
+            result = resolve_hashes(self, file_path, acquisition_receipt, job_id)
+            sources.append(result[-1])
+            return result
+
+        UnifiedForensicPipeline._resolve_hashes = tracking
+
+        app = FastAPI()
+        app.include_router(jobs.router)
+        app.dependency_overrides[get_db] = lambda: Session()
+        # Noise does not compress: a PNG of a few MiB, received over several chunks
+        image = io.BytesIO()
+        Image.frombytes("RGB", (1024, 1024), os.urandom(1024 * 1024 * 3)).save(image, "PNG")
+        payload = image.getvalue()
+        response = TestClient(app).post("/api/v1/jobs/upload", data={"investigator_id": "inv-1"},
+                                        files={"file": ("scene.png", payload, "image/png")})
+        assert response.status_code == 200, response.text
+        job_id = response.json()["job_id"]
+
+        db = Session()
+        job = db.get(Job, job_id)
+        assert job.status == "completed", job.notes
+        assert sources == ["acquisition_receipt"]
+        assert job.sha256_hash == hashlib.sha256(payload).hexdigest()
+        assert job.hashes["md5"] == hashlib.md5(payload).hexdigest()
+        received = db.query(ChainOfCustody).filter(ChainOfCustody.job_id == job_id,
+                                                   ChainOfCustody.event == "EVIDENCE_RECEIVED").one()
+        assert received.hash_verification == job.sha256_hash and received.details["file_size"] == len(payload)
+
+        path = asyncio.run(StorageService.local_path(job.storage_path, job.sha256_hash))
+        stored = Path(path).read_bytes()
+        assert hashlib.sha256(stored).hexdigest() == job.sha256_hash and hashlib.md5(stored).hexdigest() == job.hashes["md5"]
+        db.close()
+    finally:
+        for module, session_local in zip(modules, originals[0]):
+            module.SessionLocal = session_local
+        settings.USE_CELERY, settings.LOCAL_STORAGE_PATH = originals[1], originals[2]
+        StorageService.storage_type, StorageService._backend_key = originals[3], None
+        UnifiedForensicPipeline._resolve_hashes = originals[4]
+        shutil.rmtree(base)
+
+
+if __name__ == "__main__":
+    test_acquisition_manager_pools_and_cancellation()
+    test_downloader_reports_cancellation()
+    test_downloads_stream_into_workspace()
+    test_ranged_fetch_and_resume()
+    test_interrupted_acquisitions_resume()
+    test_batch_expansion_and_fan_out()
+    test_progress_reporter_throttles_updates()
+    test_upload_hashed_on_receipt()
+    print("✅ All acquisition tests passed!")
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+FEAS Hashing Engine Tests
+
+Covers the single-pass multi-digest engine, piecewise segment digests,
+the Merkle-tree evidence digest, the TLSH similarity digest and the
+perceptual hashes with their near-duplicate index (including eviction of
+deleted jobs), and known-file hash sets.
+
+Usage:
+    cd backend
+    python -m pytest tests/test_hashing.py -v
+"""
+
+import sys
+import os
+import hashlib
+import shutil
+import tempfile
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.services.hashing import HashService
+from app.services.merkle import MerkleBuilder, MerkleTree, verify_tree, verify_range
+from app.services.similarity import FuzzyHasher, SimilarityIndex, tlsh
+from app.services.perceptual import MultiIndexHash, hamming, image_hashes, np
+from app.services import hashsets
+
+
+def _write_sample(size: int) -> str:
+    handle = tempfile.NamedTemporaryFile(delete=False, suffix=".bin")
+    handle.write(os.urandom(size))
+    handle.close()
+    return handle.name
+
+
+def test_single_pass_digests_match_hashlib():
+    """Every digest from the shared read pass equals a standalone hashlib digest"""
+    path = _write_sample(3 * 1024 * 1024 + 17)
+    try:
+        data = Path(path).read_bytes()
+        hashes = HashService.compute_file_hashes(path, ["sha256", "md5", "sha1", "sha512"])
+        for algorithm, digest in hashes.items():
+            assert digest == hashlib.new(algorithm, data).hexdigest(), f"{algorithm} mismatch"
+        assert HashService.compute_file_hash(path) == hashes["sha256"]
+    finally:
+        os.unlink(path)
+
+
+def test_segments_locate_modified_range():
+    """Piecewise digests from the pass match the parallel ones and pinpoint a change"""
+    path = _write_sample(1_000_000)
+    try:
+        segments = HashService.digest_file(path, segment_size=300_000).segments()
+        assert segments == HashService.compute_segment_hashes(path, 300_000)
+        assert [s["length"] for s in segments] == [300_000, 300_000, 300_000, 100_000]
+
+        with open(path, "r+b") as f:
+            f.seek(650_000)
+            f.write(b"\x00" if f.read(1) != b"\x00" else b"\x01")
+
+        changed = HashService.verify_segments(path, segments)
+        assert [s["index"] for s in changed] == [2], "Only the third segment was modified"
+    finally:
+        os.unlink(path)
+
+
+def test_merkle_tree_range_proof():
+    """A stored tree round-trips and proves ranges intact or changed"""
+    path = _write_sample(700_000)
+    try:
+        builder = MerkleBuilder(65_536)
+        HashService.digest_file(path, consumers={"merkle": builder})
+        tree = MerkleTree.from_bytes(builder.tree().to_bytes())
+        assert len(tree.leaves) == 11
+
+        assert verify_tree(path, tree, tree.root_hex)["matches"]
+        assert verify_range(path, tree, 100_000, 100_100)["intact"]
+
+        with open(path, "r+b") as f:
+            f.seek(200_000)
+            f.write(b"\x00" if f.read(1) != b"\x00" else b"\x01")
+
+        result = verify_range(path, tree, 190_000, 210_000)
+        assert not result["intact"]
+        assert result["changed_ranges"] == [{"offset": 196_608, "length": 65_536}]
+        assert verify_range(path, tree, 0, 1000)["intact"], "Untouched leaves still prove intact"
+    finally:
+        os.unlink(path)
+
+
+def test_unusable_merkle_sidecar_is_a_conflict():
+    """Truncated sidecars are rejected as corrupt; those and a root mismatch give 409, not 500"""
+    import asyncio
+    from fastapi import HTTPException
+    from app.api.v1.endpoints import jobs
+    from app.models.sql_models import Job
+    from app.services.storage import StorageService
+
+    builder = MerkleBuilder(1024)
+    builder.update(os.urandom(10_000))
+    tree = builder.tree()
+    data = tree.to_bytes()
+    for truncated in (data[:10], data[:100]):
+        try:
+            MerkleTree.from_bytes(truncated)
+            assert False, "Truncated tree accepted"
+        except ValueError:
+            pass
+
+    original = StorageService.read_sidecar
+    try:
+        job = Job(id="job-merkle", merkle={"root": "00" * 32})
+        for sidecar in (data[:10], data):
+            async def read_sidecar(job_id, name, sidecar=sidecar):
+                return sidecar
+            StorageService.read_sidecar = staticmethod(read_sidecar)
+            try:
+                asyncio.run(jobs._load_merkle_tree(job))
+                assert False, "Unusable tree loaded"
+            except HTTPException as e:
+                assert e.status_code == 409
+        job.merkle = {"root": tree.root_hex}
+        assert asyncio.run(jobs._load_merkle_tree(job)).root_hex == job.merkle["root"]
+    finally:
+        StorageService.read_sidecar = original
+
+
+def test_fuzzy_hash_in_read_pass():
+    """TLSH from the shared pass equals a one-shot digest and a trimmed copy stays close"""
+    if tlsh is None:
+        return
+    words = [os.urandom(6).hex().encode() for _ in range(2000)]
+    data = b" ".join(words[i * 7919 % len(words)] for i in range(60_000))
+    path = _write_sample(0)
+    try:
+        Path(path).write_bytes(data)
+        hasher = FuzzyHasher()
+        HashService.digest_file(path, consumers={"fuzzy": hasher})
+        digest = hasher.hexdigest()
+        assert digest == tlsh.hash(data)
+
+        trimmed = tlsh.hash(data[4096:-4096])
+        assert SimilarityIndex.distance(digest, trimmed) < 50
+        shared = set(SimilarityIndex.band_keys(digest)) & set(SimilarityIndex.band_keys(trimmed))
+        assert shared, "A near-duplicate shares at least one index band"
+    finally:
+        os.unlink(path)
+
+
+def test_perceptual_hash_near_duplicates():
+    """A downscaled JPEG repost stays within a few bits and the index finds it"""
+    if np is None:
+        return
+    from PIL import Image, ImageFilter
+
+    def picture(seed):
+        noise = np.random.default_rng(seed).integers(0, 255, (60, 90, 3), dtype=np.uint8)
+        return Image.fromarray(noise).resize((900, 600), Image.BICUBIC).filter(ImageFilter.GaussianBlur(8))
+
+    paths = [tempfile.mktemp(suffix=suffix) for suffix in (".png", ".jpg", ".png")]
+    try:
+        picture(1).save(paths[0])
+        picture(1).resize((450, 300)).save(paths[1], quality=70)
+        picture(2).save(paths[2])
+        original, repost, other = [int(image_hashes(path)["phash"], 16) for path in paths]
+        assert hamming(original, repost) <= 6
+        assert hamming(original, other) > 20
+
+        index = MultiIndexHash()
+        rng = np.random.default_rng(0)
+        stored = [int(v) for v in rng.integers(0, 2 ** 63, 5000)] + [repost, other]
+        for i, value in enumerate(stored):
+            index.add(value, i)
+        found = sorted(index.search(original, 10))
+        expected = sorted((hamming(original, v), i) for i, v in enumerate(stored) if hamming(original, v) <= 10)
+        assert found == expected and (hamming(original, repost), 5000) in found
+    finally:
+        for path in paths:
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+def test_near_duplicates_skip_deleted_jobs():
+    """Hashes of a job deleted after indexing are evicted instead of being returned as matches"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.api.v1.endpoints import jobs
+    from app.db.base import Base
+    from app.db.session import get_db
+    from app.models.sql_models import Job, PerceptualHash
+    from app.services.perceptual import PerceptualIndex
+
+    directory = tempfile.mkdtemp()
+    original_index = jobs.perceptual_index
+    try:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'test.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        db = Session()
+        phashes = {"query": "0f0f0f0f0f0f0f0f", "repost": "0f0f0f0f0f0f0f0e",
+                   "deleted": "0f0f0f0f0f0f0f0c", "unrelated": "f0f0f0f0f0f0f0f0"}
+        for job_id, phash in phashes.items():
+            db.add(Job(id=job_id, status="completed", filename=f"{job_id}.jpg"))
+            db.add(PerceptualHash(job_id=job_id, frame_index=0, phash=phash))
+        db.commit()
+
+        jobs.perceptual_index = PerceptualIndex()
+        assert jobs.perceptual_index.refresh(db) == 4
+        db.query(PerceptualHash).filter(PerceptualHash.job_id == "deleted").delete()
+        db.query(Job).filter(Job.id == "deleted").delete()
+        db.commit()
+
+        app = FastAPI()
+        app.include_router(jobs.router)
+        app.dependency_overrides[get_db] = lambda: Session()
+        client = TestClient(app)
+        response = client.get("/api/v1/jobs/query/near-duplicates?max_distance=4")
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert [(m["job_id"], m["distance"], m["filename"]) for m in body["matches"]] == [("repost", 1, "repost.jpg")]
+        assert body["indexed_hashes"] == 3 and jobs.perceptual_index.size == 3
+        db.close()
+    finally:
+        jobs.perceptual_index = original_index
+        shutil.rmtree(directory)
+
+
+def test_known_file_hash_set():
+    """Sets built through spilled sorted runs answer membership exactly"""
+    directory = tempfile.mkdtemp()
+    source = os.path.join(directory, "known.csv")
+    digests = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(5000)]
+    with open(source, "w") as f:
+        f.write('"SHA-256","FileName"\n')
+        for i, digest in enumerate(digests + digests[:100]):
+            f.write(f'"{digest.upper()}","file{i}.dll"\n')
+
+    run_size, hashset_dir = hashsets.RUN_DIGESTS, settings.HASHSET_DIR
+    hashsets.RUN_DIGESTS = 1000
+    try:
+        result = hashsets.build_hash_set([source], "known", "good", "sha256", output_dir=directory)
+        assert result["count"] == 5000 and result["input_count"] == 5100
+
+        table = hashsets.HashSetTable(result["path"])
+        assert all(bytes.fromhex(digest) in table for digest in digests)
+        assert not any(hashlib.sha256(f"x{i}".encode()).digest() in table for i in range(5000))
+        table.close()
+
+        # A set installed by another process is seen on the next lookup, without a reload
+        settings.HASHSET_DIR = os.path.join(directory, "sets")
+        os.mkdir(settings.HASHSET_DIR)
+        assert hashsets.KnownFileFilter.lookup({"sha256": digests[0]})["status"] is None
+        shutil.copy(result["path"], settings.HASHSET_DIR)
+        assert hashsets.KnownFileFilter.lookup({"sha256": digests[0]})["status"] == "known_good"
+
+        # Reloading closes the mappings it replaces, explicitly or when the directory changes
+        installed = hashsets.KnownFileFilter.tables()[0]
+        hashsets.KnownFileFilter.reload()
+        assert installed._map.closed and installed._file.closed
+        reloaded = hashsets.KnownFileFilter.tables()[0]
+        assert reloaded is not installed and not reloaded._map.closed
+        os.unlink(os.path.join(settings.HASHSET_DIR, Path(result["path"]).name))
+        assert hashsets.KnownFileFilter.lookup({"sha256": digests[0]})["status"] is None
+        assert reloaded._map.closed and reloaded._file.closed
+    finally:
+        hashsets.RUN_DIGESTS = run_size
+        settings.HASHSET_DIR = hashset_dir
+        hashsets.KnownFileFilter._swap([], None)
+        hashsets.KnownFileFilter._tables = None
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    test_single_pass_digests_match_hashlib()
+    test_segments_locate_modified_range()
+    test_merkle_tree_range_proof()
+    test_unusable_merkle_sidecar_is_a_conflict()
+    test_fuzzy_hash_in_read_pass()
+    test_perceptual_hash_near_duplicates()
+    test_near_duplicates_skip_deleted_jobs()
+    test_known_file_hash_set()
+    print("✅ All hashing tests passed!")
@@ -44,6 +44,19 @@ def test_pdf_generation():
             "file_size": 15728640,  # 15 MB
             "mime_type": "video/mp4",
             "sha256_hash": "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855",
+            "hashes": {
+                "sha256": "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855",
+                "sha1": "da39a3ee5e6b4b0d3255bfef95601890afd80709",
+                "md5": "d41d8cd98f00b204e9800998ecf8427e",
+                "sha512": "cf83e1357eefb8bdf1542850d66d8007d620e4050b5715dc83f4a921d36ce9ce47d0d13c5d85f2b0ff8318d2877eec2f63b931bd47417a81a538327af927da3e"
+            },
+            "merkle": {
+                "root": "5f70bf18a086007016e948b04aed3b82103a36bea41755b6cddfaf10ace3c6ef",
+                "leaf_size": 1048576,
+                "leaf_count": 15
+            },
+            "known_file_status": "known_bad",
+            "known_file_sets": [{"set": "reference-bad", "status": "bad", "algorithm": "md5"}],
             "extraction_timestamp": datetime.utcnow(),
             "exif_data": {
                 "Duration": "00:02:30",
@@ -0,0 +1,635 @@
+#!/usr/bin/env python3
+"""
+FEAS Evidence Storage Tests
+
+Covers the content-addressed local blob store: deduplication by SHA-256,
+link-count reference counting, garbage collection, the job manifest and fsck, metadata sidecars, the zero-copy
+commit strategies, seekable compression at rest, the S3 backend behind the storage registry
+(against moto's in-process S3), the read-through cache in front of it, and the
+ranged evidence download endpoint.
+
+Usage:
+    cd backend
+    python -m pytest tests/test_storage.py -v
+"""
+
+import sys
+import os
+import asyncio
+import hashlib
+import json
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.services.storage import StorageService
+from app.services.compression import SeekableZstdReader, compress_file, open_evidence, zstandard
+from app.services.hashing import HashService, iter_file_blocks
+from app.storage.local_storage import LocalStorage, commit_file
+from app.storage import s3_storage, cache as evidence_cache
+from app.storage.cache import CacheFillMismatch, EvidenceCache
+
+try:
+    from moto import mock_aws
+except ImportError:  # optional test dependency
+    mock_aws = None
+
+
+def _write_sample(directory: str, name: str, size: int) -> str:
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+    return path
+
+
+def _collect(listing) -> list:
+    async def drain():
+        return [item async for item in listing]
+    return asyncio.run(drain())
+
+
+def test_local_blob_store_deduplicates_and_collects():
+    base = tempfile.mkdtemp()
+    try:
+        storage = LocalStorage(os.path.join(base, "store"))
+        source = _write_sample(base, "evidence.bin", 256 * 1024)
+        copy = shutil.copy(source, os.path.join(base, "again.bin"))
+        metadata = {"basic": {"file_name": "evidence.bin"}}
+
+        first = asyncio.run(storage.store(source, "job-1", metadata))
+        second = asyncio.run(storage.store(copy, "job-2", metadata))
+        assert not first["deduplicated"]
+        assert second["deduplicated"], "Identical content should reuse the blob"
+        assert first["blob_path"] == second["blob_path"]
+        assert storage.refcount(Path(second["blob_path"])) == 2
+
+        listed = asyncio.run(storage.list_jobs())
+        assert [job["job_id"] for job in listed] == ["job-1", "job-2"]
+        assert all(job["file_count"] == 1 for job in listed), "Metadata counted as evidence"
+        assert [job["job_id"] for job in _collect(storage.iter_jobs(listed[0]["cursor"]))] == ["job-2"]
+
+        retrieved = asyncio.run(storage.retrieve("job-2"))
+        assert Path(retrieved["file_path"]).read_bytes() == Path(source).read_bytes()
+
+        # Still referenced: nothing to collect even without a grace period
+        assert storage.collect_garbage(grace_seconds=0)["removed"] == 0
+        asyncio.run(storage.delete("job-1"))
+        asyncio.run(storage.delete("job-2"))
+        assert storage.collect_garbage(grace_seconds=3600)["removed"] == 0, "Grace period not honoured"
+        assert storage.collect_garbage(grace_seconds=0)["removed"] == 1
+        assert not Path(first["blob_path"]).exists()
+    finally:
+        shutil.rmtree(base)
+
+
+def test_local_manifest_and_fsck():
+    """Sharded job directories, manifest lookups, legacy layout indexing and fsck repair"""
+    base = tempfile.mkdtemp()
+    try:
+        root = os.path.join(base, "store")
+        # A job directory from the flat layout, with two evidence files and no manifest yet
+        legacy = Path(root) / "job-legacy"
+        legacy.mkdir(parents=True)
+        (legacy / "b.bin").write_bytes(b"second")
+        (legacy / "a.bin").write_bytes(b"first")
+
+        storage = LocalStorage(root)
+        assert storage.manifest.count() == 1, "Existing volume not indexed on first open"
+        legacy_entry = asyncio.run(storage.retrieve("job-legacy"))
+        assert Path(legacy_entry["file_path"]).name == "a.bin", "Evidence choice is not deterministic"
+
+        metadata = {"basic": {"file_name": "evidence.bin"}}
+        for job_id in ("job-1", "job-2"):
+            stored = asyncio.run(storage.store(_write_sample(base, f"{job_id}.bin", 4096), job_id, metadata))
+            assert Path(stored["job_dir"]) == storage.job_dir(job_id)
+        assert storage.job_dir("job-1").parent.parent.parent == storage.job_root
+        assert [job["job_id"] for job in _collect(storage.iter_jobs())] == ["job-1", "job-2", "job-legacy"]
+        assert storage.manifest.get("job-1")["blob_path"].startswith("blobs/")
+
+        clean = storage.fsck()
+        assert clean["scanned"] == 3 and clean["unindexed"]["count"] == 0
+        assert clean["missing_on_disk"]["count"] == 0 and clean["changed"]["count"] == 0
+
+        # Index out of step with the disk: one row lost, one directory removed behind its back
+        evidence = Path(asyncio.run(storage.retrieve("job-1"))["file_path"])
+        os.chmod(evidence, 0o644)
+        with open(evidence, "r+b") as f:
+            f.write(b"tampered")
+        storage.manifest.delete("job-1")
+        shutil.rmtree(storage.job_dir("job-2"))
+        report = storage.fsck(verify=True, workers=4)
+        assert report["unindexed"]["job_ids"] == ["job-1"]
+        assert report["missing_on_disk"]["job_ids"] == ["job-2"]
+        assert report["corrupt"]["job_ids"] == ["job-1"], "Legacy job without a digest is not corrupt"
+        assert storage.fsck(repair=True)["repaired"]
+        assert [job["job_id"] for job in asyncio.run(storage.list_jobs())] == ["job-1", "job-legacy"]
+        assert asyncio.run(storage.retrieve("job-2")) is None
+        assert asyncio.run(storage.delete("job-1")) and storage.manifest.get("job-1") is None
+    finally:
+        shutil.rmtree(base)
+
+
+def test_metadata_sidecar():
+    """Sectioned sidecars round-trip in every codec, load lazily, compress large sections, write atomically"""
+    from app.storage import sidecar
+
+    base = tempfile.mkdtemp()
+    try:
+        metadata = {
+            "basic": {"file_name": "clip.mp4", "mime_type": "video/mp4"},
+            "processing_info": {"sha256_hash": "ab" * 32, "acquired": "2024-01-01T00:00:00"},
+            "ffprobe": {"streams": [{"index": i, "codec": "h264", "tags": {"handler": "VideoHandler"}}
+                                    for i in range(2000)]},
+            "storage": {"file_name": "x.mp4", "sha256": "ab" * 32, "compression": None}
+        }
+        pretty = len(json.dumps(metadata, indent=2).encode())
+        for codec in ("json", "orjson", "msgpack"):
+            path = Path(base) / f"{codec}.sidecar"
+            size = sidecar.write_sidecar(path, metadata, codec=codec)
+            assert size < pretty / 4, f"{codec} sidecar not compact ({size} vs {pretty} bytes)"
+            assert sidecar.read_sidecar(path) == metadata
+            with sidecar.SidecarReader(path) as reader:
+                assert reader.sections() == list(metadata)
+                assert reader.get("storage") == metadata["storage"]
+                assert "ffprobe" not in reader._cache, "Unrequested section was decoded"
+                assert reader._index["ffprobe"][2] and not reader._index["storage"][2]
+            assert sidecar.read_sidecar(path.read_bytes(), ["basic"]) == {"basic": metadata["basic"]}
+
+        # Plain JSON metadata from before the format is still read
+        legacy = Path(base) / "metadata.json"
+        legacy.write_text(json.dumps(metadata, indent=2))
+        assert sidecar.read_sidecar(legacy, ["storage"]) == {"storage": metadata["storage"]}
+
+        # A failed replace leaves the previous sidecar and no temp file behind
+        target = Path(base) / "orjson.sidecar"
+        before = target.read_bytes()
+        original_replace = os.replace
+        os.replace = lambda *args: (_ for _ in ()).throw(OSError("disk gone"))
+        try:
+            sidecar.write_sidecar(target, {"basic": {}})
+            assert False, "Failed write reported success"
+        except OSError:
+            pass
+        finally:
+            os.replace = original_replace
+        assert target.read_bytes() == before
+        assert not [f for f in os.listdir(base) if f.endswith(".tmp")]
+
+        # Stored jobs get a sidecar, and stray temp files are never taken for evidence
+        storage = LocalStorage(os.path.join(base, "store"))
+        source = _write_sample(base, "e.bin", 1024)
+        metadata["processing_info"]["sha256_hash"] = hashlib.sha256(Path(source).read_bytes()).hexdigest()
+        stored = asyncio.run(storage.store(source, "job-1", metadata))
+        job_dir = Path(stored["job_dir"])
+        assert (job_dir / "metadata.sidecar").exists() and not (job_dir / "metadata.json").exists()
+        (job_dir / ".metadata.sidecar.dead.tmp").write_bytes(b"partial")
+        assert storage._scan_job("job-1", job_dir)["file_count"] == 1
+        assert asyncio.run(storage.retrieve("job-1"))["metadata"]["ffprobe"] == metadata["ffprobe"]
+    finally:
+        shutil.rmtree(base)
+
+
+def test_commit_file_strategies():
+    base = tempfile.mkdtemp()
+    try:
+        source = _write_sample(base, "upload.bin", 3 * 1024 * 1024 + 17)
+        data = Path(source).read_bytes()
+        sha256 = hashlib.sha256(data).hexdigest()
+        reported = []
+
+        copied = commit_file(Path(source), Path(base, "copy.bin"), sha256, progress_callback=reported.append)
+        assert copied["strategy"] in ("reflink", "copy_file_range", "sendfile", "buffered")
+        assert copied["verified"] and copied["sha256"] == sha256
+        assert sum(reported) == len(data)
+        assert Path(base, "copy.bin").read_bytes() == data
+
+        moved = commit_file(Path(source), Path(base, "moved.bin"), sha256, move=True)
+        assert moved["strategy"] == "rename", "Same-filesystem commit should be a rename"
+        assert not os.path.exists(source)
+
+        try:
+            commit_file(Path(base, "moved.bin"), Path(base, "bad.bin"), "0" * 64)
+            assert False, "Hash mismatch not detected"
+        except IOError:
+            assert not Path(base, "bad.bin").exists()
+    finally:
+        shutil.rmtree(base)
+
+
+def _write_compressible(directory: str, name: str, size: int) -> str:
+    """Log-like text: compresses well, but not trivially"""
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        line = 0
+        while f.tell() < size:
+            f.write(f"{line:08d} event={line * 7919 % 1000} user={os.urandom(3).hex()}\n".encode())
+            line += 1
+    return path
+
+
+def test_seekable_compression_at_rest():
+    if zstandard is None:
+        print("zstandard not installed; skipping compression test")
+        return
+    base = tempfile.mkdtemp()
+    try:
+        source = _write_compressible(base, "system.log", 3 * 1024 * 1024 + 123)
+        data = Path(source).read_bytes()
+        sha256 = hashlib.sha256(data).hexdigest()
+
+        storage = LocalStorage(os.path.join(base, "store"))
+        compressed_path = os.path.join(base, "store", "system.log.zst")
+        result = compress_file(source, compressed_path)
+        assert result["sha256"] == sha256 and result["size"] == len(data)
+        assert result["stored_size"] < len(data) / 2 and result["frames"] == 4
+
+        # Random access across a frame boundary only touches the frames it needs
+        with open_evidence(compressed_path) as f:
+            f.seek(1024 * 1024 - 10)
+            assert f.read(20) == data[1024 * 1024 - 10:1024 * 1024 + 10]
+        blocks = b"".join(bytes(b) for b in iter_file_blocks(compressed_path, 65536,
+                                                            offset=5000, length=2 * 1024 * 1024))
+        assert blocks == data[5000:5000 + 2 * 1024 * 1024]
+
+        # Acquisition inputs named *.zst are read as they are, whatever they contain
+        for name in ("upload_report.zst", os.path.join("store", "temp_uploads", "tmp_archive.zst")):
+            os.makedirs(os.path.dirname(os.path.join(base, name)), exist_ok=True)
+            plain = os.path.join(base, name)
+            shutil.copy(compressed_path if "archive" in name else source, plain)
+            raw = Path(plain).read_bytes()
+            assert HashService.compute_file_hash(plain) == hashlib.sha256(raw).hexdigest()
+        shutil.copy(source, compressed_path)
+        assert HashService.compute_file_hash(compressed_path) == sha256, "No seek table: read as it is"
+        os.unlink(compressed_path)
+
+        metadata = {"basic": {"file_name": "system.log", "mime_type": "text/plain"},
+                    "processing_info": {"sha256_hash": sha256}}
+        stored = asyncio.run(storage.store(source, "job-log", metadata, move=True))
+        assert stored["compression"] == "zstd-seekable" and stored["commit_strategy"] == "zstd"
+        assert stored["size"] == len(data) and stored["stored_size"] < len(data) / 2
+        assert HashService.compute_file_hash(stored["path"]) == sha256, "Digest must cover the original bytes"
+        assert not os.path.exists(source)
+
+        # Already-compressed formats are stored as they are
+        photo = _write_compressible(base, "photo.jpg", 256 * 1024)
+        metadata["basic"] = {"file_name": "photo.jpg", "mime_type": "image/jpeg"}
+        metadata["processing_info"]["sha256_hash"] = HashService.compute_file_hash(photo)
+        assert asyncio.run(storage.store(photo, "job-jpg", metadata))["compression"] is None
+
+        # Raw evidence never takes the compressed suffix, even when its own name ends in .zst
+        archive = os.path.join(base, "store", "temp_uploads", "tmp_archive.zst")
+        metadata["basic"] = {"file_name": "archive.zst", "mime_type": "application/zstd"}
+        metadata["processing_info"]["sha256_hash"] = HashService.compute_file_hash(archive)
+        raw_stored = asyncio.run(storage.store(archive, "job-zst", metadata))
+        assert raw_stored["compression"] is None and raw_stored["path"].endswith(".zst.raw")
+        assert HashService.compute_file_hash(raw_stored["path"]) == metadata["processing_info"]["sha256_hash"]
+    finally:
+        shutil.rmtree(base)
+
+
+def test_s3_backend_through_registry():
+    """Put and multipart uploads, sidecars, retrieval and deletion through StorageService"""
+    if mock_aws is None:
+        print("moto not installed; skipping S3 test")
+        return
+    base = tempfile.mkdtemp()
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    original_type, original_endpoint = StorageService.storage_type, settings.S3_ENDPOINT
+    original_part_size = settings.S3_MULTIPART_PART_SIZE
+    try:
+        with mock_aws():
+            settings.S3_ENDPOINT = None
+            s3_storage.reset_pool()
+            StorageService.storage_type, StorageService._backend_key = "s3", None
+            assert isinstance(StorageService.backend(), s3_storage.S3Storage)
+
+            source = _write_sample(base, "clip.mp4", 512 * 1024)
+            data = Path(source).read_bytes()
+            threads = set()
+            metadata = {"basic": {"file_name": "clip.mp4"},
+                        "processing_info": {"sha256_hash": hashlib.sha256(data).hexdigest()}}
+
+            stored = asyncio.run(StorageService.store_evidence(
+                source, "job-s3", metadata, sidecars={"merkle.tree": b"tree"}, move=True,
+                progress_callback=lambda n: threads.add(threading.current_thread().name)))
+            assert stored["size"] == len(data)
+            assert not os.path.exists(source), "move=True should consume the source"
+            assert threads and "MainThread" not in threads, "SDK call ran on the event loop"
+
+            retrieved = asyncio.run(StorageService.retrieve("job-s3"))
+            assert retrieved["s3_key"] == stored["path"], "Sidecar mistaken for the evidence object"
+            assert asyncio.run(StorageService.read_sidecar("job-s3", "merkle.tree")) == b"tree"
+            assert asyncio.run(StorageService.read_sidecar("job-s3", "missing")) is None
+            assert [job["job_id"] for job in asyncio.run(StorageService.list_jobs())] == ["job-s3"]
+            assert asyncio.run(StorageService.check_health())["status"] == "healthy"
+            assert asyncio.run(StorageService.delete("job-s3"))
+            assert asyncio.run(StorageService.retrieve("job-s3")) is None
+
+            # Multipart: 11 MiB in 5 MiB parts, checked against the part checksums
+            settings.S3_MULTIPART_PART_SIZE = s3_storage.MIN_PART_SIZE
+            large = _write_sample(base, "large.avi", 11 * 1024 * 1024)
+            data = Path(large).read_bytes()
+            metadata["processing_info"]["sha256_hash"] = hashlib.sha256(data).hexdigest()
+            uploaded = []
+            stored = asyncio.run(StorageService.store_evidence(large, "job-mp", metadata,
+                                                               progress_callback=uploaded.append))
+            assert stored["commit_strategy"] == "multipart" and stored["parts"] == 3
+            assert stored["copy_verified"] and sum(uploaded) == len(data)
+            client = s3_storage.get_client()
+            body = client.get_object(Bucket=settings.S3_BUCKET_NAME, Key=stored["path"])["Body"].read()
+            assert body == data
+
+            if zstandard is not None:
+                log = _write_compressible(base, "app.log", 2 * 1024 * 1024)
+                log_data = Path(log).read_bytes()
+                log_metadata = {"basic": {"file_name": "app.log", "mime_type": "text/plain"},
+                                "processing_info": {"sha256_hash": hashlib.sha256(log_data).hexdigest()}}
+                stored = asyncio.run(StorageService.store_evidence(log, "job-log", log_metadata))
+                assert stored["path"].endswith(".zst") and stored["stored_size"] < len(log_data) / 2
+                assert stored["size"] == len(log_data) and stored["copy_verified"]
+                asyncio.run(StorageService.delete("job-log"))
+
+            # Evidence that does not hash to the recorded digest is never completed
+            metadata["processing_info"]["sha256_hash"] = "0" * 64
+            try:
+                asyncio.run(StorageService.store_evidence(large, "job-bad", metadata))
+                assert False, "Hash mismatch not detected"
+            except IOError:
+                pass
+            assert "Contents" not in client.list_objects_v2(Bucket=settings.S3_BUCKET_NAME, Prefix="job-bad/")
+            assert not client.list_multipart_uploads(Bucket=settings.S3_BUCKET_NAME).get("Uploads")
+
+            # Listing: small pages that split jobs across page boundaries, walked with the API cursor
+            for i in range(25):
+                for name in ("metadata.json", "merkle.tree", f"{i:04x}.bin"):
+                    client.put_object(Bucket=settings.S3_BUCKET_NAME, Key=f"job-{i:03d}/{name}", Body=b"x")
+            s3_storage.LIST_PAGE_SIZE = 7
+            listed, cursor = [], None
+            while True:
+                page = asyncio.run(StorageService.list_jobs_page(cursor, limit=10))
+                listed.extend(page["jobs"])
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+            listed_ids = [job["job_id"] for job in listed]
+            assert listed_ids == sorted({*(f"job-{i:03d}" for i in range(25)), "job-mp"})
+            assert all(job["file_count"] == 1 for job in listed), "Sidecars counted as evidence"
+    finally:
+        s3_storage.LIST_PAGE_SIZE = 1000
+        StorageService.storage_type, settings.S3_ENDPOINT = original_type, original_endpoint
+        settings.S3_MULTIPART_PART_SIZE = original_part_size
+        s3_storage.reset_pool()
+        shutil.rmtree(base)
+
+
+def test_s3_read_through_cache():
+    """Cold reads fetch once, hits avoid the bucket, tampered fills are rejected, LRU eviction"""
+    if mock_aws is None:
+        print("moto not installed; skipping S3 cache test")
+        return
+    base = tempfile.mkdtemp()
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    original_type, original_endpoint = StorageService.storage_type, settings.S3_ENDPOINT
+    original_cache_dir = settings.S3_CACHE_DIR
+    try:
+        with mock_aws():
+            settings.S3_ENDPOINT = None
+            settings.S3_CACHE_DIR = os.path.join(base, "cache")
+            s3_storage.reset_pool()
+            evidence_cache._cache = None
+            StorageService.storage_type, StorageService._backend_key = "s3", None
+            backend = StorageService.backend()
+
+            data = Path(_write_sample(base, "clip.mp4", 256 * 1024)).read_bytes()
+            sha256 = hashlib.sha256(data).hexdigest()
+            keys = {}
+            for job_id in ("job-a", "job-b"):
+                source = os.path.join(base, f"{job_id}.mp4")
+                Path(source).write_bytes(data)
+                metadata = {"basic": {"file_name": "clip.mp4"}, "processing_info": {"sha256_hash": sha256}}
+                keys[job_id] = asyncio.run(StorageService.store_evidence(source, job_id, metadata))["path"]
+            key_a = keys["job-a"]
+
+            # Concurrent cold reads of the same content collapse into one download
+            paths = []
+            workers = [threading.Thread(target=lambda: paths.append(backend._local_path(key_a, sha256)))
+                       for _ in range(4)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            assert len(set(paths)) == 1 and Path(paths[0]).read_bytes() == data
+            stats = StorageService.cache_stats()
+            assert stats["misses"] == 1 and stats["hits"] == 3 and stats["bytes_fetched"] == len(data)
+
+            # Another job with the same hash, through retrieve, is a hit
+            retrieved = asyncio.run(StorageService.retrieve("job-b", local_copy=True))
+            assert retrieved["file_path"] == paths[0]
+            assert asyncio.run(StorageService.retrieve("job-b"))["s3_key"] and StorageService.cache_stats()["misses"] == 1
+
+            # A fetched object that does not match its hash never enters the cache
+            client = s3_storage.get_client()
+            client.put_object(Bucket=settings.S3_BUCKET_NAME, Key="job-c/clip.mp4", Body=b"tampered")
+            try:
+                asyncio.run(StorageService.local_path("job-c/clip.mp4", "0" * 64))
+                assert False, "Mismatched fill was published"
+            except CacheFillMismatch as e:
+                assert e.path.read_bytes() == b"tampered"
+            assert not evidence_cache.get_cache().entry_path("0" * 64).exists()
+            assert StorageService.cache_stats()["fill_errors"] == 1
+
+            # Evidence delivery: cached objects are served locally, others as ranged GETs or presigned URLs
+            assert asyncio.run(StorageService.evidence_source(key_a, sha256))["path"] == paths[0]
+            uncached = asyncio.run(StorageService.evidence_source("job-c/clip.mp4", "1" * 64))
+            assert uncached == {"key": "job-c/clip.mp4", "size": len(b"tampered")}
+            assert b"".join(_collect(StorageService.iter_range(key_a, 10, 19))) == data[10:20]
+            url = StorageService.presigned_url(key_a, "clip.mp4", "video/mp4")
+            assert "Signature=" in url and "response-content-type=video%2Fmp4" in url
+
+        # Least recently used entries go first once the cache is over its limit
+        lru = EvidenceCache(os.path.join(base, "lru"), max_bytes=250)
+        blobs = {name: name.encode() * 100 for name in "abc"}
+        keys = {name: hashlib.sha256(blob).hexdigest() for name, blob in blobs.items()}
+        for index, name in enumerate("abc"):
+            lru.get(keys[name], lambda path, blob=blobs[name]: path.write_bytes(blob))
+            os.utime(lru.entry_path(keys[name]), (index, index))
+            if name == "b":
+                lru.get(keys["a"], None)  # touch a, so b is now the oldest
+        assert lru.stats()["evictions"] == 1
+        assert lru.entry_path(keys["a"]).exists() and lru.entry_path(keys["c"]).exists()
+        assert not lru.entry_path(keys["b"]).exists()
+    finally:
+        StorageService.storage_type, settings.S3_ENDPOINT = original_type, original_endpoint
+        settings.S3_CACHE_DIR = original_cache_dir
+        evidence_cache._cache = None
+        s3_storage.reset_pool()
+        shutil.rmtree(base)
+
+
+def test_evidence_range_delivery():
+    """GET /jobs/{id}/evidence: ranges, ETag revalidation, compressed evidence, buffered custody entries"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.api.v1.endpoints import jobs
+    from app.db.base import Base
+    from app.db.session import get_db
+    from app.models.sql_models import Job, ChainOfCustody
+    from app.services.custody_buffer import custody_buffer
+    from app.services.evidence_delivery import RangeNotSatisfiable, parse_range
+
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=990-5000", 1000) == (990, 999)
+    assert parse_range("bytes=0-1,5-9", 1000) is None, "Multi-range should fall back to the whole file"
+    assert parse_range("items=0-1", 1000) is None and parse_range("bytes=9-3", 1000) is None
+    try:
+        parse_range("bytes=1000-", 1000)
+        assert False, "Range past the end accepted"
+    except RangeNotSatisfiable:
+        pass
+
+    base = tempfile.mkdtemp()
+    original_type, original_factory = StorageService.storage_type, custody_buffer.session_factory
+    original_local_path = settings.LOCAL_STORAGE_PATH
+    try:
+        engine = create_engine(f"sqlite:///{os.path.join(base, 'test.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        custody_buffer.session_factory = Session
+        custody_buffer.flush_seconds = 3600  # flushed explicitly below
+        StorageService.storage_type, StorageService._backend_key = "local", None
+        settings.LOCAL_STORAGE_PATH = os.path.join(base, "store")
+
+        db = Session()
+        sources = {"raw": (_write_sample(base, "clip.mp4", 3 * 1024 * 1024 + 17), "video/mp4")}
+        if zstandard is not None:
+            sources["zst"] = (_write_compressible(base, "capture.log", 3 * 1024 * 1024), "text/plain")
+        expected = {}
+        for job_id, (source, mime_type) in sources.items():
+            data = Path(source).read_bytes()
+            sha256 = hashlib.sha256(data).hexdigest()
+            stored = asyncio.run(StorageService.store_evidence(
+                source, job_id, {"basic": {"file_name": Path(source).name, "mime_type": mime_type},
+                                 "processing_info": {"sha256_hash": sha256}}))
+            db.add(Job(id=job_id, status="completed", filename=Path(source).name, mime_type=mime_type,
+                       sha256_hash=sha256, storage_path=stored["path"], investigator_id="inv-1"))
+            expected[job_id] = data
+        db.commit()
+        assert ("zst" not in sources) or db.get(Job, "zst").storage_path.endswith(".zst")
+
+        app = FastAPI()
+        app.include_router(jobs.router)
+        app.dependency_overrides[get_db] = lambda: Session()
+        client = TestClient(app)
+
+        for job_id, data in expected.items():
+            url = f"/api/v1/jobs/{job_id}/evidence?investigator_id=reviewer"
+            full = client.get(url)
+            assert full.status_code == 200 and full.content == data
+            etag = full.headers["etag"]
+            assert etag == f'"{hashlib.sha256(data).hexdigest()}"' and full.headers["accept-ranges"] == "bytes"
+
+            # Seeking far into the file reads only the requested bytes
+            middle = client.get(url, headers={"Range": "bytes=2000000-2100000"})
+            assert middle.status_code == 206 and middle.content == data[2000000:2100001]
+            assert middle.headers["content-range"] == f"bytes 2000000-2100000/{len(data)}"
+            tail = client.get(url, headers={"Range": "bytes=-10"})
+            assert tail.status_code == 206 and tail.content == data[-10:]
+
+            assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+            stale = client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+            assert stale.status_code == 200 and len(stale.content) == len(data)
+            unsatisfiable = client.get(url, headers={"Range": f"bytes={len(data)}-"})
+            assert unsatisfiable.status_code == 416
+            assert unsatisfiable.headers["content-range"] == f"bytes */{len(data)}"
+            assert client.head(url).headers["content-length"] == str(len(data))
+
+        # Every range request is buffered; one flush writes one merged entry per job and client
+        assert custody_buffer.flush() == len(expected)
+        entries = db.query(ChainOfCustody).filter(ChainOfCustody.event == "EVIDENCE_ACCESSED").all()
+        raw = next(entry for entry in entries if entry.job_id == "raw")
+        assert raw.investigator_id == "reviewer" and raw.details["requests"] == 4, "304/416/HEAD logged as access"
+        assert raw.details["bytes_served"] == 2 * len(expected["raw"]) + 100001 + 10
+        assert [2000000, 2100000] in raw.details["ranges"]
+        assert custody_buffer.flush() == 0
+
+        # Every access names its investigator; no anonymous custody entries
+        assert client.get("/api/v1/jobs/raw/evidence").status_code == 422
+        # Quotes and non-Latin-1 names go in the RFC 5987 form behind an ASCII fallback
+        db.get(Job, "raw").filename = 'pièce "n°1" 证据.mp4'
+        db.commit()
+        disposition = client.head("/api/v1/jobs/raw/evidence?investigator_id=reviewer").headers["content-disposition"]
+        assert disposition == ('inline; filename="pi_ce _n_1_ __.mp4"; '
+                               "filename*=utf-8''pi%C3%A8ce%20%22n%C2%B01%22%20%E8%AF%81%E6%8D%AE.mp4")
+        db.close()
+    finally:
+        custody_buffer.session_factory = original_factory
+        custody_buffer.flush_seconds = settings.CUSTODY_ACCESS_FLUSH_SECONDS
+        StorageService.storage_type, StorageService._backend_key = original_type, None
+        settings.LOCAL_STORAGE_PATH = original_local_path
+        shutil.rmtree(base)
+
+
+def test_custody_buffer_keeps_failed_flush():
+    """Entries of a failed flush are merged with same-key accesses recorded meanwhile, not dropped"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.db.base import Base
+    from app.models.sql_models import ChainOfCustody
+    from app.services.custody_buffer import CustodyBuffer
+
+    base = tempfile.mkdtemp()
+    try:
+        engine = create_engine(f"sqlite:///{os.path.join(base, 'test.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        failures = []
+
+        def session_factory():
+            db = Session()
+            if not failures:
+                def commit():
+                    # Another range request arrives while the insert is failing
+                    failures.append(True)
+                    buffer.record_access("job-1", "inv-1", "10.0.0.1", "range", 100, 199, "ab" * 32)
+                    raise RuntimeError("database unavailable")
+                db.commit = commit
+            return db
+
+        buffer = CustodyBuffer(flush_seconds=3600, session_factory=session_factory)
+        buffer.record_access("job-1", "inv-1", "10.0.0.1", "range", 0, 99, "ab" * 32)
+        buffer.record_access("job-1", "inv-1", "10.0.0.1", "range", 0, 9, "ab" * 32)
+        assert buffer.flush() == 0 and failures
+
+        assert buffer.flush() == 1
+        db = Session()
+        entry = db.query(ChainOfCustody).filter(ChainOfCustody.event == "EVIDENCE_ACCESSED").one()
+        assert entry.details["requests"] == 3 and entry.details["bytes_served"] == 100 + 10 + 100
+        assert entry.details["ranges"] == [[0, 99], [0, 9], [100, 199]]
+        assert entry.details["first_access"] <= entry.details["last_access"]
+        db.close()
+    finally:
+        shutil.rmtree(base)
+
+
+if __name__ == "__main__":
+    test_local_blob_store_deduplicates_and_collects()
+    test_local_manifest_and_fsck()
+    test_metadata_sidecar()
+    test_commit_file_strategies()
+    test_seekable_compression_at_rest()
+    test_s3_backend_through_registry()
+    test_s3_read_through_cache()
+    test_evidence_range_delivery()
+    test_custody_buffer_keeps_failed_flush()
+    print("✅ All storage tests passed!")
@@ -454,6 +454,13 @@ const RefreshStatus = styled.div`
   gap: 0.5rem;
 `;
 
+const formatBytes = (bytes) => {
+  if (bytes >= 1024 * 1024 * 1024) return `${(bytes / (1024 * 1024 * 1024)).toFixed(2)} GB`;
+  if (bytes >= 1024 * 1024) return `${(bytes / (1024 * 1024)).toFixed(1)} MB`;
+  if (bytes >= 1024) return `${(bytes / 1024).toFixed(1)} KB`;
+  return `${bytes} B`;
+};
+
 const JobMonitorTable = () => {
   const [filter, setFilter] = useState('all');
   const [autoRefresh, setAutoRefresh] = useState(true);
@@ -538,7 +545,19 @@ const JobMonitorTable = () => {
                     <span style={{ textTransform: 'uppercase', fontSize: '0.75rem', fontWeight: 'bold' }}>{job.status}</span>
                   </div>
                 </TableCell>
-                <TableCell>{Math.round(job.progress)}%</TableCell>
+                <TableCell>
+                  <div style={{ fontSize: '0.75rem' }}>
+                    {Math.round(job.progress)}%{job.status === 'processing' && job.stage ? ` · ${job.stage}` : ''}
+                  </div>
+                  <ProgressBar>
+                    <ProgressFill progress={job.progress} />
+                  </ProgressBar>
+                  {job.status === 'processing' && job.bytes_total > 0 && job.bytes_processed < job.bytes_total && (
+                    <div style={{ fontSize: '0.7rem', color: '#9ca3af', fontFamily: 'monospace', marginTop: '0.25rem' }}>
+                      {formatBytes(job.bytes_processed)} / {formatBytes(job.bytes_total)}
+                    </div>
+                  )}
+                </TableCell>
                 <TableCell>{formatDistanceToNow(new Date(job.created_at), { addSuffix: true })}</TableCell>
                 <TableCell>
                   <div style={{ display: 'flex', gap: '0.5rem' }}>
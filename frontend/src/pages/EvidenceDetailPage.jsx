@@ -9,8 +9,10 @@ import {
 import { format } from 'date-fns';
 import SHA256Display from '../components/evidence/SHA256Display';
 import VerifyIntegrityButton from '../components/evidence/VerifyIntegrityButton';
+import MediaPreview from '../components/evidence/MediaPreview';
 import LoadingSpinner from '../components/common/LoadingSpinner';
 import { forensicAPI } from '../services/api';
+import { useAuthStore } from '../store/authStore';
 
 /* ---- Styled Components ---- */
 
@@ -150,6 +152,7 @@ const DownloadButton = styled.button`
 
 const EvidenceDetailPage = () => {
   const { jobId } = useParams();
+  const user = useAuthStore((state) => state.user);
   const [isDownloading, setIsDownloading] = useState(false);
 
   const { data: job, isLoading, error } = useQuery(
@@ -219,6 +222,15 @@ const EvidenceDetailPage = () => {
       {/* SHA256 Hash Display */}
       <SHA256Display hash={job.metadata?.sha256_hash} jobId={job.job_id} />
 
+      {/* Evidence Preview */}
+      {job.status === 'completed' && (
+        <MediaPreview
+          fileUrl={forensicAPI.getEvidenceUrl(job.job_id, user?.email || user?.name)}
+          mimeType={job.metadata?.mime_type}
+          filename={job.metadata?.file_name}
+        />
+      )}
+
       {/* Metadata */}
       <MetadataGrid>
         <MetadataCard>
@@ -72,6 +72,10 @@ export const forensicAPI = {
   getJobStatus: (id) => api.get(`/jobs/${id}/status`),
   getJobDetails: (id) => api.get(`/jobs/${id}/details`),
   verifyIntegrity: (id) => api.post(`/jobs/${id}/verify`),
+  // Streamed with HTTP Range, so <video>/<audio> can seek without downloading the whole file;
+  // every access is logged in the chain of custody under the given investigator
+  getEvidenceUrl: (id, investigatorId) =>
+    `${API_BASE_URL}/jobs/${id}/evidence?investigator_id=${encodeURIComponent(investigatorId)}`,
   getAnalytics: (period) => api.get(`/analytics?period=${period}`),
   
   downloadReport: async (jobId) => {